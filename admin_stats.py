@@ -0,0 +1,69 @@
+import asyncio
+import time
+from config import ADMIN_STATS_TTL
+from database import acquire
+
+# users counters are the sum of the rollup slots (migrations/0010); giveaways
+# and tournaments are small and are aggregated directly, each in a single pass
+ADMIN_STATS_SQL = '''
+    SELECT
+        u.total_users, u.active_users,
+        g.total_giveaways, g.active_giveaways, g.giveaway_participants,
+        t.total_tournaments, t.active_tournaments, t.tournament_participants
+    FROM (
+        SELECT COALESCE(SUM(total_users), 0) AS total_users,
+               COALESCE(SUM(subscribed_users), 0) AS active_users
+        FROM user_stats_slots
+    ) u, (
+        SELECT COUNT(*) AS total_giveaways,
+               COUNT(*) FILTER (WHERE status = 'active' OR status IS NULL) AS active_giveaways,
+               COALESCE(SUM(participants_count), 0) AS giveaway_participants
+        FROM giveaways
+    ) g, (
+        SELECT COUNT(*) AS total_tournaments,
+               COUNT(*) FILTER (WHERE status = 'open' OR status IS NULL) AS active_tournaments,
+               COALESCE(SUM(participants_count), 0) AS tournament_participants
+        FROM tournaments
+    ) t
+'''
+
+class AdminStatsCache:
+    """Dashboard statistics, reloaded at most once every `ttl` seconds.
+
+    Requests within the TTL get the last snapshot. When it expires,
+    concurrent requests share a single query instead of each running one.
+    """
+
+    def __init__(self, ttl=10):
+        self.ttl = ttl
+        self._stats = None
+        self._expires_at = 0
+        self._inflight = None
+        self.hits = 0
+        self.loads = 0
+
+    async def get(self):
+        if self._stats is not None and time.monotonic() < self._expires_at:
+            self.hits += 1
+            return self._stats
+
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._load())
+            self._inflight.add_done_callback(self._load_done)
+        return await asyncio.shield(self._inflight)
+
+    async def _load(self):
+        async with acquire() as conn:
+            row = await conn.fetchrow(ADMIN_STATS_SQL)
+        self._stats = {key: int(value) for key, value in row.items()}
+        self._expires_at = time.monotonic() + self.ttl
+        self.loads += 1
+        return self._stats
+
+    def _load_done(self, future):
+        self._inflight = None
+        if not future.cancelled():
+            # Retrieved here so a failed load nobody awaited doesn't warn
+            future.exception()
+
+admin_stats = AdminStatsCache(ADMIN_STATS_TTL)
@@ -0,0 +1,124 @@
+import gzip
+import hashlib
+import os
+import re
+import brotli
+import rjsmin
+from aiohttp import web
+
+STATIC_DIR = 'static'
+# Served from memory under /assets/<name>.<hash>.<ext>
+FINGERPRINTED = ('script.js', 'style.css')
+
+CONTENT_TYPES = {
+    '.html': 'text/html',
+    '.js': 'application/javascript',
+    '.css': 'text/css',
+}
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+def minify_css(css):
+    """Comments and whitespace only; selectors and values are left as they are"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+def minify(name, text):
+    if name.endswith('.css'):
+        return minify_css(text)
+    if name.endswith('.js'):
+        return rjsmin.jsmin(text)
+    return text
+
+class Asset:
+    """One file in memory with its precompressed variants"""
+
+    def __init__(self, body, content_type, cache_control):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        digest = hashlib.sha256(body).hexdigest()
+        self.hash = digest[:12]
+        self.variants = {
+            'identity': body,
+            'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+            'br': brotli.compress(body, quality=11),
+        }
+
+    def pick_encoding(self, accept_encoding):
+        accepted = set()
+        for part in accept_encoding.lower().split(','):
+            coding, _, params = part.strip().partition(';')
+            if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                accepted.add(coding.strip())
+        for coding in ('br', 'gzip'):
+            if coding in self.variants and (coding in accepted or '*' in accepted):
+                return coding
+        return 'identity'
+
+    def respond(self, request):
+        encoding = self.pick_encoding(request.headers.get('Accept-Encoding', ''))
+        etag = f'"{self.hash}-{encoding}"'
+        headers = {"ETag": etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+
+        if etag in [value.strip() for value in request.headers.get('If-None-Match', '').split(',')]:
+            return web.Response(status=304, headers=headers)
+
+        if encoding != 'identity':
+            headers["Content-Encoding"] = encoding
+        return web.Response(body=self.variants[encoding], content_type=self.content_type, charset='utf-8', headers=headers)
+
+class AssetStore:
+    """index.html, script.js and style.css, built once at startup.
+
+    script.js and style.css are minified and get a content hash in their
+    URL, so they can be cached forever (`immutable`); index.html is
+    rewritten to the hashed URLs and revalidated on every load with its
+    ETag. gzip and brotli variants are compressed once,
+    and requests get the best one their Accept-Encoding allows.
+    """
+
+    def __init__(self, static_dir=STATIC_DIR):
+        self.static_dir = static_dir
+        self.index = None
+        self.files = {}
+
+    def build(self):
+        urls = {}
+        for name in FINGERPRINTED:
+            path = os.path.join(self.static_dir, name)
+            if not os.path.exists(path):
+                print(f"⚠️ Static asset not found: {path}")
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                body = minify(name, f.read()).encode('utf-8')
+
+            stem, ext = os.path.splitext(name)
+            asset = Asset(body, CONTENT_TYPES[ext], IMMUTABLE)
+            hashed_name = f"{stem}.{asset.hash}{ext}"
+            self.files[hashed_name] = asset
+            urls[f"/static/{name}"] = f"/assets/{hashed_name}"
+
+        index_path = os.path.join(self.static_dir, 'index.html')
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                html = f.read()
+            for url, hashed_url in urls.items():
+                html = html.replace(f'"{url}"', f'"{hashed_url}"')
+            self.index = Asset(html.encode('utf-8'), CONTENT_TYPES['.html'], 'no-cache')
+        else:
+            print(f"❌ index.html not found at: {index_path}")
+
+        sizes = ", ".join(
+            f"{name} {len(asset.variants['identity']) // 1024}K/{len(asset.variants['gzip']) // 1024}K gz"
+            for name, asset in self.files.items()
+        )
+        print(f"✅ Static assets ready: {sizes or 'none'}")
+        return self
+
+    async def handle(self, request):
+        asset = self.files.get(request.match_info['name'])
+        if asset is None:
+            raise web.HTTPNotFound()
+        return asset.respond(request)
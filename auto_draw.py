@@ -0,0 +1,167 @@
+import asyncio
+import heapq
+from config import AUTO_DRAW_BATCH_SIZE, AUTO_DRAW_RETRY_DELAY, AUTO_DRAW_RESYNC_INTERVAL
+from database import acquire
+from draw import draw_giveaway
+from events import event_bus
+
+# end_date is stored as UTC wall time (create_giveaway_handler converts it),
+# so it is compared with the database clock in UTC, whatever the session timezone
+PENDING_DEADLINES_SQL = '''
+    SELECT id, GREATEST(0, EXTRACT(EPOCH FROM end_date - (CURRENT_TIMESTAMP AT TIME ZONE 'UTC'))) AS due_in
+    FROM giveaways
+    WHERE end_date IS NOT NULL AND status IS DISTINCT FROM 'completed'
+'''
+
+class DrawScheduler:
+    """Draws giveaways automatically when their end_date passes.
+
+    Deadlines are kept in a heap and the loop sleeps until the earliest one,
+    so the table is not polled. On start (and every `resync_interval`
+    seconds, in case an update was lost) the heap is rebuilt from the
+    pending giveaways; deadlines missed while no leader was running are
+    already due and are drawn right away. Due giveaways are drawn
+    `batch_size` at a time. The draw itself locks the giveaway row and
+    skips completed ones, so a manual draw in the meantime is harmless.
+
+    Only the leader replica runs the scheduler. refresh() on the other
+    replicas forwards the change over the event bus.
+    """
+
+    def __init__(self, batch_size=5, retry_delay=60.0, resync_interval=600.0):
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.resync_interval = resync_interval
+        self._heap = []
+        # giveaway_id -> deadline; heap entries that don't match are stale
+        self._deadlines = {}
+        self._task = None
+        self._wakeup = None
+        self._refreshes = set()
+        self.drawn = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def refresh(self, giveaway_id):
+        """Re-read one giveaway's deadline after it was created, changed or deleted"""
+        if self._task is not None:
+            task = asyncio.create_task(self._refresh(giveaway_id))
+            self._refreshes.add(task)
+            task.add_done_callback(self._refreshes.discard)
+        else:
+            # The scheduler runs in the leader (bot) process
+            event_bus.publish_nowait('draw_schedule', {"giveaway_id": giveaway_id})
+
+    async def apply_remote_refresh(self, data):
+        if self._task is not None:
+            await self._refresh(data['giveaway_id'])
+
+    async def _refresh(self, giveaway_id):
+        try:
+            async with acquire() as conn:
+                due_in = await conn.fetchval(PENDING_DEADLINES_SQL + ' AND id = $1', giveaway_id)
+        except Exception as e:
+            # Picked up by the next resync
+            print(f"⚠️ Could not refresh draw deadline of giveaway {giveaway_id}: {e}")
+            return
+
+        if due_in is None:
+            self._deadlines.pop(giveaway_id, None)
+        else:
+            self._push(giveaway_id, float(due_in))
+        self._wakeup.set()
+
+    def _push(self, giveaway_id, due_in):
+        deadline = asyncio.get_running_loop().time() + due_in
+        self._deadlines[giveaway_id] = deadline
+        heapq.heappush(self._heap, (deadline, giveaway_id))
+
+    async def _load(self):
+        async with acquire() as conn:
+            rows = await conn.fetch(PENDING_DEADLINES_SQL)
+
+        self._heap = []
+        self._deadlines = {}
+        for row in rows:
+            self._push(row['id'], float(row['due_in']))
+        print(f"⏰ Draw scheduler loaded {len(rows)} pending giveaway(s)")
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            deadline, giveaway_id = heapq.heappop(self._heap)
+            if self._deadlines.get(giveaway_id) == deadline:
+                del self._deadlines[giveaway_id]
+                due.append(giveaway_id)
+        return due
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_resync = loop.time()
+
+        while True:
+            if loop.time() >= next_resync:
+                try:
+                    await self._load()
+                    next_resync = loop.time() + self.resync_interval
+                except Exception as e:
+                    print(f"⚠️ Draw scheduler load error: {e}")
+                    next_resync = loop.time() + self.retry_delay
+
+            due = self._pop_due(loop.time())
+            if due:
+                results = await asyncio.gather(*(draw_giveaway(giveaway_id) for giveaway_id in due), return_exceptions=True)
+                for giveaway_id, result in zip(due, results):
+                    self._handle_result(giveaway_id, result)
+                continue
+
+            self._wakeup.clear()
+            timeout = next_resync - loop.time()
+            if self._heap:
+                timeout = min(timeout, self._heap[0][0] - loop.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0, timeout))
+            except asyncio.TimeoutError:
+                pass
+
+    def _handle_result(self, giveaway_id, result):
+        if isinstance(result, Exception):
+            self.errors += 1
+            print(f"⚠️ Auto-draw of giveaway {giveaway_id} failed: {result}. Retry in {self.retry_delay:.0f}s")
+            self._push(giveaway_id, self.retry_delay)
+        elif result['status'] == 'drawn':
+            self.drawn += 1
+            print(f"⏰ Giveaway {giveaway_id} drawn automatically at its end date")
+        elif result['status'] == 'no_participants':
+            # Stays active; tried again after the next resync
+            self.skipped += 1
+            print(f"⚠️ Giveaway {giveaway_id} ended without participants, not drawn")
+        else:
+            # Already completed or deleted
+            self.skipped += 1
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for task in list(self._refreshes):
+            task.cancel()
+        self._heap = []
+        self._deadlines = {}
+
+    def stats(self):
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "pending": len(self._deadlines),
+            "next_in": round(min(self._deadlines.values()) - asyncio.get_running_loop().time(), 1) if self._deadlines else None,
+            "drawn": self.drawn,
+            "skipped": self.skipped,
+            "errors": self.errors,
+        }
+
+draw_scheduler = DrawScheduler(AUTO_DRAW_BATCH_SIZE, AUTO_DRAW_RETRY_DELAY, AUTO_DRAW_RESYNC_INTERVAL)
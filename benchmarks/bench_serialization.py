@@ -0,0 +1,55 @@
+"""Encoding a 10k-row participant page: old handler path vs serialization.py.
+
+Run from the project root:  python -m benchmarks.bench_serialization
+"""
+import datetime
+import json
+import timeit
+# Private asyncpg helper, the only way to build Records without a database
+from asyncpg.protocol.protocol import _create_record
+from serialization import dumps
+from web_app import TOURNAMENT_PARTICIPANT_FIELDS
+
+ROWS = 10_000
+REPEAT = 20
+
+def make_records():
+    mapping = {name: index for index, name in enumerate(TOURNAMENT_PARTICIPANT_FIELDS.names)}
+    start = datetime.datetime(2025, 1, 1, 12, 0, 0, 123456)
+    return [
+        _create_record(mapping, (
+            i, 100_000_000 + i, 18 + i % 30, 'Xiaomi', f'player{i}', str(5_000_000_000 + i),
+            start + datetime.timedelta(seconds=i), f'user{i}', f'Игрок {i}', None,
+        ))
+        for i in range(ROWS)
+    ]
+
+def old_path(records):
+    """dict() per Record, fix-ups per field, then stdlib json like web.json_response"""
+    participants = []
+    for participant in [dict(record) for record in records]:
+        formatted_participant = dict(participant)
+        if not formatted_participant.get('first_name'):
+            formatted_participant['first_name'] = f"User {participant['user_id']}"
+        if formatted_participant.get('registration_date'):
+            formatted_participant['registration_date'] = formatted_participant['registration_date'].isoformat()
+        participants.append(formatted_participant)
+    return json.dumps({"items": participants, "next_cursor": None}).encode('utf-8')
+
+def new_path(records):
+    return dumps({"items": TOURNAMENT_PARTICIPANT_FIELDS.encode(records), "next_cursor": None})
+
+def main():
+    records = make_records()
+    assert json.loads(old_path(records)) == json.loads(new_path(records))
+
+    print(f"{ROWS} rows, best of {REPEAT}")
+    results = {}
+    for name, func in (('old', old_path), ('new', new_path)):
+        best = min(timeit.repeat(lambda: func(records), number=1, repeat=REPEAT))
+        results[name] = best
+        print(f"  {name}: {best * 1000:7.2f} ms  ({len(func(records)) / 1024:.0f} KiB)")
+    print(f"  speedup: {results['old'] / results['new']:.1f}x")
+
+if __name__ == '__main__':
+    main()
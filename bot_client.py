@@ -0,0 +1,147 @@
+import time
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import AnswerCallbackQuery, GetChatMember, GetMe, GetChat
+from config import (
+    BOT_TOKEN, CHANNEL_ID,
+    TELEGRAM_CONNECTION_LIMIT, TELEGRAM_KEEPALIVE_TIMEOUT, TELEGRAM_DNS_CACHE_TTL,
+    TELEGRAM_FAST_TIMEOUT, TELEGRAM_DEFAULT_TIMEOUT, TELEGRAM_UPLOAD_TIMEOUT,
+)
+from rate_limiter import rate_limiter
+
+# Short calls on the user-facing path: fail fast instead of holding a request
+FAST_METHODS = (AnswerCallbackQuery, GetChatMember, GetMe, GetChat)
+
+# Methods that may carry a file upload
+UPLOAD_PREFIXES = ('SendPhoto', 'SendDocument', 'SendVideo', 'SendAnimation', 'SendAudio', 'SendMediaGroup')
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class TelegramSession(AiohttpSession):
+    """AiohttpSession with a tuned connector, per-method timeouts and latency stats.
+
+    All calls go to api.telegram.org, so one keep-alive pool with a DNS cache
+    is shared by the bot, the web API and background workers. Requests that
+    pass an explicit timeout (long polling) keep it.
+    """
+
+    def __init__(self, limit=50, keepalive_timeout=60, dns_cache_ttl=300,
+                 fast_timeout=5, default_timeout=15, upload_timeout=60, **kwargs):
+        super().__init__(limit=limit, timeout=default_timeout, **kwargs)
+        self._connector_init.update({
+            "limit_per_host": limit,
+            "keepalive_timeout": keepalive_timeout,
+            "ttl_dns_cache": dns_cache_ttl,
+        })
+        self.fast_timeout = fast_timeout
+        self.upload_timeout = upload_timeout
+        self._latency = {}
+
+    def timeout_for(self, method):
+        if isinstance(method, FAST_METHODS):
+            return self.fast_timeout
+        if type(method).__name__.startswith(UPLOAD_PREFIXES):
+            return self.upload_timeout
+        return self.timeout
+
+    async def make_request(self, bot, method, timeout=None):
+        if timeout is None:
+            timeout = self.timeout_for(method)
+
+        started = time.monotonic()
+        failed = False
+        try:
+            return await super().make_request(bot, method, timeout=timeout)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._record_latency(type(method).__name__, time.monotonic() - started, failed)
+
+    def _record_latency(self, name, elapsed, failed):
+        entry = self._latency.get(name)
+        if entry is None:
+            entry = {"count": 0, "errors": 0, "total": 0.0, "max": 0.0,
+                     "histogram": [0] * (len(LATENCY_BUCKETS) + 1)}
+            self._latency[name] = entry
+
+        entry["count"] += 1
+        entry["errors"] += failed
+        entry["total"] += elapsed
+        entry["max"] = max(entry["max"], elapsed)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if elapsed <= bound:
+                entry["histogram"][index] += 1
+                break
+        else:
+            entry["histogram"][-1] += 1
+
+    def stats(self):
+        lower_bounds = (0,) + LATENCY_BUCKETS[:-1]
+        labels = [f"{low}-{high}s" for low, high in zip(lower_bounds, LATENCY_BUCKETS)]
+        labels.append(f"{LATENCY_BUCKETS[-1]}s+")
+        return {
+            name: {
+                "count": entry["count"],
+                "errors": entry["errors"],
+                "avg": entry["total"] / entry["count"],
+                "max": entry["max"],
+                "histogram": dict(zip(labels, entry["histogram"])),
+            }
+            for name, entry in sorted(self._latency.items())
+        }
+
+class BotMetadata:
+    """Bot identity and channel info, fetched once at startup.
+
+    The bot username only changes through BotFather, so deep links are built
+    from the cached value instead of calling getMe per request.
+    """
+
+    def __init__(self):
+        self.me = None
+        self.channel = None
+
+    async def load(self, bot):
+        self.me = await bot.get_me()
+        print(f"✅ Bot identity cached: @{self.me.username}")
+        try:
+            self.channel = await bot.get_chat(CHANNEL_ID)
+            print(f"✅ Channel cached: {self.channel.title} ({self.channel.id})")
+        except Exception as e:
+            print(f"⚠️ Could not load channel info for {CHANNEL_ID}: {e}")
+
+    def remember_channel(self, chat):
+        """Cache the channel from an update if startup couldn't fetch it"""
+        if self.channel is None and chat.username and f"@{chat.username}".lower() == str(CHANNEL_ID).lower():
+            self.channel = chat
+
+    def channel_chat_id(self, chat_id):
+        """One id for the channel however it is given (@username or numeric id):
+        the numeric id once known, CHANNEL_ID until then. Other chats pass through"""
+        if str(chat_id) == str(CHANNEL_ID) or (self.channel is not None and chat_id == self.channel.id):
+            return self.channel.id if self.channel is not None else CHANNEL_ID
+        return chat_id
+
+    async def get_username(self, bot):
+        if self.me is None:
+            self.me = await bot.get_me()
+        return self.me.username
+
+bot_metadata = BotMetadata()
+
+def create_bot():
+    """Bot on the tuned session, with the shared rate limiter installed"""
+    session = TelegramSession(
+        limit=TELEGRAM_CONNECTION_LIMIT,
+        keepalive_timeout=TELEGRAM_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl=TELEGRAM_DNS_CACHE_TTL,
+        fast_timeout=TELEGRAM_FAST_TIMEOUT,
+        default_timeout=TELEGRAM_DEFAULT_TIMEOUT,
+        upload_timeout=TELEGRAM_UPLOAD_TIMEOUT,
+    )
+    # Every outgoing Bot API call goes through the shared rate limiter;
+    # channel posts by @username and by numeric id share one bucket
+    rate_limiter.chat_key = bot_metadata.channel_chat_id
+    session.middleware(rate_limiter)
+    return Bot(token=BOT_TOKEN, session=session)
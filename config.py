@@ -1,4 +1,5 @@
 
+import hashlib
 import os
 from dotenv import load_dotenv
 
@@ -66,3 +67,93 @@ print(f"Mode: {MODE}")
 CHANNEL_LINK = "https://t.me/neizvestnyipabger"
 TIKTOK_LINK = "https://www.tiktok.com/@neizvestiypubger"
 TELEGRAM_LINK = "https://t.me/neizvestnyipabger"
+
+# PostgreSQL connection pool settings
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "10"))
+# Set to 0 when the database sits behind pgbouncer in transaction mode
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+# Idle connections are closed and reopened after this many seconds
+DB_POOL_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_POOL_MAX_INACTIVE_LIFETIME", "300"))
+
+# Schema migrations (see migrations/ and `python manage.py migrate`)
+RUN_MIGRATIONS_ON_STARTUP = os.getenv("RUN_MIGRATIONS_ON_STARTUP", "true").lower() == "true"
+MIGRATIONS_LOCK_TIMEOUT = float(os.getenv("MIGRATIONS_LOCK_TIMEOUT", "300"))
+
+# In-process cache for GET /api/giveaways and /api/tournaments responses
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+# Each cache tag is invalidated (and broadcast) at most once per this many seconds
+RESPONSE_CACHE_INVALIDATE_INTERVAL = float(os.getenv("RESPONSE_CACHE_INVALIDATE_INTERVAL", "0.5"))
+
+# Channel subscription check cache (seconds)
+SUBSCRIPTION_CACHE_MAX_ENTRIES = int(os.getenv("SUBSCRIPTION_CACHE_MAX_ENTRIES", "10000"))
+SUBSCRIPTION_CACHE_POSITIVE_TTL = float(os.getenv("SUBSCRIPTION_CACHE_POSITIVE_TTL", "300"))
+SUBSCRIPTION_CACHE_NEGATIVE_TTL = float(os.getenv("SUBSCRIPTION_CACHE_NEGATIVE_TTL", "15"))
+# users.is_subscribed older than this (seconds) is re-checked via the Bot API;
+# a stored "not subscribed" only counts for SUBSCRIPTION_CACHE_NEGATIVE_TTL
+SUBSCRIPTION_STATE_MAX_AGE = float(os.getenv("SUBSCRIPTION_STATE_MAX_AGE", "86400"))
+
+# Minimum seconds between edits of the same channel post's counter button
+BUTTON_EDIT_INTERVAL = float(os.getenv("BUTTON_EDIT_INTERVAL", "2"))
+
+# Outgoing Bot API rate limits (requests per second) and retries
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_PRIVATE_CHAT_RATE = float(os.getenv("TELEGRAM_PRIVATE_CHAT_RATE", "1"))
+TELEGRAM_GROUP_CHAT_RATE = float(os.getenv("TELEGRAM_GROUP_CHAT_RATE", str(20 / 60)))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+TELEGRAM_RETRY_BASE_DELAY = float(os.getenv("TELEGRAM_RETRY_BASE_DELAY", "0.5"))
+
+# Bot API HTTP client
+TELEGRAM_CONNECTION_LIMIT = int(os.getenv("TELEGRAM_CONNECTION_LIMIT", "50"))
+TELEGRAM_KEEPALIVE_TIMEOUT = float(os.getenv("TELEGRAM_KEEPALIVE_TIMEOUT", "60"))
+TELEGRAM_DNS_CACHE_TTL = int(os.getenv("TELEGRAM_DNS_CACHE_TTL", "300"))
+# Request timeouts (seconds): callback answers/membership checks, everything else, file uploads
+TELEGRAM_FAST_TIMEOUT = float(os.getenv("TELEGRAM_FAST_TIMEOUT", "5"))
+TELEGRAM_DEFAULT_TIMEOUT = float(os.getenv("TELEGRAM_DEFAULT_TIMEOUT", "15"))
+TELEGRAM_UPLOAD_TIMEOUT = float(os.getenv("TELEGRAM_UPLOAD_TIMEOUT", "60"))
+
+# Outbox worker for channel announcements
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "4"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+
+# How the bot receives updates: "polling" or "webhook" (served by the web app)
+BOT_DELIVERY_MODE = os.getenv("BOT_DELIVERY_MODE", "polling").lower()
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", WEB_APP_URL)
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+# Same on every replica unless set explicitly; Telegram sends it back in a header
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or (hashlib.sha256(BOT_TOKEN.encode()).hexdigest() if BOT_TOKEN else None)
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+WEBHOOK_CONCURRENCY = int(os.getenv("WEBHOOK_CONCURRENCY", "32"))
+
+# Leader election between replicas (seconds)
+LEADER_RENEW_INTERVAL = float(os.getenv("LEADER_RENEW_INTERVAL", "2"))
+LEADER_LEASE_TIMEOUT = float(os.getenv("LEADER_LEASE_TIMEOUT", "10"))
+
+# Public HTTP port
+WEB_PORT = int(os.getenv("PORT", 10000)) if IS_RAILWAY else 5000
+# >1 runs that many web worker processes on WEB_PORT (SO_REUSEPORT) plus one bot process
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+# Bot process port in worker mode; web workers forward webhook updates here
+BOT_INTERNAL_PORT = int(os.getenv("BOT_INTERNAL_PORT", "8081"))
+# Seconds to drain in-flight work on SIGTERM before a process is killed
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "30"))
+
+# Giveaways/tournaments whose participant ids are kept in memory (LRU)
+MEMBERSHIP_INDEX_MAX_EVENTS = int(os.getenv("MEMBERSHIP_INDEX_MAX_EVENTS", "200"))
+
+# Write-behind users upserts from /start: flush every N seconds or at M rows
+USER_BUFFER_FLUSH_INTERVAL = float(os.getenv("USER_BUFFER_FLUSH_INTERVAL", "0.5"))
+USER_BUFFER_MAX_ROWS = int(os.getenv("USER_BUFFER_MAX_ROWS", "500"))
+
+# Seconds the admin dashboard statistics are served from memory
+ADMIN_STATS_TTL = float(os.getenv("ADMIN_STATS_TTL", "10"))
+
+# Automatic giveaway draws at end_date
+AUTO_DRAW_BATCH_SIZE = int(os.getenv("AUTO_DRAW_BATCH_SIZE", "5"))
+AUTO_DRAW_RETRY_DELAY = float(os.getenv("AUTO_DRAW_RETRY_DELAY", "60"))
+# Full reload of the deadlines, in case a schedule change event was lost (seconds)
+AUTO_DRAW_RESYNC_INTERVAL = float(os.getenv("AUTO_DRAW_RESYNC_INTERVAL", "600"))
@@ -1,118 +1,123 @@
 import asyncpg
-from config import DATABASE_PUBLIC_URL, USE_POSTGRESQL
+from config import (
+    DATABASE_PUBLIC_URL, USE_POSTGRESQL,
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_ACQUIRE_TIMEOUT,
+    DB_STATEMENT_CACHE_SIZE, DB_POOL_MAX_INACTIVE_LIFETIME, RUN_MIGRATIONS_ON_STARTUP,
+)
+from migrate import run_migrations, get_pending_migrations
+
+# Process-wide connection pool, created once in main()
+pool = None
+
+async def create_pool():
+    """Create the shared asyncpg pool used by every DB code path"""
+    global pool
+    if not USE_POSTGRESQL:
+        raise Exception("❌ PostgreSQL not configured! Please set DATABASE_PUBLIC_URL in secrets.")
+
+    if pool is None:
+        pool = await asyncpg.create_pool(
+            DATABASE_PUBLIC_URL,
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+            max_inactive_connection_lifetime=DB_POOL_MAX_INACTIVE_LIFETIME,
+        )
+        print(f"✅ PostgreSQL pool created (min={DB_POOL_MIN_SIZE}, max={DB_POOL_MAX_SIZE})")
+    return pool
+
+def get_pool():
+    if pool is None:
+        raise Exception("❌ PostgreSQL pool is not initialized")
+    return pool
+
+def acquire():
+    """Acquire a pooled connection: `async with acquire() as conn: ...`"""
+    return get_pool().acquire(timeout=DB_POOL_ACQUIRE_TIMEOUT)
+
+async def connect_dedicated(application_name=None):
+    """Standalone connection for session state the pool would reset on release
+    (advisory locks, LISTEN). TCP keepalives make a dead peer show up quickly.
+    """
+    server_settings = {
+        "tcp_keepalives_idle": "10",
+        "tcp_keepalives_interval": "5",
+        "tcp_keepalives_count": "3",
+    }
+    if application_name:
+        server_settings["application_name"] = application_name
+    return await asyncpg.connect(DATABASE_PUBLIC_URL, server_settings=server_settings)
+
+async def close_pool():
+    global pool
+    if pool is not None:
+        await pool.close()
+        pool = None
+        print("✅ PostgreSQL pool closed")
+
+# (entity table, participants table, FK column) pairs with a participants_count column
+# (see migrations/0002_participant_counters.sql)
+COUNTED_TABLES = (
+    ('giveaways', 'giveaway_participants', 'giveaway_id'),
+    ('tournaments', 'tournament_participants', 'tournament_id'),
+)
+
+async def check_participant_counts(fix=False):
+    """Re-derive participant counters and report (optionally repair) drift.
+
+    Returns a list of dicts: table, id, stored, actual.
+    """
+    mismatches = []
+    async with acquire() as conn:
+        async with conn.transaction():
+            for entity_table, participants_table, fk_column in COUNTED_TABLES:
+                if fix:
+                    # Hold off new participants while the counters are rewritten
+                    await conn.execute(f'LOCK TABLE {participants_table} IN SHARE ROW EXCLUSIVE MODE')
+
+                rows = await conn.fetch(f'''
+                    SELECT e.id, e.participants_count AS stored,
+                           COALESCE(c.participant_count, 0) AS actual
+                    FROM {entity_table} e
+                    LEFT JOIN (
+                        SELECT {fk_column}, COUNT(*) AS participant_count
+                        FROM {participants_table}
+                        GROUP BY {fk_column}
+                    ) c ON e.id = c.{fk_column}
+                    WHERE e.participants_count <> COALESCE(c.participant_count, 0)
+                ''')
+
+                for row in rows:
+                    mismatches.append({
+                        "table": entity_table,
+                        "id": row['id'],
+                        "stored": row['stored'],
+                        "actual": row['actual'],
+                    })
+
+                if fix and rows:
+                    await conn.executemany(
+                        f'UPDATE {entity_table} SET participants_count = $1 WHERE id = $2',
+                        [(row['actual'], row['id']) for row in rows]
+                    )
+
+    return mismatches
 
 async def init_db():
     if USE_POSTGRESQL:
         # PostgreSQL initialization
         print("🐘 Initializing PostgreSQL database...")
         try:
-            conn = await asyncpg.connect(DATABASE_PUBLIC_URL)
-
-            # Users table
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id BIGINT PRIMARY KEY,
-                    username TEXT,
-                    first_name TEXT,
-                    last_name TEXT,
-                    is_subscribed BOOLEAN DEFAULT FALSE,
-                    registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            # Giveaways table
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS giveaways (
-                    id SERIAL PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    description TEXT,
-                    end_date TIMESTAMP,
-                    is_active BOOLEAN DEFAULT TRUE,
-                    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    message_id BIGINT,
-                    winners_count INTEGER DEFAULT 1,
-                    status TEXT DEFAULT 'active'
-                )
-            ''')
-            
-            # Add missing columns if they don't exist
-            try:
-                await conn.execute('ALTER TABLE giveaways ADD COLUMN IF NOT EXISTS status TEXT DEFAULT \'active\'')
-                await conn.execute('ALTER TABLE giveaways ADD COLUMN IF NOT EXISTS message_id BIGINT')
-                await conn.execute('ALTER TABLE giveaways ADD COLUMN IF NOT EXISTS winners_count INTEGER DEFAULT 1')
-            except Exception as alter_error:
-                print(f"Note: Could not add columns to giveaways (may already exist): {alter_error}")
-
-            # Giveaway participants table
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS giveaway_participants (
-                    id SERIAL PRIMARY KEY,
-                    giveaway_id INTEGER REFERENCES giveaways(id),
-                    user_id BIGINT,
-                    UNIQUE(giveaway_id, user_id)
-                )
-            ''')
-
-            # Giveaway prizes table
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS giveaway_prizes (
-                    id SERIAL PRIMARY KEY,
-                    giveaway_id INTEGER REFERENCES giveaways(id),
-                    place INTEGER,
-                    prize TEXT
-                )
-            ''')
-
-            # Giveaway winners table
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS giveaway_winners (
-                    id SERIAL PRIMARY KEY,
-                    giveaway_id INTEGER REFERENCES giveaways(id),
-                    user_id BIGINT REFERENCES users(user_id),
-                    place INTEGER,
-                    name TEXT,
-                    username TEXT,
-                    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            # Tournaments table
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS tournaments (
-                    id SERIAL PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    description TEXT,
-                    start_date TEXT,
-                    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    winners_count INTEGER DEFAULT 1,
-                    registration_status TEXT DEFAULT 'open',
-                    status TEXT DEFAULT 'open',
-                    message_id BIGINT
-                )
-            ''')
-            
-            # Add status column if it doesn't exist (for existing databases)
-            try:
-                await conn.execute('ALTER TABLE tournaments ADD COLUMN IF NOT EXISTS status TEXT DEFAULT \'open\'')
-            except Exception as alter_error:
-                print(f"Note: Could not add status column (may already exist): {alter_error}")
-
-            # Tournament participants table
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS tournament_participants (
-                    id SERIAL PRIMARY KEY,
-                    tournament_id INTEGER REFERENCES tournaments(id),
-                    user_id BIGINT REFERENCES users(user_id),
-                    age INTEGER,
-                    phone_brand TEXT,
-                    nickname TEXT,
-                    game_id TEXT,
-                    registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(tournament_id, user_id)
-                )
-            ''')
-
-            await conn.close()
+            async with acquire() as conn:
+                if RUN_MIGRATIONS_ON_STARTUP:
+                    applied = await run_migrations(conn)
+                    if applied:
+                        print(f"✅ Applied migrations: {applied}")
+                else:
+                    pending = await get_pending_migrations(conn)
+                    if pending:
+                        print(f"⚠️ {len(pending)} pending migration(s). Run: python manage.py migrate")
+
             print("✅ PostgreSQL database initialized successfully")
 
         except Exception as e:
@@ -124,42 +129,62 @@ async def init_db():
 async def add_user(user_id, username=None, first_name=None, last_name=None):
     if USE_POSTGRESQL:
         try:
-            conn = await asyncpg.connect(DATABASE_PUBLIC_URL)
-            await conn.execute(
-                '''
-                INSERT INTO users (user_id, username, first_name, last_name)
-                VALUES ($1, $2, $3, $4)
-                ON CONFLICT (user_id) DO UPDATE SET
-                    username = $2,
-                    first_name = $3,
-                    last_name = $4
-                ''', user_id, username, first_name, last_name)
-            await conn.close()
+            async with acquire() as conn:
+                await conn.execute(
+                    '''
+                    INSERT INTO users (user_id, username, first_name, last_name)
+                    VALUES ($1, $2, $3, $4)
+                    ON CONFLICT (user_id) DO UPDATE SET
+                        username = $2,
+                        first_name = $3,
+                        last_name = $4
+                    ''', user_id, username, first_name, last_name)
         except Exception as e:
             print(f"PostgreSQL add_user error: {e}")
     else:
         raise Exception("❌ PostgreSQL not configured")
 
-async def update_subscription_status(user_id, is_subscribed):
+async def update_subscription_status(user_id, is_subscribed, username=None, first_name=None, last_name=None):
+    """Record a confirmed membership state for a user (creating the user if needed)"""
     if USE_POSTGRESQL:
         try:
-            conn = await asyncpg.connect(DATABASE_PUBLIC_URL)
-            await conn.execute(
-                '''
-                UPDATE users SET is_subscribed = $1 WHERE user_id = $2
-                ''', is_subscribed, user_id)
-            await conn.close()
+            async with acquire() as conn:
+                await conn.execute(
+                    '''
+                    INSERT INTO users (user_id, username, first_name, last_name, is_subscribed, subscription_updated_at)
+                    VALUES ($1, $2, $3, $4, $5, CURRENT_TIMESTAMP)
+                    ON CONFLICT (user_id) DO UPDATE SET
+                        is_subscribed = EXCLUDED.is_subscribed,
+                        subscription_updated_at = EXCLUDED.subscription_updated_at,
+                        username = COALESCE(EXCLUDED.username, users.username),
+                        first_name = COALESCE(EXCLUDED.first_name, users.first_name),
+                        last_name = COALESCE(EXCLUDED.last_name, users.last_name)
+                    ''', user_id, username, first_name, last_name, is_subscribed)
         except Exception as e:
             print(f"PostgreSQL update_subscription error: {e}")
     else:
         raise Exception("❌ PostgreSQL not configured")
 
+async def get_subscription_state(user_id, max_age, negative_max_age):
+    """Return users.is_subscribed if it was confirmed recently enough, else None.
+
+    A "not subscribed" state goes stale after `negative_max_age` seconds,
+    so a user who has just joined the channel is re-checked quickly
+    """
+    async with acquire() as conn:
+        return await conn.fetchval(
+            '''
+            SELECT is_subscribed FROM users
+            WHERE user_id = $1
+              AND subscription_updated_at > CURRENT_TIMESTAMP - make_interval(
+                  secs => CASE WHEN is_subscribed THEN $2 ELSE $3 END)
+            ''', user_id, max_age, negative_max_age)
+
 async def get_user_count():
     if USE_POSTGRESQL:
         try:
-            conn = await asyncpg.connect(DATABASE_PUBLIC_URL)
-            result = await conn.fetchval('SELECT COUNT(*) FROM users')
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchval('SELECT COUNT(*) FROM users')
             return result if result else 0
         except Exception as e:
             print(f"PostgreSQL get_user_count error: {e}")
@@ -170,12 +195,138 @@ async def get_user_count():
 async def get_active_users_count():
     if USE_POSTGRESQL:
         try:
-            conn = await asyncpg.connect(DATABASE_PUBLIC_URL)
-            result = await conn.fetchval('SELECT COUNT(*) FROM users WHERE is_subscribed = TRUE')
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchval('SELECT COUNT(*) FROM users WHERE is_subscribed = TRUE')
             return result if result else 0
         except Exception as e:
             print(f"PostgreSQL get_active_users_count error: {e}")
             return 0
     else:
-        raise Exception("❌ PostgreSQL not configured")
\ No newline at end of file
+        raise Exception("❌ PostgreSQL not configured")
+
+async def join_giveaway(giveaway_id, user_id, username=None, first_name=None):
+    """Register a giveaway participant in a single round trip.
+
+    Validation, the users upsert and the participant insert run as one
+    statement, so concurrent double taps cannot create duplicates.
+    Returns a dict with `status` ('joined', 'already_joined', 'completed',
+    'not_found'), `participants_count` and `message_id`.
+    """
+    async with acquire() as conn:
+        row = await conn.fetchrow(
+            '''
+            WITH g AS (
+                -- Waits for a draw in progress (FOR UPDATE in draw.py) and then
+                -- re-reads the row, so nobody joins after the winners were
+                -- picked. KEY SHARE does not conflict with the counter UPDATE
+                -- below, so concurrent joins don't block each other
+                SELECT id, status, message_id, participants_count
+                FROM giveaways
+                WHERE id = $1
+                FOR KEY SHARE
+            ),
+            new_user AS (
+                INSERT INTO users (user_id, username, first_name)
+                SELECT $2, $3, $4
+                FROM g
+                WHERE g.status IS DISTINCT FROM 'completed'
+                ON CONFLICT (user_id) DO NOTHING
+            ),
+            joined AS (
+                INSERT INTO giveaway_participants (giveaway_id, user_id)
+                SELECT g.id, $2
+                FROM g
+                WHERE g.status IS DISTINCT FROM 'completed'
+                ON CONFLICT (giveaway_id, user_id) DO NOTHING
+                RETURNING id
+            ),
+            bumped AS (
+                UPDATE giveaways
+                SET participants_count = participants_count + 1
+                WHERE id = $1 AND EXISTS (SELECT 1 FROM joined)
+                RETURNING participants_count
+            )
+            SELECT
+                g.status,
+                g.message_id,
+                EXISTS (SELECT 1 FROM joined) AS joined,
+                COALESCE((SELECT participants_count FROM bumped), g.participants_count) AS participants_count
+            FROM g
+            ''', giveaway_id, user_id, username, first_name)
+
+    if row is None:
+        return {"status": "not_found", "participants_count": 0, "message_id": None}
+
+    if row['status'] == 'completed':
+        status = 'completed'
+    elif row['joined']:
+        status = 'joined'
+    else:
+        status = 'already_joined'
+
+    return {
+        "status": status,
+        "participants_count": row['participants_count'],
+        "message_id": row['message_id'],
+    }
+
+async def join_tournament(tournament_id, user_id, age, phone_brand, nickname, game_id,
+                          username=None, first_name=None):
+    """Register a tournament participant in a single round trip.
+
+    Works like join_giveaway(); `status` is one of 'joined', 'already_joined',
+    'closed' or 'not_found'.
+    """
+    async with acquire() as conn:
+        row = await conn.fetchrow(
+            '''
+            WITH t AS (
+                SELECT id, message_id, participants_count,
+                       COALESCE(NULLIF(registration_status, ''), status, 'open') AS reg_status
+                FROM tournaments
+                WHERE id = $1
+            ),
+            new_user AS (
+                INSERT INTO users (user_id, username, first_name)
+                SELECT $2, $7, $8
+                FROM t
+                WHERE t.reg_status <> 'closed'
+                ON CONFLICT (user_id) DO NOTHING
+            ),
+            joined AS (
+                INSERT INTO tournament_participants (tournament_id, user_id, age, phone_brand, nickname, game_id)
+                SELECT t.id, $2, $3, $4, $5, $6
+                FROM t
+                WHERE t.reg_status <> 'closed'
+                ON CONFLICT (tournament_id, user_id) DO NOTHING
+                RETURNING id
+            ),
+            bumped AS (
+                UPDATE tournaments
+                SET participants_count = participants_count + 1
+                WHERE id = $1 AND EXISTS (SELECT 1 FROM joined)
+                RETURNING participants_count
+            )
+            SELECT
+                t.reg_status,
+                t.message_id,
+                EXISTS (SELECT 1 FROM joined) AS joined,
+                COALESCE((SELECT participants_count FROM bumped), t.participants_count) AS participants_count
+            FROM t
+            ''', tournament_id, user_id, age, phone_brand, nickname, game_id, username, first_name)
+
+    if row is None:
+        return {"status": "not_found", "participants_count": 0, "message_id": None}
+
+    if row['reg_status'] == 'closed':
+        status = 'closed'
+    elif row['joined']:
+        status = 'joined'
+    else:
+        status = 'already_joined'
+
+    return {
+        "status": status,
+        "participants_count": row['participants_count'],
+        "message_id": row['message_id'],
+    }
@@ -0,0 +1,128 @@
+import secrets
+from database import acquire
+from outbox import enqueue_announcement, outbox_worker
+from response_cache import response_cache
+from membership import membership_index
+
+def format_winners_message(title, winners):
+    """Channel announcement with the winners in place order"""
+    winner_list = []
+    for winner in winners:
+        username = (winner['username'] or '').strip()
+        first_name = (winner['first_name'] or '').strip()
+        user_id = winner['user_id']
+
+        if username:
+            # Если есть username, показываем его с @
+            winner_text = f"@{username}"
+        else:
+            # Если нет username, создаем ссылку с именем на профиль пользователя
+            display_name = first_name or f"Пользователь{user_id}"
+            winner_text = f'<a href="tg://user?id={user_id}">{display_name}</a>'
+
+        winner_list.append(f"🏆 {winner['place']}. {winner_text}")
+
+    winners_text = "\n".join(winner_list)
+
+    return f"""🎉 <b>Результаты розыгрыша!</b>
+
+📝 <b>{title}</b>
+
+🏆 <b>Победители:</b>
+{winners_text}
+
+🎊 Поздравляем победителей!"""
+
+async def draw_giveaway(giveaway_id):
+    """Pick the winners of a giveaway inside the database.
+
+    A random seed is drawn from `secrets`; the winners are the
+    `winners_count` participants with the lowest sha256(seed:user_id). Only
+    the winners leave Postgres, and the users upsert, the winner rows, the
+    status change and the channel announcement are committed together.
+    The seed is stored on the giveaway and logged, so anyone can recompute
+    the result from it.
+
+    Returns a dict with `status` ('drawn', 'completed', 'no_participants',
+    'not_found'), `winners` and `seed`.
+    """
+    seed = secrets.token_hex(16)
+
+    async with acquire() as conn:
+        async with conn.transaction():
+            # The row lock keeps a manual and a scheduled draw from both running
+            giveaway = await conn.fetchrow(
+                'SELECT id, title, status, winners_count FROM giveaways WHERE id = $1 FOR UPDATE',
+                giveaway_id
+            )
+            if giveaway is None:
+                return {"status": "not_found", "winners": [], "seed": None}
+            if giveaway['status'] == 'completed':
+                return {"status": "completed", "winners": [], "seed": None}
+
+            winners = await conn.fetch('''
+                WITH picked AS (
+                    SELECT user_id, row_number() OVER (ORDER BY ticket) AS place
+                    FROM (
+                        SELECT gp.user_id, sha256(convert_to($2::text || ':' || gp.user_id, 'UTF8')) AS ticket
+                        FROM giveaway_participants gp
+                        WHERE gp.giveaway_id = $1
+                        ORDER BY ticket
+                        LIMIT $3
+                    ) tickets
+                ),
+                ensured AS (
+                    -- giveaway_winners.user_id references users
+                    INSERT INTO users (user_id, is_subscribed)
+                    SELECT user_id, TRUE FROM picked
+                    ON CONFLICT (user_id) DO UPDATE SET is_subscribed = TRUE
+                ),
+                saved AS (
+                    INSERT INTO giveaway_winners (giveaway_id, user_id, place, name, username)
+                    SELECT $1, p.user_id, p.place,
+                           COALESCE(NULLIF(TRIM(CONCAT_WS(' ', u.first_name, u.last_name)), ''), 'User ' || p.user_id),
+                           COALESCE(u.username, '')
+                    FROM picked p
+                    LEFT JOIN users u ON u.user_id = p.user_id
+                )
+                SELECT p.user_id, p.place,
+                       COALESCE(u.username, '') AS username,
+                       COALESCE(u.first_name, '') AS first_name,
+                       COALESCE(u.last_name, '') AS last_name
+                FROM picked p
+                LEFT JOIN users u ON u.user_id = p.user_id
+                ORDER BY p.place
+            ''', giveaway_id, seed, max(1, giveaway['winners_count'] or 1))
+
+            if not winners:
+                return {"status": "no_participants", "winners": [], "seed": None}
+
+            await conn.execute('''
+                UPDATE giveaways
+                SET status = 'completed', draw_seed = $2, drawn_at = CURRENT_TIMESTAMP
+                WHERE id = $1
+            ''', giveaway_id, seed)
+
+            # Posted by the outbox worker after the transaction commits
+            await enqueue_announcement(
+                conn, 'channel_message', giveaway_id,
+                {"text": format_winners_message(giveaway['title'], winners)},
+                f"giveaway_winners:{giveaway_id}"
+            )
+
+    response_cache.invalidate('giveaways')
+    membership_index.drop('giveaway', giveaway_id)
+    outbox_worker.wake()
+    print(f"🎲 Giveaway {giveaway_id} drawn with seed {seed}: {len(winners)} winner(s), announcement queued")
+
+    return {
+        "status": "drawn",
+        "seed": seed,
+        "winners": [
+            {
+                **dict(winner),
+                "name": f"{winner['first_name']} {winner['last_name']}".strip() or f"User {winner['user_id']}",
+            }
+            for winner in winners
+        ],
+    }
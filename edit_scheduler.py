@@ -0,0 +1,136 @@
+import asyncio
+from aiogram.exceptions import TelegramRetryAfter, TelegramBadRequest
+from config import CHANNEL_ID, BUTTON_EDIT_INTERVAL
+from keyboards import giveaway_participate_keyboard, tournament_participants_keyboard
+from bot_client import bot_metadata
+from events import event_bus
+
+class ButtonEditScheduler:
+    """Coalesces participant-count button edits on channel posts.
+
+    Handlers call schedule() and return immediately. Per (chat, message)
+    only the highest requested count is kept, and each message is edited at
+    most once per `interval` seconds, so a burst of joins becomes a handful
+    of edits instead of one per join. TelegramRetryAfter pauses that
+    message's queue for the requested time.
+
+    Only the leader replica edits. On the others schedule() forwards the
+    request to it over the event bus.
+    """
+
+    def __init__(self, interval=2.0):
+        self.interval = interval
+        self.bot = None
+        self._pending = {}
+        self._tasks = {}
+        self.scheduled = 0
+        self.coalesced = 0
+        self.edits = 0
+        self.errors = 0
+        self.retry_after = 0
+        self.forwarded = 0
+
+    def start(self, bot):
+        self.bot = bot
+
+    def apply_forwarded(self, data):
+        """Event bus handler for requests forwarded by other replicas"""
+        if self.bot is not None:
+            self.schedule(**data)
+
+    def schedule(self, kind, entity_id, message_id, count, chat_id=CHANNEL_ID):
+        """Queue a button update; `kind` is 'giveaway' or 'tournament'"""
+        if not message_id:
+            return
+
+        # Web handlers pass CHANNEL_ID, callbacks the numeric chat id; both
+        # must map to the same key or coalescing breaks between the two paths
+        chat_id = bot_metadata.channel_chat_id(chat_id)
+
+        if self.bot is None:
+            self.forwarded += 1
+            event_bus.publish_nowait('button_edit', {
+                "kind": kind, "entity_id": entity_id, "message_id": message_id,
+                "count": count, "chat_id": chat_id,
+            })
+            return
+
+        key = (chat_id, message_id)
+        self.scheduled += 1
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            # Counts only grow between edits; a lower one is an older request
+            if pending['count'] > count:
+                return
+
+        self._pending[key] = {"kind": kind, "entity_id": entity_id, "count": count}
+
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._flush_loop(key))
+
+    async def _flush_loop(self, key):
+        try:
+            while True:
+                edit = self._pending.pop(key, None)
+                if edit is None:
+                    break
+
+                try:
+                    await self._apply(key, edit)
+                    self.edits += 1
+                except TelegramRetryAfter as e:
+                    self.retry_after += 1
+                    print(f"⏳ Flood control on message {key[1]}: retry in {e.retry_after}s")
+                    # Put the edit back unless a newer one arrived meanwhile
+                    self._pending.setdefault(key, edit)
+                    await asyncio.sleep(e.retry_after)
+                    continue
+                except TelegramBadRequest as e:
+                    if "message is not modified" not in str(e).lower():
+                        self.errors += 1
+                        print(f"⚠️ Error updating channel message {key[1]}: {e}")
+                except Exception as e:
+                    self.errors += 1
+                    print(f"⚠️ Error updating channel message {key[1]}: {e}")
+
+                # Keeps edits of one message at least `interval` apart
+                await asyncio.sleep(self.interval)
+        finally:
+            self._tasks.pop(key, None)
+
+    async def _apply(self, key, edit):
+        chat_id, message_id = key
+        if edit['kind'] == 'giveaway':
+            keyboard = giveaway_participate_keyboard(edit['entity_id'], edit['count'])
+        else:
+            bot_username = await bot_metadata.get_username(self.bot)
+            keyboard = tournament_participants_keyboard(bot_username, edit['entity_id'], edit['count'])
+
+        await self.bot.edit_message_reply_markup(
+            chat_id=chat_id,
+            message_id=message_id,
+            reply_markup=keyboard
+        )
+
+    async def close(self):
+        self.bot = None
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "active_messages": len(self._tasks),
+            "scheduled": self.scheduled,
+            "coalesced": self.coalesced,
+            "edits": self.edits,
+            "errors": self.errors,
+            "retry_after": self.retry_after,
+            "forwarded": self.forwarded,
+        }
+
+edit_scheduler = ButtonEditScheduler(BUTTON_EDIT_INTERVAL)
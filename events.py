@@ -0,0 +1,130 @@
+import asyncio
+import inspect
+import json
+import os
+import socket
+from database import acquire, connect_dedicated
+
+RECONNECT_INTERVAL = 5
+
+# application_name of listener sessions, so processes can count their peers
+LISTENER_APPLICATION_NAME = 'sasha-events'
+
+# Identifies this process in leader_lease and in published events
+REPLICA_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+class EventBus:
+    """Messages between replicas over Postgres LISTEN/NOTIFY.
+
+    Events published by this process are not delivered back to it. Delivery
+    is best effort: events sent while the listener is reconnecting are lost,
+    so they should only carry hints that the receiver can live without
+    (cache invalidations, button updates).
+
+    Every `RECONNECT_INTERVAL` seconds the listener counts the other
+    listener sessions in pg_stat_activity. While there are none (a single
+    process and replica), publishing is skipped instead of spending a
+    pooled connection on a NOTIFY nobody receives. Until the first count
+    events are published as usual.
+    """
+
+    def __init__(self):
+        self._handlers = {}
+        self._conn = None
+        self._task = None
+        self._pending = set()
+        self.peers = None
+        self.published = 0
+        self.skipped = 0
+        self.received = 0
+        self.errors = 0
+
+    def subscribe(self, channel, handler):
+        """`handler(payload)` may be a plain function or a coroutine function"""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                if self._conn is None or self._conn.is_closed():
+                    self._conn = await connect_dedicated(LISTENER_APPLICATION_NAME)
+                    for channel in self._handlers:
+                        await self._conn.add_listener(channel, self._on_notify)
+                    print(f"✅ Listening for events: {', '.join(self._handlers) or '-'}")
+                self.peers = await self._conn.fetchval('''
+                    SELECT COUNT(*) FROM pg_stat_activity
+                    WHERE application_name = $1 AND datname = current_database()
+                      AND pid <> pg_backend_pid()
+                ''', LISTENER_APPLICATION_NAME)
+            except Exception as e:
+                print(f"⚠️ Event listener connection error: {e}")
+                self._conn = None
+                self.peers = None
+            await asyncio.sleep(RECONNECT_INTERVAL)
+
+    def _on_notify(self, conn, pid, channel, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get('origin') == REPLICA_ID:
+            return
+
+        self.received += 1
+        for handler in self._handlers.get(channel, ()):
+            try:
+                result = handler(message['data'])
+                if inspect.isawaitable(result):
+                    self._track(asyncio.ensure_future(result))
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Error handling event '{channel}': {e}")
+
+    async def publish(self, channel, data):
+        payload = json.dumps({"origin": REPLICA_ID, "data": data})
+        async with acquire() as conn:
+            await conn.execute('SELECT pg_notify($1, $2)', channel, payload)
+        self.published += 1
+
+    def publish_nowait(self, channel, data):
+        """Publish from synchronous code; errors are logged, not raised"""
+        if self.peers == 0:
+            self.skipped += 1
+            return
+        self._track(asyncio.ensure_future(self.publish(channel, data)))
+
+    def _track(self, future):
+        self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        self._pending.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            self.errors += 1
+            print(f"⚠️ Event delivery error: {future.exception()}")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+    def stats(self):
+        return {
+            "connected": self._conn is not None and not self._conn.is_closed(),
+            "peers": self.peers,
+            "published": self.published,
+            "skipped": self.skipped,
+            "received": self.received,
+            "errors": self.errors,
+        }
+
+event_bus = EventBus()
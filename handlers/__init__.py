@@ -1,7 +1,9 @@
 
 from .user_handlers import register_user_handlers
 from .admin_handlers import register_admin_handlers
+from .channel_handlers import register_channel_handlers
 
 def register_handlers(dp, bot):
     register_user_handlers(dp, bot)
     register_admin_handlers(dp, bot)
+    register_channel_handlers(dp, bot)
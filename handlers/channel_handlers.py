@@ -0,0 +1,42 @@
+from aiogram import Router
+from aiogram.types import ChatMemberUpdated, Chat
+from config import CHANNEL_ID
+from database import update_subscription_status
+from subscription_cache import subscription_cache, SUBSCRIBED_STATUSES
+from bot_client import bot_metadata
+from events import event_bus
+
+router = Router()
+
+def register_channel_handlers(dp, bot):
+    dp.include_router(router)
+
+def is_our_channel(chat: Chat):
+    """CHANNEL_ID может быть @username или числовым id"""
+    if bot_metadata.channel is not None:
+        return chat.id == bot_metadata.channel.id
+    channel = str(CHANNEL_ID)
+    if channel.startswith('@'):
+        return (chat.username or '').lower() == channel[1:].lower()
+    return str(chat.id) == channel
+
+@router.chat_member()
+async def channel_member_handler(event: ChatMemberUpdated):
+    """Подписка/отписка от канала (бот должен быть администратором канала)"""
+    if not is_our_channel(event.chat):
+        return
+
+    member = event.new_chat_member
+    user = member.user
+    is_subscribed = member.status in SUBSCRIBED_STATUSES
+
+    print(f"📡 Channel membership update: user {user.id} -> {member.status}")
+
+    await update_subscription_status(
+        user.id, is_subscribed,
+        username=user.username,
+        first_name=user.first_name,
+        last_name=user.last_name
+    )
+    subscription_cache.set(user.id, is_subscribed)
+    event_bus.publish_nowait('subscription_changed', {"user_id": user.id, "is_subscribed": is_subscribed})
@@ -2,7 +2,7 @@ from aiogram import Router, F, Bot
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
 from aiogram.filters import CommandStart
 from config import TIKTOK_LINK, TELEGRAM_LINK, WEB_APP_URL
-from database import add_user
+from user_buffer import user_buffer
 import json
 from aiogram.filters import Command
 from config import CHANNEL_ID
@@ -15,7 +15,8 @@ def register_user_handlers(dp, bot):
 @router.message(CommandStart())
 async def start_handler(message: Message):
     user = message.from_user
-    await add_user(user.id, user.username, user.first_name, user.last_name)
+    # Saved in the background with other /start users; the reply doesn't wait
+    user_buffer.add(user.id, user.username, user.first_name, user.last_name)
 
     # Check if it's a deep link for tournament registration
     args = message.text.split()[1:] if len(message.text.split()) > 1 else []
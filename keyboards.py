@@ -0,0 +1,19 @@
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+def giveaway_participate_keyboard(giveaway_id, count):
+    """Кнопка участия под постом розыгрыша в канале"""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(
+            text=f"🎮 Участвовать ({count})",
+            callback_data=f"giveaway_participate_{giveaway_id}"
+        )]
+    ])
+
+def tournament_participants_keyboard(bot_username, tournament_id, count):
+    """Кнопка со счетчиком участников под постом турнира в канале"""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(
+            text=f"🏆 Участники ({count})",
+            url=f"https://t.me/{bot_username}?start=tournament_{tournament_id}"
+        )]
+    ])
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from config import LEADER_RENEW_INTERVAL, LEADER_LEASE_TIMEOUT
+from database import connect_dedicated
+from events import REPLICA_ID
+
+LEADER_LOCK_ID = 724_002
+
+LEASE_COLUMNS = '''
+    holder,
+    EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - acquired_at) AS leader_for,
+    EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - renewed_at) AS lease_age
+'''
+
+class LeaderElection:
+    """Elects one replica to run the singleton duties.
+
+    Leadership is a session-level advisory lock held on a dedicated
+    connection, outside the pool, because the pool resets session state.
+    Followers try to take the lock every `renew_interval` seconds. If the
+    leader dies, Postgres drops its session and frees the lock, so a
+    follower takes over on its next attempt. The leader renews its lease
+    row every `renew_interval` seconds. If a renewal fails or takes longer
+    than `lease_timeout`, it steps down and closes the connection, so it
+    stops acting as leader before anyone else can start.
+
+    Each round also records the lease row (the leader from its renewal,
+    followers by reading it), so /health can show the current leader
+    without a database call.
+    """
+
+    def __init__(self, name='bot', renew_interval=2.0, lease_timeout=10.0):
+        self.name = name
+        self.renew_interval = renew_interval
+        self.lease_timeout = lease_timeout
+        self.is_leader = False
+        self._conn = None
+        self._task = None
+        self._callbacks = []
+        self._lease = None
+
+    def on_change(self, callback):
+        """`await callback(is_leader)` runs whenever this replica gains or loses leadership"""
+        self._callbacks.append(callback)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                is_leader = await asyncio.wait_for(self._tick(), timeout=self.lease_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Leader election error: {type(e).__name__}: {e}")
+                self._drop_connection()
+                is_leader = False
+
+            # Outside the timeout: starting/stopping duties may take a while
+            await self._set_leader(is_leader)
+            await asyncio.sleep(self.renew_interval)
+
+    async def _tick(self):
+        """One election round; returns whether this replica holds the lock"""
+        if self._conn is None or self._conn.is_closed():
+            if self.is_leader:
+                # The session that held the lock is gone
+                self._conn = None
+                return False
+            self._conn = await connect_dedicated()
+
+        if not self.is_leader:
+            if not await self._conn.fetchval('SELECT pg_try_advisory_lock($1)', LEADER_LOCK_ID):
+                self._remember_lease(await self._conn.fetchrow(f'''
+                    SELECT {LEASE_COLUMNS} FROM leader_lease WHERE name = $1
+                ''', self.name))
+                return False
+            await self._renew(acquired=True)
+            return True
+
+        still_held = await self._conn.fetchval('''
+            SELECT EXISTS (
+                SELECT 1 FROM pg_locks
+                WHERE locktype = 'advisory' AND granted
+                  AND pid = pg_backend_pid() AND objid = $1
+            )
+        ''', LEADER_LOCK_ID)
+        if not still_held:
+            raise RuntimeError("advisory lock was lost")
+        await self._renew()
+        return True
+
+    async def _renew(self, acquired=False):
+        self._remember_lease(await self._conn.fetchrow(f'''
+            INSERT INTO leader_lease (name, holder, acquired_at, renewed_at)
+            VALUES ($1, $2, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            ON CONFLICT (name) DO UPDATE SET
+                holder = $2,
+                renewed_at = CURRENT_TIMESTAMP,
+                acquired_at = CASE WHEN $3 THEN CURRENT_TIMESTAMP ELSE leader_lease.acquired_at END
+            RETURNING {LEASE_COLUMNS}
+        ''', self.name, REPLICA_ID, acquired))
+
+    def _remember_lease(self, lease):
+        self._lease = (lease, time.monotonic()) if lease is not None else None
+
+    async def _set_leader(self, is_leader):
+        if is_leader == self.is_leader:
+            return
+        self.is_leader = is_leader
+        print(f"👑 {REPLICA_ID} is now the leader" if is_leader else f"🔻 {REPLICA_ID} stepped down as leader")
+
+        for callback in self._callbacks:
+            try:
+                await callback(is_leader)
+            except Exception as e:
+                print(f"⚠️ Leadership change handler error: {e}")
+
+    def _drop_connection(self):
+        conn, self._conn = self._conn, None
+        if conn is not None and not conn.is_closed():
+            # Ending the session releases the advisory lock
+            conn.terminate()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        if self.is_leader:
+            await self._set_leader(False)
+        if self._conn is not None and not self._conn.is_closed():
+            # Hand over right away instead of waiting for the session to time out
+            await self._conn.close()
+        self._conn = None
+
+    def local_state(self):
+        """Current leader and lease age as of the last election round, for /health.
+
+        No database call: ages are the ones read in that round plus the time since
+        """
+        state = {"replica": REPLICA_ID, "is_leader": self.is_leader}
+        if self._lease is not None:
+            lease, seen_at = self._lease
+            since = time.monotonic() - seen_at
+            state.update({
+                "leader": lease['holder'],
+                "leader_for": round(float(lease['leader_for']) + since, 1),
+                "lease_age": round(float(lease['lease_age']) + since, 1),
+            })
+        return state
+
+leader_election = LeaderElection('bot', LEADER_RENEW_INTERVAL, LEADER_LEASE_TIMEOUT)
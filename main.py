@@ -5,13 +5,28 @@ import os
 import signal
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
-from config import BOT_TOKEN, ADMIN_IDS, MODE, CHANNEL_ID, WEB_APP_URL, IS_REPLIT, IS_RAILWAY
+from config import (
+    BOT_TOKEN, ADMIN_IDS, MODE, CHANNEL_ID, WEB_APP_URL, IS_REPLIT, IS_RAILWAY, BOT_DELIVERY_MODE,
+    WEB_PORT, WEB_WORKERS, BOT_INTERNAL_PORT, SHUTDOWN_TIMEOUT,
+)
 import asyncpg
 from aiogram import F
 import config
 from handlers import register_handlers
-from database import init_db
-from web_app import create_app
+from database import init_db, create_pool, close_pool, join_giveaway
+from web_app import create_app, load_subscription_status
+from response_cache import response_cache
+from subscription_cache import subscription_cache
+from edit_scheduler import edit_scheduler
+from bot_client import create_bot, bot_metadata
+from outbox import outbox_worker
+from membership import membership_index
+from user_buffer import user_buffer
+from auto_draw import draw_scheduler
+from webhook import set_bot_webhook
+from events import event_bus
+from leader import leader_election
+from workers import run_supervisor, install_stop_signals, subscribe_shared_events
 from aiohttp import web
 
 # Configure logging based on environment
@@ -32,13 +47,12 @@ app_runner = None
 bot_instance = None
 dp_instance = None
 
-def signal_handler(signum, frame):
-    """Handle shutdown signals"""
-    print(f"📡 Received signal {signum}, initiating graceful shutdown...")
-    print("🛑 Exiting...")
-    os._exit(0)
+async def main(worker_mode=False):
+    """Bot process: dispatcher, leader duties and (unless `worker_mode`) the web app.
 
-async def main():
+    In worker mode the web workers own the public port and this process
+    only listens on BOT_INTERNAL_PORT for forwarded webhook updates.
+    """
     global app_runner, bot_instance, dp_instance
     from aiogram import Bot, Dispatcher
     from aiogram.client.default import DefaultBotProperties
@@ -53,19 +67,28 @@ async def main():
     import os
     import asyncpg
     from config import BOT_TOKEN, ADMIN_IDS, MODE, CHANNEL_ID, WEB_APP_URL
-    from database import init_db
+    from database import init_db, create_pool, close_pool, join_giveaway
     from handlers import register_handlers
     from web_app import create_app
 
+    stop_event = asyncio.Event()
+    install_stop_signals(stop_event)
+
     try:
         print("Starting application initialization...")
 
-        # Initialize database
+        # Create the shared connection pool and initialize database
+        db_pool = await create_pool()
         await init_db()
         print("✅ Database initialized successfully")
+        user_buffer.start()
 
         # Initialize bot and dispatcher
-        bot_instance = Bot(token=BOT_TOKEN)
+        bot_instance = create_bot()
+        try:
+            await bot_metadata.load(bot_instance)
+        except Exception as e:
+            print(f"⚠️ Could not load bot metadata: {e}")
         storage = MemoryStorage()
         dp_instance = Dispatcher(storage=storage)
 
@@ -78,16 +101,21 @@ async def main():
             try:
                 giveaway_id = int(callback.data.split("_")[-1])
                 user_id = callback.from_user.id
+
+                # Повторное нажатие кнопки отвечаем из памяти, без Bot API и базы
+                if await membership_index.contains('giveaway', giveaway_id, user_id):
+                    await callback.answer("❌ Вы уже участвуете в этом розыгрыше!", show_alert=True)
+                    return
                 
                 # Проверяем подписку на канал
                 try:
                     print(f"🔍 Checking subscription for user {user_id} via callback")
-                    chat_member = await bot_instance.get_chat_member(chat_id=config.CHANNEL_ID, user_id=user_id)
-                    subscribed_statuses = ['member', 'administrator', 'creator']
-                    
-                    print(f"👤 User {user_id} status in channel: {chat_member.status}")
-                    
-                    if chat_member.status not in subscribed_statuses:
+                    # Shares the cache and in-flight lookups with the web API
+                    is_subscribed = await subscription_cache.get_or_load(
+                        user_id, lambda: load_subscription_status(bot_instance, user_id)
+                    )
+
+                    if not is_subscribed:
                         await callback.answer("❌ Для участия необходимо подписаться на наш канал @neizvestnyipabger!", show_alert=True)
                         return
                         
@@ -104,41 +132,40 @@ async def main():
                         return
 
                 if config.USE_POSTGRESQL:
-                    conn = await asyncpg.connect(config.DATABASE_PUBLIC_URL)
-                    # Check if user already participated
-                    existing = await conn.fetchval('''
-                        SELECT id FROM giveaway_participants WHERE giveaway_id = $1 AND user_id = $2
-                    ''', giveaway_id, user_id)
-
-                    if existing:
-                        await conn.close()
-                        await callback.answer("❌ Вы уже участвуете в этом розыгрыше!", show_alert=True)
-                        return
-
-                    # Add participant
-                    await conn.execute('''
-                        INSERT INTO giveaway_participants (giveaway_id, user_id)
-                        VALUES ($1, $2)
-                    ''', giveaway_id, user_id)
-
-                    # Get updated participant count
-                    participant_count = await conn.fetchval('''
-                        SELECT COUNT(*) FROM giveaway_participants WHERE giveaway_id = $1
-                    ''', giveaway_id)
-                    
-                    await conn.close()
+                    # Same single-round-trip path as the web API
+                    result = await join_giveaway(
+                        giveaway_id, user_id,
+                        username=callback.from_user.username,
+                        first_name=callback.from_user.first_name
+                    )
                 else:
                     raise Exception("❌ PostgreSQL not configured")
 
-                # Update button with new participant count
-                new_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text=f"🎮 Участвовать ({participant_count})", callback_data=f"giveaway_participate_{giveaway_id}")]
-                ])
+                if result['status'] == 'not_found':
+                    await callback.answer("❌ Розыгрыш не найден", show_alert=True)
+                    return
 
-                try:
-                    await callback.message.edit_reply_markup(reply_markup=new_keyboard)
-                except Exception as edit_error:
-                    print(f"Error updating button: {edit_error}")
+                if result['status'] == 'completed':
+                    await callback.answer("❌ Розыгрыш уже завершен", show_alert=True)
+                    return
+
+                if result['status'] == 'already_joined':
+                    membership_index.add('giveaway', giveaway_id, user_id)
+                    await callback.answer("❌ Вы уже участвуете в этом розыгрыше!", show_alert=True)
+                    return
+
+                membership_index.add('giveaway', giveaway_id, user_id)
+
+                participant_count = result['participants_count']
+                response_cache.invalidate_counts('giveaways')
+
+                # Button update is coalesced with other joins on the same post
+                if callback.message:
+                    bot_metadata.remember_channel(callback.message.chat)
+                    edit_scheduler.schedule(
+                        'giveaway', giveaway_id, callback.message.message_id, participant_count,
+                        chat_id=callback.message.chat.id
+                    )
 
                 await callback.answer("✅ Вы успешно зарегистрированы в розыгрыше!", show_alert=True)
 
@@ -151,26 +178,26 @@ async def main():
         print("✅ Bot handlers registered successfully")
 
         # Determine port based on environment
-        if IS_RAILWAY:
-            port = int(os.getenv("PORT", 10000))
-            print(f"🔧 Railway PORT: {port}")
+        if worker_mode:
+            host, port = '127.0.0.1', BOT_INTERNAL_PORT
+            print(f"🔧 Bot process internal PORT: {port}")
         else:
-            port = 5000
-            print(f"🔧 Using default port: {port}")
+            host, port = '0.0.0.0', WEB_PORT
+            print(f"🔧 {'Railway' if IS_RAILWAY else 'Default'} PORT: {port}")
 
         # Create web app first (faster startup for Railway)
         print("⚡ Creating web app for fast startup...")
-        app = await create_app(bot_instance)
+        app = await create_app(bot_instance, db_pool, dp_instance)
         print("✅ Web app created")
 
         # Start web server immediately for Railway health check
         print("🚀 Starting web server...")
-        app_runner = web.AppRunner(app)
+        app_runner = web.AppRunner(app, shutdown_timeout=SHUTDOWN_TIMEOUT)
         await app_runner.setup()
 
-        site = web.TCPSite(app_runner, '0.0.0.0', port)
+        site = web.TCPSite(app_runner, host, port)
         await site.start()
-        print(f"✅ Web server started on 0.0.0.0:{port}")
+        print(f"✅ Web server started on {host}:{port}")
 
         environment = "Railway (Production)" if IS_RAILWAY else "Replit (Development)" if IS_REPLIT else "Local"
         print(f"🚀 Service ready on port {port}! Environment: {environment}")
@@ -179,187 +206,80 @@ async def main():
             print(f"🌐 Railway URL: https://sasha-production.up.railway.app")
             print(f"🏥 Health check endpoint: /health")
             print("🚀 PRODUCTION MODE: Railway - Full functionality")
-            print("✅ Bot polling ENABLED (Production setup)")
-
-            # Start bot polling in background task for Railway too
-            async def start_bot_polling():
-                max_retries = 3
-                retry_count = 0
-
-                # Добавляем дополнительную задержку для предотвращения конфликтов
-                print("⏳ Waiting 5 seconds before starting bot to avoid conflicts...")
-                await asyncio.sleep(5)
-
-                while retry_count < max_retries:
-                    try:
-                        print(f"🤖 Starting bot polling (attempt {retry_count + 1}/{max_retries})...")
-
-                        # Принудительно очищаем все webhook и ждем
-                        try:
-                            await bot_instance.delete_webhook(drop_pending_updates=True)
-                            await asyncio.sleep(3)
-                            print("✅ Webhooks cleared")
-                        except Exception as webhook_error:
-                            print(f"⚠️ Webhook clearing error: {webhook_error}")
-
-                        # Проверяем доступность бота
-                        me = await bot_instance.get_me()
-                        print(f"✅ Bot connected: @{me.username}")
-
-                        # Дополнительная задержка перед началом polling
-                        await asyncio.sleep(2)
-
-                        # Start polling with proper error handling
-                        await dp_instance.start_polling(bot_instance, handle_signals=False)
-                        break  # Success, exit retry loop
-
-                    except asyncio.CancelledError:
-                        print("🛑 Bot polling cancelled")
-                        break
-                    except Exception as e:
-                        retry_count += 1
-                        error_msg = str(e).lower()
-                        print(f"❌ Bot polling error (attempt {retry_count}): {e}")
-
-                        if "conflict" in error_msg or "terminated by other getupdates" in error_msg:
-                            wait_time = 20 + (10 * retry_count)  # Увеличиваем время ожидания
-                            print(f"🔄 Bot conflict detected - waiting {wait_time} seconds...")
-                            if retry_count < max_retries:
-                                await asyncio.sleep(wait_time)
-                            else:
-                                print("❌ Max retries reached. Bot conflict persists.")
-                                print("🛑 Web app will continue working without bot polling.")
-                                break
-                        elif retry_count >= max_retries:
-                            print(f"❌ Max retries reached. Bot polling failed: {e}")
-                            break
-                        else:
-                            await asyncio.sleep(5)
-
-            # Create bot task but don't wait for it
-            bot_task = asyncio.create_task(start_bot_polling())
-
-            # Keep the web server running indefinitely
-            print("✅ Railway setup complete - keeping web server alive...")
-            try:
-                while True:
-                    await asyncio.sleep(30)
-                    # Check if bot task is still running
-                    if bot_task.done():
-                        exception = bot_task.exception()
-                        if exception:
-                            print(f"🔄 Bot task finished with error: {exception}")
-                        else:
-                            print("✅ Bot task completed")
-                        # Don't restart bot task to avoid conflicts
-            except asyncio.CancelledError:
-                print("🛑 Main loop cancelled")
-                if not bot_task.done():
-                    bot_task.cancel()
-                    try:
-                        await bot_task
-                    except asyncio.CancelledError:
-                        pass
-            except Exception as e:
-                print(f"❌ Main loop error: {e}")
-                # Keep web server running despite errors
-                while True:
-                    await asyncio.sleep(60)
-
         else:
             # Replit/Local setup
-            print(f"🌐 Local URL: http://0.0.0.0:{port}")
-
-            # Set up signal handlers for graceful shutdown
-            signal.signal(signal.SIGINT, signal_handler)
-            signal.signal(signal.SIGTERM, signal_handler)
-
-            # Start bot polling in background task for Replit
-            async def start_bot_polling():
-                max_retries = 5
-                retry_count = 0
-
-                # Добавляем дополнительную задержку для предотвращения конфликтов
-                print("⏳ Waiting 10 seconds before starting bot to avoid conflicts...")
-                await asyncio.sleep(10)
-
-                while retry_count < max_retries:
-                    try:
-                        print(f"🤖 Starting bot polling (attempt {retry_count + 1}/{max_retries})...")
-
-                        # Принудительно очищаем все webhook и ждем
-                        try:
-                            await bot_instance.delete_webhook(drop_pending_updates=True)
-                            await asyncio.sleep(8)
-                            print("✅ Webhooks cleared")
-                        except Exception as webhook_error:
-                            print(f"⚠️ Webhook clearing error: {webhook_error}")
-
-                        # Проверяем доступность бота
-                        me = await bot_instance.get_me()
-                        print(f"✅ Bot connected: @{me.username}")
-
-                        # Дополнительная задержка перед началом polling
-                        await asyncio.sleep(3)
-
-                        # Start polling with proper error handling
-                        await dp_instance.start_polling(bot_instance, handle_signals=False)
-                        break  # Success, exit retry loop
-
-                    except asyncio.CancelledError:
-                        print("🛑 Bot polling cancelled")
+            print(f"🌐 Local URL: http://0.0.0.0:{WEB_PORT}")
+
+        print(f"✅ Bot updates via {BOT_DELIVERY_MODE.upper()}")
+
+        async def start_bot_updates():
+            """Receive updates while this replica is the leader"""
+            retry_count = 0
+            while True:
+                try:
+                    if BOT_DELIVERY_MODE == 'webhook':
+                        # Without it Telegram keeps delivering nowhere; retried like polling
+                        await set_bot_webhook(bot_instance, dp_instance)
                         break
-                    except Exception as e:
-                        retry_count += 1
-                        error_msg = str(e).lower()
-                        print(f"❌ Bot polling error (attempt {retry_count}): {e}")
-
-                        if "conflict" in error_msg or "terminated by other getupdates" in error_msg:
-                            wait_time = 30 + (15 * retry_count)  # Увеличиваем время ожидания
-                            print(f"🔄 Bot conflict detected - another instance is running")
-                            print(f"💡 Please stop all other bot instances (Railway, other Replit tabs)")
-                            print(f"⏳ Waiting {wait_time} seconds before retry...")
-                            if retry_count < max_retries:
-                                await asyncio.sleep(wait_time)
-                            else:
-                                print("❌ Max retries reached. Bot conflict persists.")
-                                print("🛑 Web app will continue working without bot polling.")
-                                break
-                        elif retry_count >= max_retries:
-                            print(f"❌ Max retries reached. Bot polling failed: {e}")
-                            break
-                        else:
-                            await asyncio.sleep(10)
-
-            # Create bot task but don't wait for it
-            bot_task = asyncio.create_task(start_bot_polling())
-
-            # Keep the web server running indefinitely
-            print("✅ Replit setup complete - keeping web server alive...")
-            try:
-                while True:
-                    await asyncio.sleep(30)
-                    # Check if bot task is still running
-                    if bot_task.done():
-                        exception = bot_task.exception()
-                        if exception:
-                            print(f"🔄 Bot task finished with error: {exception}")
-                        else:
-                            print("✅ Bot task completed")
-                        # Don't restart bot task to avoid conflicts
-            except asyncio.CancelledError:
-                print("🛑 Main loop cancelled")
-                if not bot_task.done():
-                    bot_task.cancel()
-                    try:
-                        await bot_task
-                    except asyncio.CancelledError:
-                        pass
-            except Exception as e:
-                print(f"❌ Main loop error: {e}")
-                # Keep web server running despite errors
-                while True:
-                    await asyncio.sleep(60)
+
+                    # Only needed when switching from webhook mode; pending updates are kept
+                    await bot_instance.delete_webhook(drop_pending_updates=False)
+
+                    bot_username = await bot_metadata.get_username(bot_instance)
+                    print(f"🤖 Starting bot polling as @{bot_username}...")
+
+                    await dp_instance.start_polling(
+                        bot_instance,
+                        handle_signals=False,
+                        # chat_member is opt-in: Telegram only sends it when asked explicitly
+                        allowed_updates=dp_instance.resolve_used_update_types()
+                    )
+                    break
+                except asyncio.CancelledError:
+                    print("🛑 Bot updates cancelled")
+                    raise
+                except Exception as e:
+                    retry_count += 1
+                    # Leadership rules out a second poller here, so keep retrying;
+                    # a conflict means an instance without leader election is still running
+                    wait_time = min(60, 5 * retry_count)
+                    print(f"❌ Bot updates error ({BOT_DELIVERY_MODE}, attempt {retry_count}): {e}. Retrying in {wait_time}s")
+                    await asyncio.sleep(wait_time)
+
+        bot_task = None
+
+        async def on_leadership_change(is_leader):
+            """Singleton duties run on exactly one replica"""
+            nonlocal bot_task
+            if is_leader:
+                edit_scheduler.start(bot_instance)
+                outbox_worker.start(bot_instance)
+                draw_scheduler.start()
+                bot_task = asyncio.create_task(start_bot_updates())
+                return
+
+            if bot_task is not None and not bot_task.done():
+                bot_task.cancel()
+                await asyncio.gather(bot_task, return_exceptions=True)
+            bot_task = None
+            await draw_scheduler.close()
+            await outbox_worker.close()
+            await edit_scheduler.close()
+
+        # Button edits and outbox wake-ups from other processes/replicas go to the leader
+        event_bus.subscribe('button_edit', edit_scheduler.apply_forwarded)
+        event_bus.subscribe('outbox_wake', outbox_worker.apply_remote_wake)
+        event_bus.subscribe('draw_schedule', draw_scheduler.apply_remote_refresh)
+        subscribe_shared_events()
+        event_bus.start()
+
+        leader_election.on_change(on_leadership_change)
+        leader_election.start()
+
+        # Keep the web server running until SIGTERM/SIGINT
+        print("✅ Setup complete - keeping web server alive...")
+        await stop_event.wait()
+        print("📡 Shutdown signal received, draining...")
 
     except Exception as e:
         print(f"💥 Startup error: {e}")
@@ -369,19 +289,35 @@ async def main():
         if IS_RAILWAY:
             # On Railway, try to keep web server running
             print("🆘 Attempting to keep web server running...")
-            try:
-                while True:
-                    await asyncio.sleep(60)
-            except KeyboardInterrupt:
-                print("🛑 Forced shutdown")
+            await stop_event.wait()
         else:
             raise
     finally:
-        pass
+        # Leader duties first, while bot.session is still open for their last
+        # sends: stepping down runs the duty shutdown and hands leadership over
+        # at once. The closes below cover a startup that failed before that
+        await leader_election.close()
+        await draw_scheduler.close()
+        await outbox_worker.close()
+        await edit_scheduler.close()
+        if app_runner is not None:
+            # Stops accepting connections and waits for in-flight requests.
+            # The webhook handler closes bot.session here
+            await app_runner.cleanup()
+        await event_bus.close()
+        # Updates are no longer handled here; write the users still buffered
+        await user_buffer.close()
+        if bot_instance is not None:
+            await bot_instance.session.close()
+        await close_pool()
+        print("🛑 Shutdown complete")
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if WEB_WORKERS > 1:
+            run_supervisor(WEB_WORKERS, main)
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         print("Application stopped")
     except Exception as e:
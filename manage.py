@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import sys
+from database import create_pool, close_pool, acquire, check_participant_counts
+from migrate import run_migrations, load_migrations, get_applied_migrations
+
+async def migrate(list_only=False):
+    """Apply pending schema migrations (or list their status)"""
+    await create_pool()
+    try:
+        async with acquire() as conn:
+            if list_only:
+                applied = await get_applied_migrations(conn)
+                for migration in load_migrations():
+                    mark = "✅" if migration['version'] in applied else "⏳"
+                    print(f"{mark} {migration['version']:04d}_{migration['name']}")
+                return 0
+
+            newly_applied = await run_migrations(conn)
+    finally:
+        await close_pool()
+
+    if newly_applied:
+        print(f"✅ Applied migrations: {newly_applied}")
+    else:
+        print("✅ Database schema is up to date")
+    return 0
+
+async def check_counts(fix=False):
+    """Compare participants_count columns with the participant tables"""
+    await create_pool()
+    try:
+        mismatches = await check_participant_counts(fix=fix)
+    finally:
+        await close_pool()
+
+    if not mismatches:
+        print("✅ Participant counters are consistent")
+        return 0
+
+    for item in mismatches:
+        print(f"⚠️ {item['table']} #{item['id']}: stored={item['stored']}, actual={item['actual']}")
+
+    if fix:
+        print(f"🔧 Fixed {len(mismatches)} counter(s)")
+        return 0
+
+    print(f"❌ Found {len(mismatches)} inconsistent counter(s). Run with --fix to repair.")
+    return 1
+
+def main():
+    parser = argparse.ArgumentParser(description="PUBG Bot maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Apply pending schema migrations")
+    migrate_parser.add_argument("--list", action="store_true", help="Show applied and pending migrations")
+
+    counts_parser = subparsers.add_parser("check-counts", help="Re-derive participant counters and report drift")
+    counts_parser.add_argument("--fix", action="store_true", help="Overwrite drifted counters with the real counts")
+
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        return asyncio.run(migrate(list_only=args.list))
+
+    if args.command == "check-counts":
+        return asyncio.run(check_counts(fix=args.fix))
+
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import asyncio
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from config import MEMBERSHIP_INDEX_MAX_EVENTS
+from database import acquire
+from events import event_bus
+
+# kind -> participant ids of the event, no row if it doesn't accept participants
+LOAD_QUERIES = {
+    'giveaway': '''
+        SELECT (SELECT array_agg(gp.user_id ORDER BY gp.user_id)
+                FROM giveaway_participants gp WHERE gp.giveaway_id = g.id) AS user_ids
+        FROM giveaways g
+        WHERE g.id = $1 AND g.status IS DISTINCT FROM 'completed'
+    ''',
+    'tournament': '''
+        SELECT (SELECT array_agg(tp.user_id ORDER BY tp.user_id)
+                FROM tournament_participants tp WHERE tp.tournament_id = t.id) AS user_ids
+        FROM tournaments t
+        WHERE t.id = $1 AND COALESCE(NULLIF(t.registration_status, ''), t.status, 'open') <> 'closed'
+    ''',
+}
+
+class MembershipIndex:
+    """Participant user_ids of active giveaways and open tournaments.
+
+    Each event keeps a sorted array('q') (8 bytes per participant instead of
+    ~60 for a set of ints), loaded from the database on first use and
+    extended as users join. Concurrent loads of the same event share one
+    query. Participants are never removed from a running event, so a hit
+    is always right and a duplicate join can be answered without Postgres.
+    A miss, including a join seen only by another process, falls through
+    to the database. Completed/closed events are remembered as inactive so
+    their taps go straight to the database path. Events are dropped when
+    they complete, close or reopen, and at most `max_events` are kept
+    (least recently used go first).
+    """
+
+    def __init__(self, max_events=200):
+        self.max_events = max_events
+        self._members = OrderedDict()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    async def contains(self, kind, entity_id, user_id):
+        key = (kind, int(entity_id))
+        if key in self._members:
+            members = self._members[key]
+            self._members.move_to_end(key)
+        else:
+            try:
+                members = await self._load(key)
+            except Exception as e:
+                # The caller's database path decides instead
+                print(f"⚠️ Could not load participants of {key[0]} {key[1]}: {e}")
+                return False
+
+        if members is None:
+            # Inactive: the database path returns the right answer
+            return False
+
+        user_id = int(user_id)
+        index = bisect_left(members, user_id)
+        if index < len(members) and members[index] == user_id:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    async def _load(self, key):
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            async with acquire() as conn:
+                row = await conn.fetchrow(LOAD_QUERIES[key[0]], key[1])
+            members = array('q', row['user_ids'] or ()) if row is not None else None
+            self.loads += 1
+            self._store(key, members)
+            future.set_result(members)
+            return members
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a load nobody else waited on doesn't warn
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def _store(self, key, members):
+        self._members[key] = members
+        self._members.move_to_end(key)
+        while len(self._members) > self.max_events:
+            self._members.popitem(last=False)
+
+    def add(self, kind, entity_id, user_id):
+        """Record a confirmed participant; no-op if the event isn't loaded"""
+        members = self._members.get((kind, int(entity_id)))
+        if members is None:
+            # Not loaded or inactive
+            return
+        user_id = int(user_id)
+        index = bisect_left(members, user_id)
+        if index == len(members) or members[index] != user_id:
+            members.insert(index, user_id)
+
+    def drop(self, kind, entity_id):
+        """Forget an event whose status changed or that was deleted, here and in other processes"""
+        self._drop(kind, entity_id)
+        event_bus.publish_nowait('membership_drop', {"kind": kind, "entity_id": int(entity_id)})
+
+    def apply_remote_drop(self, data):
+        self._drop(data['kind'], data['entity_id'])
+
+    def _drop(self, kind, entity_id):
+        self._members.pop((kind, int(entity_id)), None)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "events": {
+                f"{kind}:{entity_id}": {
+                    "participants": len(members),
+                    "bytes": members.buffer_info()[1] * members.itemsize,
+                }
+                for (kind, entity_id), members in self._members.items()
+                if members is not None
+            },
+        }
+
+membership_index = MembershipIndex(MEMBERSHIP_INDEX_MAX_EVENTS)
@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+from config import MIGRATIONS_LOCK_TIMEOUT
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+# Advisory lock key shared by every replica running migrations
+MIGRATIONS_LOCK_ID = 724_001
+
+# First-line marker for files that must run outside a transaction
+# (CREATE INDEX CONCURRENTLY cannot run inside one)
+NO_TRANSACTION_MARKER = '-- migrate:no-transaction'
+
+MIGRATION_FILE_RE = re.compile(r'^(\d+)_(\w+)\.sql$')
+CONCURRENT_INDEX_RE = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)',
+    re.IGNORECASE
+)
+
+def load_migrations():
+    """Read migration files from migrations/ ordered by version number"""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE_RE.match(filename)
+        if not match:
+            continue
+
+        with open(os.path.join(MIGRATIONS_DIR, filename), 'r', encoding='utf-8') as f:
+            sql = f.read()
+
+        migrations.append({
+            "version": int(match.group(1)),
+            "name": match.group(2),
+            "sql": sql,
+            "checksum": hashlib.sha256(sql.encode('utf-8')).hexdigest(),
+            "transactional": not sql.lstrip().startswith(NO_TRANSACTION_MARKER),
+        })
+
+    migrations.sort(key=lambda m: m['version'])
+    return migrations
+
+def split_statements(sql):
+    """Split a no-transaction migration into single statements.
+
+    Only meant for simple DDL files (no functions or dollar quoting).
+    """
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    statements = [statement.strip() for statement in '\n'.join(lines).split(';')]
+    return [statement for statement in statements if statement]
+
+async def get_applied_migrations(conn):
+    """Return {version: checksum} of applied migrations"""
+    table_exists = await conn.fetchval("SELECT to_regclass('schema_migrations') IS NOT NULL")
+    if not table_exists:
+        return {}
+
+    rows = await conn.fetch('SELECT version, checksum FROM schema_migrations')
+    return {row['version']: row['checksum'] for row in rows}
+
+async def get_pending_migrations(conn):
+    applied = await get_applied_migrations(conn)
+    return [m for m in load_migrations() if m['version'] not in applied]
+
+async def drop_invalid_index(conn, statement):
+    """Drop an INVALID index left behind by an interrupted concurrent build"""
+    match = CONCURRENT_INDEX_RE.search(statement)
+    if not match:
+        return
+
+    index_name = match.group(1)
+    is_invalid = await conn.fetchval('''
+        SELECT NOT i.indisvalid
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = $1
+    ''', index_name)
+
+    if is_invalid:
+        print(f"🔧 Dropping invalid index {index_name} before rebuilding it")
+        await conn.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index_name}')
+
+async def apply_migration(conn, migration):
+    label = f"{migration['version']:04d}_{migration['name']}"
+    print(f"🔧 Applying migration {label}...")
+    started = time.monotonic()
+
+    if migration['transactional']:
+        async with conn.transaction():
+            await conn.execute(migration['sql'])
+            await conn.execute(
+                'INSERT INTO schema_migrations (version, name, checksum) VALUES ($1, $2, $3)',
+                migration['version'], migration['name'], migration['checksum']
+            )
+    else:
+        for statement in split_statements(migration['sql']):
+            await drop_invalid_index(conn, statement)
+            await conn.execute(statement)
+        await conn.execute(
+            'INSERT INTO schema_migrations (version, name, checksum) VALUES ($1, $2, $3)',
+            migration['version'], migration['name'], migration['checksum']
+        )
+
+    print(f"✅ Migration {label} applied in {time.monotonic() - started:.2f}s")
+
+async def acquire_migrations_lock(conn, timeout):
+    """Poll for the advisory lock instead of blocking on pg_advisory_lock.
+
+    A session blocked inside pg_advisory_lock() keeps a transaction open,
+    which CREATE INDEX CONCURRENTLY in the lock holder would wait on forever.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        if await conn.fetchval('SELECT pg_try_advisory_lock($1)', MIGRATIONS_LOCK_ID):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(1)
+
+async def run_migrations(conn, lock_timeout=MIGRATIONS_LOCK_TIMEOUT):
+    """Apply pending migrations under an advisory lock.
+
+    Returns the list of applied versions. When everything is up to date this
+    costs a single SELECT and no DDL is executed.
+    """
+    migrations = load_migrations()
+    applied = await get_applied_migrations(conn)
+
+    for migration in migrations:
+        checksum = applied.get(migration['version'])
+        if checksum and checksum != migration['checksum']:
+            print(f"⚠️ Migration {migration['version']:04d}_{migration['name']} changed after it was applied")
+
+    if all(m['version'] in applied for m in migrations):
+        return []
+
+    print("⏳ Waiting for migrations lock...")
+    if not await acquire_migrations_lock(conn, lock_timeout):
+        raise Exception(f"❌ Could not acquire migrations lock within {lock_timeout}s")
+
+    try:
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Another replica may have applied some of them while we waited
+        applied = await get_applied_migrations(conn)
+        newly_applied = []
+        for migration in migrations:
+            if migration['version'] in applied:
+                continue
+            await apply_migration(conn, migration)
+            newly_applied.append(migration['version'])
+
+        return newly_applied
+    finally:
+        await conn.execute('SELECT pg_advisory_unlock($1)', MIGRATIONS_LOCK_ID)
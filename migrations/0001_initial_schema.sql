@@ -0,0 +1,77 @@
+-- Baseline schema. Everything is IF NOT EXISTS so databases created by the
+-- old init_db() are adopted as-is.
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id BIGINT PRIMARY KEY,
+    username TEXT,
+    first_name TEXT,
+    last_name TEXT,
+    is_subscribed BOOLEAN DEFAULT FALSE,
+    registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS giveaways (
+    id SERIAL PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT,
+    end_date TIMESTAMP,
+    is_active BOOLEAN DEFAULT TRUE,
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    message_id BIGINT,
+    winners_count INTEGER DEFAULT 1,
+    status TEXT DEFAULT 'active'
+);
+
+ALTER TABLE giveaways ADD COLUMN IF NOT EXISTS status TEXT DEFAULT 'active';
+ALTER TABLE giveaways ADD COLUMN IF NOT EXISTS message_id BIGINT;
+ALTER TABLE giveaways ADD COLUMN IF NOT EXISTS winners_count INTEGER DEFAULT 1;
+
+CREATE TABLE IF NOT EXISTS giveaway_participants (
+    id SERIAL PRIMARY KEY,
+    giveaway_id INTEGER REFERENCES giveaways(id),
+    user_id BIGINT,
+    UNIQUE(giveaway_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS giveaway_prizes (
+    id SERIAL PRIMARY KEY,
+    giveaway_id INTEGER REFERENCES giveaways(id),
+    place INTEGER,
+    prize TEXT
+);
+
+CREATE TABLE IF NOT EXISTS giveaway_winners (
+    id SERIAL PRIMARY KEY,
+    giveaway_id INTEGER REFERENCES giveaways(id),
+    user_id BIGINT REFERENCES users(user_id),
+    place INTEGER,
+    name TEXT,
+    username TEXT,
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS tournaments (
+    id SERIAL PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT,
+    start_date TEXT,
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    winners_count INTEGER DEFAULT 1,
+    registration_status TEXT DEFAULT 'open',
+    status TEXT DEFAULT 'open',
+    message_id BIGINT
+);
+
+ALTER TABLE tournaments ADD COLUMN IF NOT EXISTS status TEXT DEFAULT 'open';
+
+CREATE TABLE IF NOT EXISTS tournament_participants (
+    id SERIAL PRIMARY KEY,
+    tournament_id INTEGER REFERENCES tournaments(id),
+    user_id BIGINT REFERENCES users(user_id),
+    age INTEGER,
+    phone_brand TEXT,
+    nickname TEXT,
+    game_id TEXT,
+    registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(tournament_id, user_id)
+);
@@ -0,0 +1,67 @@
+-- Denormalized participant counters.
+-- Inserts bump the counter inside the participation statement
+-- (database.join_giveaway / join_tournament); deletes are handled by
+-- statement-level triggers so bulk cleanups cost one UPDATE per statement.
+-- The backfill recomputes absolute values, so re-running it is safe.
+
+ALTER TABLE giveaways ADD COLUMN IF NOT EXISTS participants_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE tournaments ADD COLUMN IF NOT EXISTS participants_count INTEGER NOT NULL DEFAULT 0;
+
+-- The ALTER locks above keep new participants out until the backfill commits
+UPDATE giveaways g
+SET participants_count = c.participant_count
+FROM (
+    SELECT giveaway_id, COUNT(*) AS participant_count
+    FROM giveaway_participants
+    GROUP BY giveaway_id
+) c
+WHERE g.id = c.giveaway_id;
+
+UPDATE tournaments t
+SET participants_count = c.participant_count
+FROM (
+    SELECT tournament_id, COUNT(*) AS participant_count
+    FROM tournament_participants
+    GROUP BY tournament_id
+) c
+WHERE t.id = c.tournament_id;
+
+CREATE OR REPLACE FUNCTION giveaway_participants_count_on_delete() RETURNS trigger AS $$
+BEGIN
+    UPDATE giveaways g
+    SET participants_count = g.participants_count - d.removed
+    FROM (
+        SELECT giveaway_id, COUNT(*) AS removed
+        FROM removed_rows
+        GROUP BY giveaway_id
+    ) d
+    WHERE g.id = d.giveaway_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS giveaway_participants_count_on_delete ON giveaway_participants;
+CREATE TRIGGER giveaway_participants_count_on_delete
+    AFTER DELETE ON giveaway_participants
+    REFERENCING OLD TABLE AS removed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION giveaway_participants_count_on_delete();
+
+CREATE OR REPLACE FUNCTION tournament_participants_count_on_delete() RETURNS trigger AS $$
+BEGIN
+    UPDATE tournaments t
+    SET participants_count = t.participants_count - d.removed
+    FROM (
+        SELECT tournament_id, COUNT(*) AS removed
+        FROM removed_rows
+        GROUP BY tournament_id
+    ) d
+    WHERE t.id = d.tournament_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tournament_participants_count_on_delete ON tournament_participants;
+CREATE TRIGGER tournament_participants_count_on_delete
+    AFTER DELETE ON tournament_participants
+    REFERENCING OLD TABLE AS removed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tournament_participants_count_on_delete();
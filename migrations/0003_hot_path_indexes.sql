@@ -0,0 +1,19 @@
+-- migrate:no-transaction
+-- Indexes for columns the handlers filter and sort on. Built CONCURRENTLY so
+-- the tables stay writable; the runner drops half-built (INVALID) leftovers
+-- from an interrupted run before retrying.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tournament_participants_tournament_registration
+    ON tournament_participants (tournament_id, registration_date);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_giveaway_winners_giveaway
+    ON giveaway_winners (giveaway_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_giveaways_created_date
+    ON giveaways (created_date);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_giveaways_status
+    ON giveaways (status);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_is_subscribed
+    ON users (is_subscribed);
@@ -0,0 +1,5 @@
+-- When users.is_subscribed was last confirmed, either by a chat_member
+-- update from the channel or by a get_chat_member fallback. NULL means the
+-- stored flag has never been verified.
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS subscription_updated_at TIMESTAMP;
@@ -0,0 +1,21 @@
+-- Channel announcements waiting to be sent. Rows are written in the same
+-- transaction as the giveaway/tournament they announce and drained by the
+-- outbox worker. idempotency_key keeps one announcement per event.
+
+CREATE TABLE IF NOT EXISTS outbox (
+    id SERIAL PRIMARY KEY,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    entity_id INTEGER,
+    payload JSONB NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_until TIMESTAMP,
+    last_error TEXT,
+    message_id BIGINT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox (available_at) WHERE status = 'pending';
@@ -0,0 +1,10 @@
+-- Which replica currently owns the singleton duties (bot polling, outbox,
+-- scheduled draws, button edits). Ownership itself is the advisory lock
+-- held by that replica; this row only makes it visible to the others.
+
+CREATE TABLE IF NOT EXISTS leader_lease (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    acquired_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    renewed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,27 @@
+-- migrate:no-transaction
+-- Composite indexes matching the keyset-paginated list endpoints: each
+-- page is an index range scan from the cursor, whatever the page number.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_giveaways_created_id
+    ON giveaways (created_date DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_giveaways_status_created_id
+    ON giveaways (status, created_date DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tournaments_created_id
+    ON tournaments (created_date DESC, id DESC);
+
+-- Same expression the handlers use for the effective registration status
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tournaments_reg_status_created_id
+    ON tournaments ((COALESCE(NULLIF(registration_status, ''), status, 'open')), created_date DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_giveaway_participants_giveaway_id
+    ON giveaway_participants (giveaway_id, id);
+
+-- Supersedes (tournament_id, registration_date) from 0003 with an id tie-breaker
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tournament_participants_tournament_registration_id
+    ON tournament_participants (tournament_id, registration_date, id);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_tournament_participants_tournament_registration;
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_giveaways_created_date;
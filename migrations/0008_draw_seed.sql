@@ -0,0 +1,6 @@
+-- Seed of the winner draw. The winners are the participants with the
+-- lowest sha256(seed || ':' || user_id), so the draw can be recomputed
+-- from the seed and the participant list.
+
+ALTER TABLE giveaways ADD COLUMN IF NOT EXISTS draw_seed TEXT;
+ALTER TABLE giveaways ADD COLUMN IF NOT EXISTS drawn_at TIMESTAMP;
@@ -0,0 +1,7 @@
+-- migrate:no-transaction
+-- Deadlines of giveaways that still have to be drawn, read by the
+-- auto-draw scheduler on start and on every resync.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_giveaways_pending_end_date
+    ON giveaways (end_date)
+    WHERE end_date IS NOT NULL AND status IS DISTINCT FROM 'completed';
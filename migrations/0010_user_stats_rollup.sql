@@ -0,0 +1,90 @@
+-- Rollup of the users counters shown on the admin dashboard, so the stats
+-- endpoint never scans users. Statement-level triggers apply the delta of
+-- each write; statements that change no counter (profile updates,
+-- ON CONFLICT DO NOTHING) leave the rollup alone, so they don't queue up on
+-- its locks. The counters are spread over 16 slot rows and each trigger
+-- updates the slot of its backend (pg_backend_pid() % 16), so first-time
+-- users joining a giveaway from different pooled connections don't wait on
+-- one row lock until their participation commits. Readers sum the slots.
+-- The backfill recomputes absolute values, so re-running it is safe.
+
+CREATE TABLE IF NOT EXISTS user_stats_slots (
+    slot SMALLINT PRIMARY KEY CHECK (slot >= 0 AND slot < 16),
+    total_users BIGINT NOT NULL DEFAULT 0,
+    subscribed_users BIGINT NOT NULL DEFAULT 0
+);
+
+-- Keep writers out until the backfill and the triggers are committed
+LOCK TABLE users IN SHARE ROW EXCLUSIVE MODE;
+
+-- Absolute values go to slot 0, the other slots start at zero
+INSERT INTO user_stats_slots (slot, total_users, subscribed_users)
+SELECT s.slot,
+       CASE WHEN s.slot = 0 THEN c.total_users ELSE 0 END,
+       CASE WHEN s.slot = 0 THEN c.subscribed_users ELSE 0 END
+FROM generate_series(0, 15) AS s(slot),
+     (SELECT COUNT(*) AS total_users,
+             COUNT(*) FILTER (WHERE is_subscribed IS TRUE) AS subscribed_users
+      FROM users) c
+ON CONFLICT (slot) DO UPDATE SET
+    total_users = EXCLUDED.total_users,
+    subscribed_users = EXCLUDED.subscribed_users;
+
+CREATE OR REPLACE FUNCTION user_stats_on_insert() RETURNS trigger AS $$
+BEGIN
+    UPDATE user_stats_slots s
+    SET total_users = s.total_users + d.added,
+        subscribed_users = s.subscribed_users + d.subscribed
+    FROM (
+        SELECT COUNT(*) AS added, COUNT(*) FILTER (WHERE is_subscribed IS TRUE) AS subscribed
+        FROM new_rows
+    ) d
+    WHERE s.slot = pg_backend_pid() % 16 AND d.added > 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS user_stats_on_insert ON users;
+CREATE TRIGGER user_stats_on_insert
+    AFTER INSERT ON users
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION user_stats_on_insert();
+
+CREATE OR REPLACE FUNCTION user_stats_on_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE user_stats_slots s
+    SET subscribed_users = s.subscribed_users + d.delta
+    FROM (
+        SELECT (SELECT COUNT(*) FROM new_rows WHERE is_subscribed IS TRUE)
+             - (SELECT COUNT(*) FROM old_rows WHERE is_subscribed IS TRUE) AS delta
+    ) d
+    WHERE s.slot = pg_backend_pid() % 16 AND d.delta <> 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS user_stats_on_update ON users;
+CREATE TRIGGER user_stats_on_update
+    AFTER UPDATE ON users
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION user_stats_on_update();
+
+CREATE OR REPLACE FUNCTION user_stats_on_delete() RETURNS trigger AS $$
+BEGIN
+    UPDATE user_stats_slots s
+    SET total_users = s.total_users - d.removed,
+        subscribed_users = s.subscribed_users - d.subscribed
+    FROM (
+        SELECT COUNT(*) AS removed, COUNT(*) FILTER (WHERE is_subscribed IS TRUE) AS subscribed
+        FROM removed_rows
+    ) d
+    WHERE s.slot = pg_backend_pid() % 16 AND d.removed > 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS user_stats_on_delete ON users;
+CREATE TRIGGER user_stats_on_delete
+    AFTER DELETE ON users
+    REFERENCING OLD TABLE AS removed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION user_stats_on_delete();
@@ -0,0 +1,10 @@
+-- migrate:no-transaction
+-- The giveaways list filters on the effective status, COALESCE(status,
+-- 'active'), so rows without a status are listed as active. Same
+-- expression as web_app.GIVEAWAY_STATUS_SQL; supersedes the plain status
+-- index from 0007.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_giveaways_effective_status_created_id
+    ON giveaways ((COALESCE(status, 'active')), created_date DESC, id DESC);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_giveaways_status_created_id;
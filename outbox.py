@@ -0,0 +1,211 @@
+import asyncio
+import json
+import random
+from aiogram.exceptions import TelegramRetryAfter, TelegramBadRequest
+from config import OUTBOX_CONCURRENCY, OUTBOX_MAX_ATTEMPTS, OUTBOX_POLL_INTERVAL, OUTBOX_LEASE_SECONDS
+from database import acquire
+from response_cache import response_cache
+from events import event_bus
+
+# Channel posts whose message_id is written back to the announced entity
+WRITE_BACK_TABLES = {
+    'giveaway_post': 'giveaways',
+    'tournament_post': 'tournaments',
+}
+
+MAX_RETRY_DELAY = 600
+
+async def enqueue_announcement(conn, kind, entity_id, payload, idempotency_key):
+    """Queue a channel announcement inside the caller's transaction.
+
+    Returns False if an announcement with the same key already exists.
+    """
+    outbox_id = await conn.fetchval('''
+        INSERT INTO outbox (idempotency_key, kind, entity_id, payload)
+        VALUES ($1, $2, $3, $4::jsonb)
+        ON CONFLICT (idempotency_key) DO NOTHING
+        RETURNING id
+    ''', idempotency_key, kind, entity_id, json.dumps(payload))
+    return outbox_id is not None
+
+class OutboxWorker:
+    """Sends queued channel announcements from the outbox table.
+
+    Rows are claimed with FOR UPDATE SKIP LOCKED and a lease, so several
+    workers never send the same row and a crashed worker's rows are picked
+    up again once the lease expires. Failed sends are retried with
+    exponential backoff (or after Telegram's retry_after) up to
+    `max_attempts`. A post is skipped if its entity already has a
+    message_id or was deleted.
+    """
+
+    def __init__(self, concurrency=4, max_attempts=8, poll_interval=5.0, lease_seconds=120):
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.bot = None
+        self._senders = {}
+        self._task = None
+        self._wakeup = None
+        self.sent = 0
+        self.skipped = 0
+        self.retries = 0
+        self.failed = 0
+
+    def register(self, kind, sender):
+        """`sender(bot, entity_id, payload)` posts and returns the sent Message"""
+        self._senders[kind] = sender
+
+    def start(self, bot):
+        self.bot = bot
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def wake(self):
+        """Check the outbox now instead of at the next poll"""
+        if self._task is not None:
+            self._wakeup.set()
+        else:
+            # The worker runs in the leader (bot) process
+            event_bus.publish_nowait('outbox_wake', {})
+
+    def apply_remote_wake(self, data):
+        if self._task is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                rows = await self._claim()
+            except Exception as e:
+                print(f"⚠️ Outbox claim error: {e}")
+                rows = []
+
+            if rows:
+                results = await asyncio.gather(*(self._deliver(row) for row in rows), return_exceptions=True)
+                for row, result in zip(rows, results):
+                    # The row's lease runs out and it is claimed again
+                    if isinstance(result, Exception):
+                        print(f"⚠️ Outbox #{row['id']} bookkeeping error: {result}")
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self):
+        async with acquire() as conn:
+            return await conn.fetch('''
+                UPDATE outbox
+                SET locked_until = CURRENT_TIMESTAMP + make_interval(secs => $2),
+                    attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM outbox
+                    WHERE status = 'pending'
+                      AND available_at <= CURRENT_TIMESTAMP
+                      AND (locked_until IS NULL OR locked_until < CURRENT_TIMESTAMP)
+                    ORDER BY id
+                    LIMIT $1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, kind, entity_id, payload, attempts
+            ''', self.concurrency, float(self.lease_seconds))
+
+    async def _deliver(self, row):
+        kind = row['kind']
+        table = WRITE_BACK_TABLES.get(kind)
+        try:
+            sender = self._senders.get(kind)
+            if sender is None:
+                raise RuntimeError(f"No sender registered for outbox kind '{kind}'")
+
+            if table:
+                async with acquire() as conn:
+                    entity = await conn.fetchrow(f'SELECT message_id FROM {table} WHERE id = $1', row['entity_id'])
+                if entity is None:
+                    await self._finish(row, 'cancelled')
+                    self.skipped += 1
+                    return
+                if entity['message_id']:
+                    # Already posted (e.g. the previous attempt's row update was lost)
+                    await self._finish(row, 'sent', entity['message_id'])
+                    self.skipped += 1
+                    return
+
+            message = await sender(self.bot, row['entity_id'], json.loads(row['payload']))
+        except TelegramRetryAfter as e:
+            await self._retry(row, e, e.retry_after)
+        except TelegramBadRequest as e:
+            # The request itself is wrong; sending it again will not help
+            await self._fail(row, e)
+        except Exception as e:
+            await self._retry(row, e)
+        else:
+            await self._finish(row, 'sent', message.message_id)
+            self.sent += 1
+            print(f"✅ Outbox #{row['id']} ({kind}) sent with message ID {message.message_id}")
+
+    async def _finish(self, row, status, message_id=None):
+        table = WRITE_BACK_TABLES.get(row['kind'])
+        async with acquire() as conn:
+            async with conn.transaction():
+                await conn.execute('''
+                    UPDATE outbox
+                    SET status = $2, message_id = $3, locked_until = NULL,
+                        sent_at = CASE WHEN $2 = 'sent' THEN CURRENT_TIMESTAMP END
+                    WHERE id = $1
+                ''', row['id'], status, message_id)
+                if table and message_id:
+                    await conn.execute(
+                        f'UPDATE {table} SET message_id = $1 WHERE id = $2 AND message_id IS NULL',
+                        message_id, row['entity_id']
+                    )
+        if table and message_id:
+            response_cache.invalidate(table)
+
+    async def _retry(self, row, error, delay=None):
+        if row['attempts'] >= self.max_attempts:
+            await self._fail(row, error)
+            return
+
+        if delay is None:
+            delay = min(MAX_RETRY_DELAY, 2 ** row['attempts']) * random.uniform(0.5, 1.5)
+        self.retries += 1
+        print(f"⚠️ Outbox #{row['id']} ({row['kind']}) attempt {row['attempts']} failed: {error}. Retry in {delay:.0f}s")
+
+        async with acquire() as conn:
+            await conn.execute('''
+                UPDATE outbox
+                SET available_at = CURRENT_TIMESTAMP + make_interval(secs => $2),
+                    locked_until = NULL, last_error = $3
+                WHERE id = $1
+            ''', row['id'], float(delay), str(error))
+
+    async def _fail(self, row, error):
+        self.failed += 1
+        print(f"❌ Outbox #{row['id']} ({row['kind']}) failed permanently: {error}")
+        async with acquire() as conn:
+            await conn.execute(
+                "UPDATE outbox SET status = 'failed', locked_until = NULL, last_error = $2 WHERE id = $1",
+                row['id'], str(error)
+            )
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self):
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "retries": self.retries,
+            "failed": self.failed,
+        }
+
+outbox_worker = OutboxWorker(OUTBOX_CONCURRENCY, OUTBOX_MAX_ATTEMPTS, OUTBOX_POLL_INTERVAL, OUTBOX_LEASE_SECONDS)
@@ -0,0 +1,258 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter, TelegramServerError, TelegramNetworkError
+from aiogram.methods import GetUpdates
+from config import (
+    TELEGRAM_GLOBAL_RATE, TELEGRAM_PRIVATE_CHAT_RATE, TELEGRAM_GROUP_CHAT_RATE,
+    TELEGRAM_MAX_RETRIES, TELEGRAM_RETRY_BASE_DELAY,
+)
+
+# Lower value is served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# Methods that post or change messages count against per-chat limits
+MESSAGE_WRITE_PREFIXES = ('Send', 'Edit', 'Copy', 'Forward')
+
+# Long polling must never wait behind other calls
+UNTHROTTLED_METHODS = (GetUpdates,)
+
+WAIT_TIME_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        """Seconds until one token is available (0 if available now)"""
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def consume(self):
+        self.tokens -= 1
+
+    def block_for(self, seconds):
+        """Flood-wait from Telegram: hold the bucket for `seconds`"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    def is_idle(self, now):
+        return self.delay(now) == 0 and self.tokens >= self.capacity
+
+class TelegramRateLimiter(BaseRequestMiddleware):
+    """aiogram session middleware that schedules every outgoing Bot API call.
+
+    Calls wait for a token from the global bucket and, for message writes,
+    from a per-chat bucket. Waiting calls are served by priority:
+    user-facing calls (callback answers, private messages, membership
+    checks) go before channel posts and edits. TelegramRetryAfter holds the
+    affected bucket and retries. 5xx and network errors retry with
+    exponential backoff; network errors only for methods that are safe to
+    repeat. `chat_key` maps a chat_id to its bucket key, so one chat given
+    in two forms (@username and numeric id) shares a bucket.
+    """
+
+    def __init__(self, global_rate=30, private_chat_rate=1, group_chat_rate=20 / 60,
+                 max_retries=3, retry_base_delay=0.5):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.private_chat_rate = private_chat_rate
+        self.group_chat_rate = group_chat_rate
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.chat_key = lambda chat_id: chat_id
+        self._chat_buckets = {}
+        self._queue = []
+        self._sequence = itertools.count()
+        self._wakeup = None
+        self._dispatcher = None
+
+        self.requests = 0
+        self.max_queue_depth = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_histogram = [0] * (len(WAIT_TIME_BUCKETS) + 1)
+        self.retries = {"retry_after": 0, "server_error": 0, "network_error": 0}
+
+    async def __call__(self, make_request, bot, method):
+        if isinstance(method, UNTHROTTLED_METHODS):
+            return await make_request(bot, method)
+
+        attempt = 0
+        while True:
+            chat_bucket = await self._acquire(method)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt >= self.max_retries:
+                    raise
+                self.retries["retry_after"] += 1
+                print(f"⏳ Telegram flood control on {type(method).__name__}: retry in {e.retry_after}s")
+                (chat_bucket or self.global_bucket).block_for(e.retry_after)
+            except TelegramServerError:
+                if attempt >= self.max_retries:
+                    raise
+                self.retries["server_error"] += 1
+                await asyncio.sleep(self._backoff(attempt))
+            except TelegramNetworkError:
+                if attempt >= self.max_retries or not self._is_idempotent(method):
+                    raise
+                self.retries["network_error"] += 1
+                await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    def _backoff(self, attempt):
+        return self.retry_base_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    @staticmethod
+    def _is_message_write(method):
+        return type(method).__name__.startswith(MESSAGE_WRITE_PREFIXES)
+
+    @staticmethod
+    def _is_idempotent(method):
+        # A timed-out sendMessage may already have been delivered
+        name = type(method).__name__
+        return not name.startswith(('Send', 'Copy', 'Forward'))
+
+    @staticmethod
+    def _is_channel_or_group(chat_id):
+        if isinstance(chat_id, str):
+            return chat_id.startswith('@') or chat_id.startswith('-')
+        return chat_id < 0
+
+    def _priority(self, method):
+        if type(method).__name__.startswith('Edit'):
+            return PRIORITY_BACKGROUND
+        chat_id = getattr(method, 'chat_id', None)
+        if self._is_message_write(method) and chat_id is not None and self._is_channel_or_group(chat_id):
+            return PRIORITY_BACKGROUND
+        return PRIORITY_INTERACTIVE
+
+    def _chat_bucket(self, method):
+        if not self._is_message_write(method):
+            return None
+        chat_id = getattr(method, 'chat_id', None)
+        if chat_id is None:
+            return None
+
+        chat_id = self.chat_key(chat_id)
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            rate = self.group_chat_rate if self._is_channel_or_group(chat_id) else self.private_chat_rate
+            bucket = TokenBucket(rate, max(1, rate * 3))
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _acquire(self, method):
+        """Wait for the dispatcher to grant this call its tokens"""
+        loop = asyncio.get_running_loop()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = loop.create_task(self._dispatch())
+
+        chat_bucket = self._chat_bucket(method)
+        future = loop.create_future()
+        enqueued = time.monotonic()
+        heapq.heappush(self._queue, (self._priority(method), next(self._sequence), future, chat_bucket))
+        self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+        self._wakeup.set()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.done():
+                future.cancel()
+            raise
+
+        self._record_wait(time.monotonic() - enqueued)
+        return chat_bucket
+
+    async def _dispatch(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+
+            # Drop waiters that were cancelled while queued
+            if any(item[2].done() for item in self._queue):
+                self._queue = [item for item in self._queue if not item[2].done()]
+                heapq.heapify(self._queue)
+
+            next_delay = None
+            global_delay = self.global_bucket.delay(now)
+            if self._queue and global_delay == 0:
+                # Highest-priority waiter whose chat is not throttled
+                for item in sorted(self._queue):
+                    chat_bucket = item[3]
+                    chat_delay = chat_bucket.delay(now) if chat_bucket else 0
+                    if chat_delay == 0:
+                        self._queue.remove(item)
+                        heapq.heapify(self._queue)
+                        self.global_bucket.consume()
+                        if chat_bucket:
+                            chat_bucket.consume()
+                        self.requests += 1
+                        item[2].set_result(None)
+                        next_delay = 0
+                        break
+                    next_delay = chat_delay if next_delay is None else min(next_delay, chat_delay)
+            elif self._queue:
+                next_delay = global_delay
+
+            if next_delay == 0:
+                await asyncio.sleep(0)
+                continue
+
+            if len(self._chat_buckets) > 1000:
+                self._chat_buckets = {
+                    chat_id: bucket for chat_id, bucket in self._chat_buckets.items()
+                    if not bucket.is_idle(now)
+                }
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=next_delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _record_wait(self, waited):
+        self.wait_count += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        for index, bound in enumerate(WAIT_TIME_BUCKETS):
+            if waited <= bound:
+                self.wait_histogram[index] += 1
+                break
+        else:
+            self.wait_histogram[-1] += 1
+
+    def stats(self):
+        lower_bounds = (0,) + WAIT_TIME_BUCKETS[:-1]
+        labels = [f"{low}-{high}s" for low, high in zip(lower_bounds, WAIT_TIME_BUCKETS)]
+        labels.append(f"{WAIT_TIME_BUCKETS[-1]}s+")
+        return {
+            "queue_depth": len(self._queue),
+            "max_queue_depth": self.max_queue_depth,
+            "requests": self.requests,
+            "wait_avg": self.wait_total / self.wait_count if self.wait_count else 0.0,
+            "wait_max": self.wait_max,
+            "wait_histogram": dict(zip(labels, self.wait_histogram)),
+            "retries": dict(self.retries),
+            "throttled_chats": len(self._chat_buckets),
+        }
+
+rate_limiter = TelegramRateLimiter(
+    TELEGRAM_GLOBAL_RATE, TELEGRAM_PRIVATE_CHAT_RATE, TELEGRAM_GROUP_CHAT_RATE,
+    TELEGRAM_MAX_RETRIES, TELEGRAM_RETRY_BASE_DELAY
+)
@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from aiohttp import web
+from config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL, RESPONSE_CACHE_INVALIDATE_INTERVAL
+from events import event_bus
+from serialization import dumps
+
+class ResponseCache:
+    """In-process cache of serialized JSON responses with strong ETags.
+
+    Entries are keyed by route path + query string and tagged with the data
+    they depend on ('giveaways', 'tournaments'). Write handlers invalidate
+    by tag. Each tag has a generation counter so a response built from data
+    read before an invalidation is never stored after it.
+
+    Invalidations are broadcast over the event bus, so other processes and
+    replicas drop their copies too. invalidate() applies at once and is
+    meant for writes whose result the client reloads right away (create,
+    delete, draw, toggle). Participant counts go through
+    invalidate_counts(), which applies each tag at most once per
+    `invalidate_interval` seconds: the first join applies at once, later
+    ones in the window are folded into one invalidation at its end, so a
+    burst of joins costs a NOTIFY and a rebuilt list per window instead of
+    per join.
+    """
+
+    def __init__(self, max_entries=256, ttl=60, invalidate_interval=0.5):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.invalidate_interval = invalidate_interval
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._last_invalidated = {}
+        self._deferred = set()
+        self._deferred_handle = None
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self.deferred = 0
+
+    @staticmethod
+    def make_key(request):
+        return (request.path, request.query_string)
+
+    def snapshot(self, tags):
+        """Capture tag generations before reading the data for a response"""
+        return tuple(tags), tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def invalidate(self, *tags):
+        """Drop the tags' entries now, here and in other processes"""
+        tags = set(tags)
+        # A pending throttled invalidation of these tags is covered by this one
+        self._deferred -= tags
+        self._apply_invalidation(tags)
+
+    def invalidate_counts(self, *tags):
+        """Throttled invalidate() for participant count changes"""
+        now = time.monotonic()
+        immediate = set()
+        delay = 0
+        for tag in set(tags) - self._deferred:
+            elapsed = now - self._last_invalidated.get(tag, float('-inf'))
+            if elapsed >= self.invalidate_interval:
+                immediate.add(tag)
+            else:
+                self._deferred.add(tag)
+                self.deferred += 1
+                delay = max(delay, self.invalidate_interval - elapsed)
+
+        if immediate:
+            self._apply_invalidation(immediate)
+        if self._deferred and self._deferred_handle is None:
+            self._deferred_handle = asyncio.get_running_loop().call_later(delay, self._flush_deferred)
+
+    def _flush_deferred(self):
+        # May run with nothing left if invalidate() covered the tags meanwhile
+        tags, self._deferred = self._deferred, set()
+        self._deferred_handle = None
+        if tags:
+            self._apply_invalidation(tags)
+
+    def _apply_invalidation(self, tags):
+        now = time.monotonic()
+        for tag in tags:
+            self._last_invalidated[tag] = now
+        self._invalidate_local(tags)
+        event_bus.publish_nowait('cache_invalidate', {"tags": sorted(tags)})
+
+    def apply_remote_invalidation(self, data):
+        """Event bus handler for invalidations made by other processes"""
+        self._invalidate_local(data['tags'])
+
+    def _invalidate_local(self, tags):
+        tags = set(tags)
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+
+        stale_keys = [key for key, entry in self._entries.items() if entry['tags'] & tags]
+        for key in stale_keys:
+            del self._entries[key]
+        self.invalidations += 1
+
+    def get_response(self, request):
+        """Return a cached 200/304 response, or None on a miss"""
+        key = self.make_key(request)
+        entry = self._entries.get(key)
+
+        if entry is None or time.monotonic() - entry['stored_at'] > self.ttl:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._build_response(request, entry['body'], entry['etag'])
+
+    def response(self, request, data, snapshot):
+        """Serialize `data`, store it if the snapshot is still current and respond"""
+        body = dumps(data)
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+        tags, generations = snapshot
+        if generations == self.snapshot(tags)[1]:
+            key = self.make_key(request)
+            self._entries[key] = {
+                "body": body,
+                "etag": etag,
+                "tags": set(tags),
+                "stored_at": time.monotonic(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return self._build_response(request, body, etag)
+
+    def get_data(self, key):
+        """Payload stored with put_data(), or None on a miss.
+
+        For responses assembled from several cached parts (/api/bootstrap),
+        which can't reuse a serialized body
+        """
+        entry = self._entries.get(key)
+
+        if entry is None or time.monotonic() - entry['stored_at'] > self.ttl:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry['data']
+
+    def put_data(self, key, data, snapshot):
+        """Store a payload under the same tag/generation rules as responses"""
+        tags, generations = snapshot
+        if generations != self.snapshot(tags)[1]:
+            return
+        self._entries[key] = {
+            "data": data,
+            "tags": set(tags),
+            "stored_at": time.monotonic(),
+        }
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _build_response(self, request, body, etag):
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in [value.strip() for value in if_none_match.split(',')]:
+            self.not_modified += 1
+            return web.Response(status=304, headers=headers)
+
+        return web.Response(body=body, content_type='application/json', headers=headers)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+            "deferred_invalidations": self.deferred,
+        }
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL, RESPONSE_CACHE_INVALIDATE_INTERVAL)
@@ -0,0 +1,39 @@
+import datetime
+import decimal
+import orjson
+from aiohttp import web
+from asyncpg import Record
+
+def _default(value):
+    """Types orjson doesn't handle itself"""
+    if isinstance(value, Record):
+        return dict(value)
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(data):
+    """Encode to JSON bytes; asyncpg Records, datetimes and Decimals are handled"""
+    # orjson encodes datetimes itself, in the same format as isoformat()
+    return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+def json_response(data, status=200, headers=None):
+    """web.json_response() with the encoder above"""
+    return web.Response(body=dumps(data), status=status, headers=headers, content_type='application/json')
+
+class Projection:
+    """The fields one endpoint returns, as (JSON name, SQL expression) pairs.
+
+    `columns` is the SELECT list for the endpoint's query, so the rows
+    arrive already shaped (fallbacks and renames done in SQL) and encode()
+    builds each row's dict in one pass by position, instead of dict(record)
+    followed by per-field fix-ups in Python. It is still one dict per row.
+    """
+
+    def __init__(self, *fields):
+        self.names = tuple(name for name, _ in fields)
+        self.columns = ",\n".join(f"{expression} AS {name}" for name, expression in fields)
+
+    def encode(self, records):
+        names = self.names
+        return [dict(zip(names, record.values())) for record in records]
@@ -53,8 +53,16 @@ window.showTab = showTab;
 // Global variables
 let currentUser = null;
 let isAdmin = false;
+// Подписка на канал: true/false из /api/bootstrap или прошлой проверки, null - неизвестно
+let subscriptionStatus = null;
 let currentGiveawayId = null;
 let currentTournamentId = null;
+// Первые страницы списков из /api/bootstrap, показываются один раз без запроса
+let bootstrapLists = null;
+// Розыгрыши и турниры, в которых пользователь уже участвует
+const joinedGiveaways = new Set();
+const registeredTournaments = new Set();
+let appInitialization = null;
 
 // Initialize Telegram WebApp
 function initTelegramWebApp() {
@@ -70,32 +78,33 @@ function initTelegramWebApp() {
             console.log('✅ Telegram user data:', user);
             console.log('👤 User ID:', user.id);
             currentUser = user;
-            checkAdminStatus(user.id);
-            checkSubscription(user.id);
         } else {
             console.log('❌ No Telegram user data available');
             // Для разработки используем тестовый ID админа
             console.log('🔧 Using test admin ID for development');
-            currentUser = { id: 7541656937, first_name: 'Test Admin' };
-            checkAdminStatus(7541656937); // Первый ID из конфига
+            currentUser = { id: 7541656937, first_name: 'Test Admin' }; // Первый ID из конфига
         }
     } else {
         console.log('❌ Telegram WebApp not available - using test data');
         // Test data for development - используем реальный admin ID
-        currentUser = { id: 7541656937, first_name: 'Test Admin' };
-        checkAdminStatus(7541656937); // Первый ID из конфига
-        checkSubscription(7541656937);
+        currentUser = { id: 7541656937, first_name: 'Test Admin' }; // Первый ID из конфига
     }
 }
 
-// Initialize app
-async function initializeApp() {
+// Initialize app (once, even though both DOMContentLoaded and load call it)
+function initializeApp() {
+    if (!appInitialization) {
+        appInitialization = runInitializeApp();
+    }
+    return appInitialization;
+}
+
+async function runInitializeApp() {
     console.log('🔧 Initializing app...');
 
     if (currentUser) {
         console.log('👤 User:', currentUser);
-        await checkAdminStatus(currentUser.id);
-        await checkSubscription(currentUser.id);
+        await loadBootstrap(currentUser.id);
     }
 
     // Проверяем URL параметры для турнира
@@ -118,6 +127,51 @@ async function initializeApp() {
     console.log('✅ App initialized');
 }
 
+// Admin flag, subscription, first pages of the lists and the user's
+// participations in one request
+async function loadBootstrap(userId) {
+    try {
+        const response = await fetch(`/api/bootstrap?user_id=${encodeURIComponent(userId)}`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const data = await response.json();
+        console.log('📋 Bootstrap loaded:', data);
+
+        isAdmin = data.is_admin === true;
+        applyAdminStatus(userId);
+
+        subscriptionStatus = data.is_subscribed === true;
+        bootstrapLists = { giveaways: data.giveaways, tournaments: data.tournaments };
+        data.participations.giveaways.forEach(id => joinedGiveaways.add(id));
+        data.participations.tournaments.forEach(id => registeredTournaments.add(id));
+    } catch (error) {
+        console.error('❌ Error loading bootstrap, falling back to separate requests:', error);
+        await checkAdminStatus(userId);
+    }
+}
+
+// Show admin controls if the user is admin
+function applyAdminStatus(userId) {
+    const adminBtn = document.getElementById('admin-btn');
+    const adminTab = document.getElementById('admin-tab');
+
+    if (isAdmin) {
+        if (adminBtn) {
+            adminBtn.style.display = 'block';
+            console.log('✅ Admin button activated for user:', userId);
+        }
+
+        if (adminTab) {
+            adminTab.style.display = 'block';
+            console.log('✅ Admin tab activated for user:', userId);
+        }
+    } else {
+        console.log('❌ User is not admin:', userId);
+    }
+}
+
 // Check if user is admin
 async function checkAdminStatus(userId) {
     try {
@@ -136,22 +190,7 @@ async function checkAdminStatus(userId) {
         isAdmin = data.is_admin === true;
         console.log('✅ Admin check result:', isAdmin);
 
-        const adminBtn = document.getElementById('admin-btn');
-        const adminTab = document.getElementById('admin-tab');
-
-        if (isAdmin) {
-            if (adminBtn) {
-                adminBtn.style.display = 'block';
-                console.log('✅ Admin button activated for user:', userId);
-            }
-
-            if (adminTab) {
-                adminTab.style.display = 'block';
-                console.log('✅ Admin tab activated for user:', userId);
-            }
-        } else {
-            console.log('❌ User is not admin:', userId);
-        }
+        applyAdminStatus(userId);
     } catch (error) {
         console.error('❌ Error checking admin status:', error);
 
@@ -168,32 +207,62 @@ async function checkAdminStatus(userId) {
     }
 }
 
-// Check subscription status
+// Check subscription status. A confirmed subscription (from /api/bootstrap
+// or an earlier check) is reused; a negative one is re-checked with refresh,
+// since the user may have just subscribed
 async function checkSubscription(userId) {
+    if (subscriptionStatus === true) {
+        return true;
+    }
+
     try {
         const response = await fetch('/api/check-subscription', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ user_id: userId })
+            body: JSON.stringify({ user_id: userId, refresh: subscriptionStatus === false })
         });
         const data = await response.json();
-        return data.is_subscribed;
+        subscriptionStatus = data.is_subscribed === true;
+        return subscriptionStatus;
     } catch (error) {
         console.error('Error checking subscription:', error);
         return false;
     }
 }
 
-// Load giveaways
-async function loadGiveaways() {
-    try {
-        const response = await fetch('/api/giveaways');
+// Все элементы списка: проходит страницы по next_cursor.
+// firstPage - уже полученная первая страница (например, из /api/bootstrap)
+async function fetchAllListItems(url, firstPage = null) {
+    let page = firstPage;
+    if (!page) {
+        const response = await fetch(url);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        page = await response.json();
+    }
 
+    const items = [...page.items];
+    while (page.next_cursor) {
+        const response = await fetch(`${url}&after=${encodeURIComponent(page.next_cursor)}`);
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
+        page = await response.json();
+        items.push(...page.items);
+    }
+    return items;
+}
 
-        const giveaways = await response.json();
+// Load giveaways
+async function loadGiveaways() {
+    try {
+        const firstPage = bootstrapLists?.giveaways;
+        if (firstPage) {
+            bootstrapLists.giveaways = null;
+        }
+        // Обычные пользователи видят только активные розыгрыши
+        const giveaways = await fetchAllListItems(`/api/giveaways?status=${isAdmin ? 'all' : 'active'}`, firstPage);
 
         if (!Array.isArray(giveaways)) {
             throw new Error('Invalid giveaways data format');
@@ -231,11 +300,13 @@ async function loadGiveaways() {
                     <span class="status ${giveaway.status || 'active'}">${giveaway.status === 'completed' ? '✅ Завершен' : '⏳ Активен'}</span>
                 </div>
                 <div class="giveaway-actions">
-                    ${giveaway.status !== 'completed' ? `
+                    ${giveaway.status !== 'completed' ? (joinedGiveaways.has(giveaway.id) ? `
+                        <span class="joined-badge">✅ Вы участвуете</span>
+                    ` : `
                         <button onclick="participateGiveaway(${giveaway.id})" class="participate-btn">
                             🎮 Участвовать
                         </button>
-                    ` : ''}
+                    `) : ''}
                     ${isAdmin ? `
                         <div class="admin-controls">
                             ${giveaway.status !== 'completed' ? `
@@ -306,6 +377,7 @@ async function participateGiveaway(giveawayId) {
         console.log('📋 Server response:', result);
 
         if (result.success) {
+            joinedGiveaways.add(giveawayId);
             alert('✅ Вы успешно участвуете в розыгрыше!');
             await loadGiveaways(); // Обновляем список
         } else {
@@ -320,20 +392,13 @@ async function participateGiveaway(giveawayId) {
 // Load tournaments
 async function loadTournaments() {
     try {
-        const response = await fetch('/api/tournaments');
-        const tournaments = await response.json();
-        const container = document.getElementById('tournaments-list');
-
-        if (!tournaments || tournaments.length === 0) {
-            container.innerHTML = '<div class="empty-state">📝 Нет активных турниров</div>';
-            return;
+        const firstPage = bootstrapLists?.tournaments;
+        if (firstPage) {
+            bootstrapLists.tournaments = null;
         }
-
-        // Фильтруем турниры для обычных пользователей - показываем только с открытой регистрацией
-        const visibleTournaments = isAdmin ? tournaments : tournaments.filter(t => {
-            const status = t.registration_status || 'open';
-            return status === 'open';
-        });
+        // Обычные пользователи видят только турниры с открытой регистрацией
+        const visibleTournaments = await fetchAllListItems(`/api/tournaments?status=${isAdmin ? 'all' : 'open'}`, firstPage);
+        const container = document.getElementById('tournaments-list');
 
         if (visibleTournaments.length === 0) {
             container.innerHTML = '<div class="empty-state">📝 Нет доступных турниров</div>';
@@ -365,11 +430,13 @@ async function loadTournaments() {
                     <span class="status ${status}">${status === 'closed' ? '🔒 Закрыт' : '🔓 Открыт'}</span>
                 </div>
                 <div class="tournament-actions">
-                    ${status !== 'closed' ? `
+                    ${status !== 'closed' ? (registeredTournaments.has(tournament.id) ? `
+                        <span class="joined-badge">✅ Вы зарегистрированы</span>
+                    ` : `
                         <button onclick="showTournamentRegistration(${tournament.id})" class="participate-btn">
                             🏆 Регистрация
                         </button>
-                    ` : ''}
+                    `) : ''}
                     ${isAdmin ? `
                         <div class="admin-controls">
                             <button onclick="toggleTournamentRegistration(${tournament.id}, '${status}')" class="admin-btn-small toggle-btn">
@@ -509,6 +576,7 @@ async function registerTournament() {
         console.log(`📋 Response data:`, result);
 
         if (result.success) {
+            registeredTournaments.add(currentTournamentId);
             alert('✅ Вы успешно зарегистрированы в турнире!');
             await loadTournaments(); // Обновляем список
         } else {
@@ -634,7 +702,9 @@ async function createGiveaway() {
             body: JSON.stringify({
                 title,
                 description,
-                end_date: endDate,
+                // datetime-local is the admin's wall time; the server stores UTC
+                end_date: new Date(endDate).toISOString(),
+                end_date_local: endDate,
                 winners_count: winnersCount,
                 prizes: prizes
             })
@@ -858,32 +928,22 @@ async function viewTournamentParticipants(tournamentId) {
     `;
 
     try {
-        // Сначала получаем информацию о турнире
-        console.log(`🏆 Fetching tournament ${tournamentId} info...`);
-        const tournamentResponse = await fetch(`/api/tournaments/${tournamentId}`);
+        // Информация о турнире и первая страница участников одним запросом
+        console.log(`🏆 Fetching tournament ${tournamentId} with participants...`);
+        const response = await fetch(`/api/tournaments/${tournamentId}?include=tournament,participants`);
 
-        if (!tournamentResponse.ok) {
-            throw new Error(`Tournament not found: ${tournamentResponse.status}`);
+        if (!response.ok) {
+            throw new Error(`Tournament not found: ${response.status}`);
         }
 
-        const tournamentInfo = await tournamentResponse.json();
+        const detail = await response.json();
+        const tournamentInfo = detail.tournament;
+        const page = detail.participants;
+        const participants = page.items;
+        participantsCursor = page.next_cursor;
         console.log(`🏆 Tournament info:`, tournamentInfo);
-
-        // Теперь получаем участников
-        console.log(`👥 Fetching participants for tournament ${tournamentId}...`);
-        const participantsResponse = await fetch(`/api/tournaments/${tournamentId}/participants`);
-
-        if (!participantsResponse.ok) {
-            throw new Error(`Failed to load participants: ${participantsResponse.status}`);
-        }
-
-        const participants = await participantsResponse.json();
         console.log(`📊 Loaded ${participants.length} participants:`, participants);
 
-        if (!Array.isArray(participants)) {
-            throw new Error('Invalid participants data format');
-        }
-
         // Отображаем участников в админ-панели
         document.getElementById('admin-content').innerHTML = `
             <div class="participants-view">
@@ -893,7 +953,7 @@ async function viewTournamentParticipants(tournamentId) {
                 </div>
                 <div class="participants-stats">
                     <div class="stat-card">
-                        <div class="stat-number">${participants.length}</div>
+                        <div class="stat-number">${tournamentInfo.participants || participants.length}</div>
                         <div class="stat-label">Всего участников</div>
                     </div>
                 </div>
@@ -906,29 +966,13 @@ async function viewTournamentParticipants(tournamentId) {
                         <small>Статус регистрации: ${tournamentInfo.registration_status === 'open' ? '🔓 Открыта' : '🔒 Закрыта'}</small>
                     </div>
                 ` : `
-                    <div class="participants-list">
-                        ${participants.map((participant, index) => `
-                            <div class="participant-card">
-                                <div class="participant-number">${index + 1}</div>
-                                <div class="participant-info">
-                                    <div class="participant-name">${participant.first_name || participant.name || 'Без имени'}</div>
-                                    <div class="participant-details">
-                                        <span>🎮 ${participant.nickname || 'Не указан'}</span>
-                                        <span>🆔 ${participant.game_id || 'Не указан'}</span>
-                                        <span>📱 ${participant.phone_brand || 'Не указан'}</span>
-                                        <span>🎂 ${participant.age || 'Не указан'} лет</span>
-                                        ${participant.username ? `<span>👤 @${participant.username}</span>` : ''}
-                                        <span>👤 ID: ${participant.user_id}</span>
-                                    </div>
-                                    <div class="participant-date">
-                                        📅 ${participant.registration_date ? new Date(participant.registration_date).toLocaleDateString('ru-RU') : 'Дата не указана'}
-                                    </div>
-                                </div>
-                            </div>
-                        `).join('')}
+                    <div class="participants-list" id="participants-list">
+                        ${participants.map((participant, index) => renderParticipantCard(participant, index)).join('')}
                     </div>
+                    <button id="load-more-participants" onclick="loadMoreParticipants(${tournamentId})" class="admin-btn" style="display: ${page.next_cursor ? 'block' : 'none'}">⬇️ Загрузить ещё</button>
                     <div class="participants-actions">
                         <button onclick="exportParticipants(${tournamentId})" class="export-btn">📊 Экспортировать список</button>
+                        <button onclick="downloadParticipantsCsv(${tournamentId})" class="export-btn">⬇️ Скачать CSV</button>
                         <button onclick="announceWinners(${tournamentId})" class="announce-btn">🏆 Объявить победителей</button>
                         <button onclick="showTournamentParticipantsSelector()" class="cancel-btn">🔙 Назад к турнирам</button>
                     </div>
@@ -957,6 +1001,69 @@ async function viewTournamentParticipants(tournamentId) {
     }
 }
 
+// Курсор следующей страницы участников в открытом списке
+let participantsCursor = null;
+
+async function fetchParticipantsPage(tournamentId, after) {
+    const query = after ? `?after=${encodeURIComponent(after)}` : '';
+    const response = await fetch(`/api/tournaments/${tournamentId}/participants${query}`);
+
+    if (!response.ok) {
+        throw new Error(`Failed to load participants: ${response.status}`);
+    }
+
+    const page = await response.json();
+    if (!Array.isArray(page.items)) {
+        throw new Error('Invalid participants data format');
+    }
+
+    participantsCursor = page.next_cursor;
+    return page;
+}
+
+function renderParticipantCard(participant, index) {
+    return `
+        <div class="participant-card">
+            <div class="participant-number">${index + 1}</div>
+            <div class="participant-info">
+                <div class="participant-name">${participant.first_name || participant.name || 'Без имени'}</div>
+                <div class="participant-details">
+                    <span>🎮 ${participant.nickname || 'Не указан'}</span>
+                    <span>🆔 ${participant.game_id || 'Не указан'}</span>
+                    <span>📱 ${participant.phone_brand || 'Не указан'}</span>
+                    <span>🎂 ${participant.age || 'Не указан'} лет</span>
+                    ${participant.username ? `<span>👤 @${participant.username}</span>` : ''}
+                    <span>👤 ID: ${participant.user_id}</span>
+                </div>
+                <div class="participant-date">
+                    📅 ${participant.registration_date ? new Date(participant.registration_date).toLocaleDateString('ru-RU') : 'Дата не указана'}
+                </div>
+            </div>
+        </div>
+    `;
+}
+
+// Догружает следующую страницу участников в конец списка
+async function loadMoreParticipants(tournamentId) {
+    const button = document.getElementById('load-more-participants');
+    const list = document.getElementById('participants-list');
+    if (!participantsCursor || !list) return;
+
+    try {
+        button.disabled = true;
+        const offset = list.querySelectorAll('.participant-card').length;
+        const page = await fetchParticipantsPage(tournamentId, participantsCursor);
+
+        list.insertAdjacentHTML('beforeend', page.items.map((participant, index) => renderParticipantCard(participant, offset + index)).join(''));
+        button.style.display = page.next_cursor ? 'block' : 'none';
+    } catch (error) {
+        console.error('❌ Error loading more participants:', error);
+        alert('❌ Ошибка при загрузке участников: ' + error.message);
+    } finally {
+        button.disabled = false;
+    }
+}
+
 // Функция для объявления победителей
 async function announceWinners(tournamentId) {
     const winnersText = prompt('🏆 Введите список победителей:\n\nНапример:\n🥇 1 место: Никнейм1\n🥈 2 место: Никнейм2\n🥉 3 место: Никнейм3');
@@ -1008,13 +1115,22 @@ function exportParticipants(tournamentId) {
     }
 }
 
+// Полная выгрузка участников в CSV (формирует сервер, а не загруженные в DOM карточки)
+function downloadParticipantsCsv(tournamentId) {
+    const url = `${window.location.origin}/api/tournaments/${tournamentId}/participants.csv?gzip=1`;
+    if (window.Telegram?.WebApp?.openLink) {
+        window.Telegram.WebApp.openLink(url);
+    } else {
+        window.open(url, '_blank');
+    }
+}
+
 // Show tournament registration control panel
 async function showTournamentRegistrationControl() {
     document.getElementById('admin-content').innerHTML = '<div class="loading">Загрузка турниров...</div>';
 
     try {
-        const response = await fetch('/api/tournaments');
-        const tournaments = await response.json();
+        const tournaments = await fetchAllListItems('/api/tournaments?status=all');
 
         if (!tournaments || tournaments.length === 0) {
             document.getElementById('admin-content').innerHTML = `
@@ -1154,13 +1270,7 @@ async function showTournamentParticipantsSelector() {
     try {
         document.getElementById('admin-content').innerHTML = '<div class="loading">Загрузка турниров...</div>';
 
-        const response = await fetch('/api/tournaments');
-
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-
-        const tournaments = await response.json();
+        const tournaments = await fetchAllListItems('/api/tournaments?status=all');
         console.log('🏆 Loaded tournaments for participants view:', tournaments);
 
         if (!Array.isArray(tournaments) || tournaments.length === 0) {
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from collections import OrderedDict
+from config import (
+    SUBSCRIPTION_CACHE_MAX_ENTRIES, SUBSCRIPTION_CACHE_POSITIVE_TTL, SUBSCRIPTION_CACHE_NEGATIVE_TTL,
+)
+
+# chat_member statuses that count as being subscribed to the channel
+SUBSCRIBED_STATUSES = ('member', 'administrator', 'creator')
+
+class SubscriptionCache:
+    """Bounded LRU+TTL cache of channel membership per user.
+
+    Subscribed users are cached longer than unsubscribed ones, so somebody who
+    just joined the channel is not turned away for long. Concurrent lookups
+    for the same user share one in-flight Bot API call. Errors are never
+    cached.
+    """
+
+    def __init__(self, max_entries=10000, positive_ttl=300, negative_ttl=15):
+        self.max_entries = max_entries
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, user_id):
+        """Return the cached status or None if unknown/expired"""
+        user_id = int(user_id)
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+
+        is_subscribed, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[user_id]
+            return None
+
+        self._entries.move_to_end(user_id)
+        return is_subscribed
+
+    def set(self, user_id, is_subscribed):
+        user_id = int(user_id)
+        ttl = self.positive_ttl if is_subscribed else self.negative_ttl
+        self._entries[user_id] = (bool(is_subscribed), time.monotonic() + ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def apply_remote_update(self, data):
+        """Event bus handler: a chat_member update seen by the bot process"""
+        self.set(data['user_id'], data['is_subscribed'])
+
+    def invalidate(self, user_id):
+        """Forget a user's status, e.g. after a known membership change"""
+        user_id = int(user_id)
+        self._entries.pop(user_id, None)
+        # A lookup already in flight must not write its (now stale) answer back
+        self._inflight.pop(user_id, None)
+
+    async def get_or_load(self, user_id, loader):
+        """Return the cached status or call `loader()` once for all waiters"""
+        user_id = int(user_id)
+        is_subscribed = self.get(user_id)
+        if is_subscribed is not None:
+            self.hits += 1
+            return is_subscribed
+
+        task = self._inflight.get(user_id)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(user_id, loader))
+            self._inflight[user_id] = task
+        else:
+            self.coalesced += 1
+
+        # shield() lets the lookup finish for other waiters if this one is cancelled
+        return await asyncio.shield(task)
+
+    async def _load(self, user_id, loader):
+        task = asyncio.current_task()
+        try:
+            is_subscribed = await loader()
+            if self._inflight.get(user_id) is task:
+                self.set(user_id, is_subscribed)
+            return is_subscribed
+        finally:
+            if self._inflight.get(user_id) is task:
+                del self._inflight[user_id]
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+subscription_cache = SubscriptionCache(
+    SUBSCRIPTION_CACHE_MAX_ENTRIES, SUBSCRIPTION_CACHE_POSITIVE_TTL, SUBSCRIPTION_CACHE_NEGATIVE_TTL
+)
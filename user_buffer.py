@@ -0,0 +1,105 @@
+import asyncio
+from config import USER_BUFFER_FLUSH_INTERVAL, USER_BUFFER_MAX_ROWS
+from database import acquire
+
+UPSERT_USERS_SQL = '''
+    INSERT INTO users (user_id, username, first_name, last_name)
+    SELECT * FROM unnest($1::bigint[], $2::text[], $3::text[], $4::text[])
+    ON CONFLICT (user_id) DO UPDATE SET
+        username = EXCLUDED.username,
+        first_name = EXCLUDED.first_name,
+        last_name = EXCLUDED.last_name
+'''
+
+class UserUpsertBuffer:
+    """Write-behind buffer for users upserts from bot commands.
+
+    add() only records the user, so handlers reply without waiting for the
+    database. Pending rows are deduplicated by user_id (the latest profile
+    wins) and written with one unnest() upsert every `flush_interval`
+    seconds, or sooner once `max_rows` are waiting. A failed batch is kept
+    and retried with the next one; close() writes whatever is left.
+    """
+
+    def __init__(self, flush_interval=0.5, max_rows=500):
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self._pending = {}
+        self._task = None
+        self._full = None
+        self.added = 0
+        self.flushed = 0
+        self.batches = 0
+        self.errors = 0
+
+    def start(self):
+        self._full = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def add(self, user_id, username=None, first_name=None, last_name=None):
+        self._pending[user_id] = (username, first_name, last_name)
+        self.added += 1
+        if self._full is not None and len(self._pending) >= self.max_rows:
+            self._full.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        user_ids = list(batch)
+        try:
+            async with acquire() as conn:
+                await conn.execute(
+                    UPSERT_USERS_SQL,
+                    user_ids,
+                    [batch[user_id][0] for user_id in user_ids],
+                    [batch[user_id][1] for user_id in user_ids],
+                    [batch[user_id][2] for user_id in user_ids],
+                )
+        except asyncio.CancelledError:
+            # Shutting down mid-flush: close() writes the batch again
+            self._restore(batch)
+            raise
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Could not save {len(batch)} user(s), will retry: {e}")
+            self._restore(batch)
+            return
+
+        self.flushed += len(batch)
+        self.batches += 1
+
+    def _restore(self, batch):
+        # Rows added since the swap are newer than the failed ones
+        for user_id, profile in batch.items():
+            self._pending.setdefault(user_id, profile)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        if self._pending:
+            print(f"❌ {len(self._pending)} user(s) were not saved on shutdown")
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "added": self.added,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
+
+user_buffer = UserUpsertBuffer(USER_BUFFER_FLUSH_INTERVAL, USER_BUFFER_MAX_ROWS)
@@ -2,12 +2,33 @@ from aiohttp import web, ClientSession
 import json
 import os
 import asyncio
-from config import BOT_TOKEN, CHANNEL_ID, ADMIN_IDS, WEB_APP_URL
-import random
-from datetime import datetime
+from config import (
+    BOT_TOKEN, CHANNEL_ID, ADMIN_IDS, WEB_APP_URL, BOT_DELIVERY_MODE,
+    SUBSCRIPTION_STATE_MAX_AGE, SUBSCRIPTION_CACHE_NEGATIVE_TTL,
+)
+from datetime import datetime, timezone
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from database import USE_POSTGRESQL, DATABASE_PUBLIC_URL
-import asyncpg
+from database import (
+    USE_POSTGRESQL, acquire, join_giveaway, join_tournament,
+    get_subscription_state, update_subscription_status,
+)
+from response_cache import response_cache
+from subscription_cache import subscription_cache, SUBSCRIBED_STATUSES
+from edit_scheduler import edit_scheduler
+from keyboards import giveaway_participate_keyboard
+from rate_limiter import rate_limiter
+from bot_client import bot_metadata
+from outbox import enqueue_announcement, outbox_worker
+from draw import draw_giveaway
+from auto_draw import draw_scheduler
+from membership import membership_index
+from user_buffer import user_buffer
+from admin_stats import admin_stats
+from serialization import json_response, Projection
+from assets import AssetStore
+from webhook import register_webhook_handler
+from events import event_bus
+from leader import leader_election
 
 # Database helper functions
 async def db_execute_query(query, params=None):
@@ -27,9 +48,8 @@ async def db_execute_update(query, params=None):
 async def handle_postgresql_query(query, params):
     """Handle SELECT queries for PostgreSQL"""
     try:
-        conn = await asyncpg.connect(DATABASE_PUBLIC_URL)
-        result = await conn.fetch(query, *(params or []))
-        await conn.close()
+        async with acquire() as conn:
+            result = await conn.fetch(query, *(params or []))
         # Convert asyncpg records to list of dicts
         return [dict(record) for record in result]
     except Exception as e:
@@ -39,106 +59,276 @@ async def handle_postgresql_query(query, params):
 async def handle_postgresql_update(query, params):
     """Handle INSERT/UPDATE/DELETE queries for PostgreSQL"""
     try:
-        conn = await asyncpg.connect(DATABASE_PUBLIC_URL)
-        if 'RETURNING id' in query.upper():
-            result = await conn.fetchval(query, *(params or []))
-        else:
-            await conn.execute(query, *(params or []))
-            result = None
-        await conn.close()
+        async with acquire() as conn:
+            if 'RETURNING id' in query.upper():
+                result = await conn.fetchval(query, *(params or []))
+            else:
+                await conn.execute(query, *(params or []))
+                result = None
         return result
     except Exception as e:
         print(f"PostgreSQL update error: {e}")
         return None
 
-async def index_handler(request):
-    """Serve the main index.html file"""
-    import os
+# Keyset pagination: ?after=<cursor>&limit=N, response {"items": [...], "next_cursor": ...}
+LIST_PAGE_SIZE = 50
+PARTICIPANTS_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+GIVEAWAY_STATUS_FILTERS = ('active', 'completed', 'all')
+TOURNAMENT_STATUS_FILTERS = ('open', 'closed', 'all')
+
+# Effective giveaway status: rows without one are active (indexed, see migrations/0011)
+GIVEAWAY_STATUS_SQL = "COALESCE(g.status, 'active')"
+
+# Effective registration status of a tournament (indexed, see migrations/0007)
+TOURNAMENT_REG_STATUS_SQL = "COALESCE(NULLIF(t.registration_status, ''), t.status, 'open')"
+
+GIVEAWAY_FIELDS = Projection(
+    ('id', 'g.id'),
+    ('title', 'g.title'),
+    ('description', 'g.description'),
+    # Stored as UTC wall time; sent with its offset so browsers show local time
+    ('end_date', "g.end_date AT TIME ZONE 'UTC'"),
+    ('is_active', 'g.is_active'),
+    ('created_date', 'g.created_date'),
+    ('message_id', 'g.message_id'),
+    ('winners_count', 'g.winners_count'),
+    ('status', 'g.status'),
+    ('participants', 'g.participants_count'),
+    ('draw_seed', 'g.draw_seed'),
+    ('drawn_at', 'g.drawn_at'),
+)
+
+TOURNAMENT_FIELDS = Projection(
+    ('id', 't.id'),
+    ('title', 't.title'),
+    ('description', 't.description'),
+    ('start_date', 't.start_date'),
+    ('created_date', 't.created_date'),
+    ('winners_count', 't.winners_count'),
+    ('registration_status', TOURNAMENT_REG_STATUS_SQL),
+    ('status', 't.status'),
+    ('message_id', 't.message_id'),
+    ('participants', 't.participants_count'),
+)
+
+GIVEAWAY_PARTICIPANT_FIELDS = Projection(
+    ('id', 'gp.id'),
+    ('user_id', 'gp.user_id'),
+    ('username', 'u.username'),
+    ('first_name', 'u.first_name'),
+    ('last_name', 'u.last_name'),
+)
+
+TOURNAMENT_PARTICIPANT_FIELDS = Projection(
+    ('id', 'tp.id'),
+    ('user_id', 'tp.user_id'),
+    ('age', 'tp.age'),
+    ('phone_brand', 'tp.phone_brand'),
+    ('nickname', 'tp.nickname'),
+    ('game_id', 'tp.game_id'),
+    ('registration_date', 'tp.registration_date'),
+    ('username', 'u.username'),
+    ('first_name', "COALESCE(NULLIF(u.first_name, ''), 'User ' || tp.user_id)"),
+    ('last_name', 'u.last_name'),
+)
+
+# Sections of GET /api/tournaments/{id}?include=...
+TOURNAMENT_DETAIL_SECTIONS = ('tournament', 'count', 'participants')
+
+def parse_page_limit(request, default):
     try:
-        # Попробуем найти файл в static папке
-        static_path = os.path.join(os.getcwd(), 'static', 'index.html')
-        if os.path.exists(static_path):
-            with open(static_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return web.Response(text=content, content_type='text/html')
-        else:
-            print(f"❌ index.html not found at: {static_path}")
-            raise FileNotFoundError("index.html not found")
-    except FileNotFoundError:
-        return web.json_response({
+        limit = int(request.query.get('limit', default))
+    except ValueError:
+        raise web.HTTPBadRequest(text='Invalid limit')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def parse_cursor(request):
+    """`after=<ISO timestamp>,<id>` -> (datetime, id), or None for the first page.
+    An empty timestamp stands for a row whose timestamp is NULL; one with a UTC
+    offset is converted to naive UTC, like the TIMESTAMP columns it is compared with"""
+    after = request.query.get('after')
+    if not after:
+        return None
+    try:
+        timestamp, row_id = after.rsplit(',', 1)
+        row_id = int(row_id)
+        if not timestamp:
+            return None, row_id
+        timestamp = datetime.fromisoformat(timestamp)
+    except ValueError:
+        raise web.HTTPBadRequest(text='Invalid cursor')
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp, row_id
+
+def make_cursor(timestamp, row_id):
+    return f"{timestamp.isoformat() if timestamp is not None else ''},{row_id}"
+
+def keyset_condition(timestamp_column, id_column, cursor, params, descending):
+    """WHERE condition for the rows after `cursor` in ORDER BY timestamp, id.
+
+    Follows Postgres' default NULL placement: NULL timestamps sort first
+    in DESC order and last in ASC order, so they are neither skipped nor
+    repeated when a page ends on or before them
+    """
+    timestamp, row_id = cursor
+    op = '<' if descending else '>'
+    if timestamp is None:
+        params.append(row_id)
+        nulls = f"{timestamp_column} IS NULL AND {id_column} {op} ${len(params)}"
+        return f"(({nulls}) OR {timestamp_column} IS NOT NULL)" if descending else f"({nulls})"
+
+    params.extend((timestamp, row_id))
+    after = f"({timestamp_column}, {id_column}) {op} (${len(params) - 1}, ${len(params)})"
+    return after if descending else f"({after} OR {timestamp_column} IS NULL)"
+
+def parse_status_filter(request, allowed):
+    status = request.query.get('status', allowed[0])
+    if status not in allowed:
+        raise web.HTTPBadRequest(text=f"status must be one of: {', '.join(allowed)}")
+    return status
+
+def parse_include(request, allowed):
+    """`include=a,b` -> ('a', 'b'), or None when the parameter is absent"""
+    include = request.query.get('include')
+    if include is None:
+        return None
+    sections = tuple(dict.fromkeys(part.strip() for part in include.split(',') if part.strip()))
+    if not sections or any(section not in allowed for section in sections):
+        raise web.HTTPBadRequest(text=f"include must be a list of: {', '.join(allowed)}")
+    return sections
+
+def page_response(rows, limit, cursor_of):
+    """Split off the extra row fetched to detect a next page"""
+    items = rows[:limit]
+    next_cursor = cursor_of(items[-1]) if len(rows) > limit else None
+    return items, next_cursor
+
+async def index_handler(request):
+    """Serve the main index.html file (from memory, see assets.py)"""
+    index = request.app['assets'].index
+    if index is None:
+        return json_response({
             "message": "PUBG Bot Web App",
             "status": "running",
             "endpoints": ["/health", "/api/giveaways", "/api/tournaments"]
         })
+    return index.respond(request)
 
 async def health_handler(request):
-    return web.json_response({"status": "ok", "message": "Bot is running"})
+    # In-memory only (refreshed by every election round): a busy pool must
+    # not fail the platform health check
+    return json_response({"status": "ok", "message": "Bot is running", "leader": leader_election.local_state()})
+
+async def metrics_handler(request):
+    """In-process cache counters"""
+    return json_response({
+        "response_cache": response_cache.stats(),
+        "subscription_cache": subscription_cache.stats(),
+        "button_edits": edit_scheduler.stats(),
+        "telegram_rate_limiter": rate_limiter.stats(),
+        "telegram_latency": request.app['bot'].session.stats(),
+        "outbox": outbox_worker.stats(),
+        "auto_draw": draw_scheduler.stats(),
+        "membership": membership_index.stats(),
+        "user_buffer": user_buffer.stats(),
+        "webhook": request.app['webhook_handler'].stats() if 'webhook_handler' in request.app else None,
+        "events": event_bus.stats(),
+    })
+
+async def load_giveaways_page(status, limit, cursor=None):
+    """One page of the giveaways list as {"items", "next_cursor"}"""
+    conditions, params = [], []
+    if status != 'all':
+        params.append(status)
+        conditions.append(f"{GIVEAWAY_STATUS_SQL} = ${len(params)}")
+    if cursor:
+        conditions.append(keyset_condition('g.created_date', 'g.id', cursor, params, descending=True))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params.append(limit + 1)
+
+    # Participant counts are maintained on the giveaways row itself.
+    # Query directly so DB errors become a 500 instead of a cached empty list
+    async with acquire() as conn:
+        records = await conn.fetch(f"""
+            SELECT {GIVEAWAY_FIELDS.columns}
+            FROM giveaways g
+            {where}
+            ORDER BY g.created_date DESC, g.id DESC
+            LIMIT ${len(params)}
+        """, *params)
+    records, next_cursor = page_response(records, limit, lambda r: make_cursor(r['created_date'], r['id']))
+    return {"items": GIVEAWAY_FIELDS.encode(records), "next_cursor": next_cursor}
+
+async def load_tournaments_page(status, limit, cursor=None):
+    """One page of the tournaments list as {"items", "next_cursor"}"""
+    conditions, params = [], []
+    if status != 'all':
+        params.append(status)
+        conditions.append(f"{TOURNAMENT_REG_STATUS_SQL} = ${len(params)}")
+    if cursor:
+        conditions.append(keyset_condition('t.created_date', 't.id', cursor, params, descending=True))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params.append(limit + 1)
+
+    # Participant counts are maintained on the tournaments row itself.
+    # Query directly so DB errors become a 500 instead of a cached empty list
+    async with acquire() as conn:
+        records = await conn.fetch(f"""
+            SELECT {TOURNAMENT_FIELDS.columns}
+            FROM tournaments t
+            {where}
+            ORDER BY t.created_date DESC, t.id DESC
+            LIMIT ${len(params)}
+        """, *params)
+    records, next_cursor = page_response(records, limit, lambda r: make_cursor(r['created_date'], r['id']))
+    return {"items": TOURNAMENT_FIELDS.encode(records), "next_cursor": next_cursor}
 
 async def get_giveaways_handler(request):
+    cached = response_cache.get_response(request)
+    if cached is not None:
+        return cached
+
+    status = parse_status_filter(request, GIVEAWAY_STATUS_FILTERS)
+    limit = parse_page_limit(request, LIST_PAGE_SIZE)
+    cursor = parse_cursor(request)
+
     try:
-        # Get all giveaways with participant count in one query
-        giveaways = await db_execute_query("""
-            SELECT g.*, 
-                   COALESCE(p.participant_count, 0) as participants
-            FROM giveaways g
-            LEFT JOIN (
-                SELECT giveaway_id, COUNT(*) as participant_count 
-                FROM giveaway_participants 
-                GROUP BY giveaway_id
-            ) p ON g.id = p.giveaway_id
-            ORDER BY g.created_date DESC
-        """)
-
-        # Fix datetime serialization
-        for giveaway in giveaways:
-            # Convert datetime objects to strings for JSON serialization
-            if giveaway.get('created_date'):
-                giveaway['created_date'] = giveaway['created_date'].isoformat() if hasattr(giveaway['created_date'], 'isoformat') else str(giveaway['created_date'])
-            if giveaway.get('end_date'):
-                giveaway['end_date'] = giveaway['end_date'].isoformat() if hasattr(giveaway['end_date'], 'isoformat') else str(giveaway['end_date'])
-
-        print(f"📋 Loaded {len(giveaways)} giveaways")
-        return web.json_response(giveaways)
+        snapshot = response_cache.snapshot(('giveaways',))
+        page = await load_giveaways_page(status, limit, cursor)
+
+        print(f"📋 Loaded {len(page['items'])} giveaways")
+        return response_cache.response(request, page, snapshot)
 
     except Exception as e:
         print(f"❌ Error getting giveaways: {e}")
         import traceback
         traceback.print_exc()
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
 async def get_tournaments_handler(request):
+    cached = response_cache.get_response(request)
+    if cached is not None:
+        return cached
+
+    status = parse_status_filter(request, TOURNAMENT_STATUS_FILTERS)
+    limit = parse_page_limit(request, LIST_PAGE_SIZE)
+    cursor = parse_cursor(request)
+
     try:
-        # Get all tournaments with participant count in one query
-        tournaments = await db_execute_query("""
-            SELECT t.*, 
-                   COALESCE(p.participant_count, 0) as participants
-            FROM tournaments t
-            LEFT JOIN (
-                SELECT tournament_id, COUNT(*) as participant_count 
-                FROM tournament_participants 
-                GROUP BY tournament_id
-            ) p ON t.id = p.tournament_id
-            ORDER BY t.created_date DESC
-        """)
-
-        # Fix datetime serialization and ensure all fields are present
-        for tournament in tournaments:
-            # Convert datetime objects to strings for JSON serialization
-            if tournament.get('created_date'):
-                tournament['created_date'] = tournament['created_date'].isoformat() if hasattr(tournament['created_date'], 'isoformat') else str(tournament['created_date'])
-
-            # Ensure registration_status field exists
-            if not tournament.get('registration_status'):
-                tournament['registration_status'] = tournament.get('status', 'open')
-
-        print(f"🏆 Loaded {len(tournaments)} tournaments")
-        return web.json_response(tournaments)
+        snapshot = response_cache.snapshot(('tournaments',))
+        page = await load_tournaments_page(status, limit, cursor)
+
+        print(f"🏆 Loaded {len(page['items'])} tournaments")
+        return response_cache.response(request, page, snapshot)
 
     except Exception as e:
         print(f"❌ Error getting tournaments: {e}")
         import traceback
         traceback.print_exc()
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
 async def create_giveaway_handler(request):
     try:
@@ -148,19 +338,20 @@ async def create_giveaway_handler(request):
 
         # Validate required fields
         if not data.get('title'):
-            return web.json_response({"error": "Название розыгрыша обязательно"}, status=400)
+            return json_response({"error": "Название розыгрыша обязательно"}, status=400)
 
-        # Parse end_date to proper datetime for PostgreSQL
+        # Parse end_date to a naive UTC datetime for PostgreSQL (the column has no timezone)
         end_date = None
         if data.get('end_date'):
             try:
-                from datetime import datetime
-                # Handle different date formats
+                # Handle different date formats; values without an offset are taken as UTC
                 date_str = data['end_date']
                 if 'T' not in date_str:
                     date_str += 'T00:00:00'
-                end_date = datetime.fromisoformat(date_str.replace('Z', ''))
-                print(f"📅 Parsed end_date: {end_date}")
+                end_date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+                if end_date.tzinfo is not None:
+                    end_date = end_date.astimezone(timezone.utc).replace(tzinfo=None)
+                print(f"📅 Parsed end_date (UTC): {end_date}")
             except Exception as date_error:
                 print(f"⚠️ Date parsing error: {date_error}")
                 # Set to None if parsing fails
@@ -175,35 +366,41 @@ async def create_giveaway_handler(request):
 
         print(f"🎯 Creating giveaway: title={data['title']}, winners={winners_count}, end_date={end_date}")
 
-        # Use proper PostgreSQL INSERT with RETURNING
-        conn = await asyncpg.connect(DATABASE_PUBLIC_URL)
-        giveaway_id = await conn.fetchval('''
-            INSERT INTO giveaways (title, description, end_date, winners_count, status, created_date)
-            VALUES ($1, $2, $3, $4, $5, CURRENT_TIMESTAMP) RETURNING id
-        ''', data['title'], data.get('description', ''), end_date, winners_count, 'active')
-        await conn.close()
+        # The giveaway and its channel post are committed together
+        async with acquire() as conn:
+            async with conn.transaction():
+                giveaway_id = await conn.fetchval('''
+                    INSERT INTO giveaways (title, description, end_date, winners_count, status, created_date)
+                    VALUES ($1, $2, $3, $4, $5, CURRENT_TIMESTAMP) RETURNING id
+                ''', data['title'], data.get('description', ''), end_date, winners_count, 'active')
+
+                await enqueue_announcement(conn, 'giveaway_post', giveaway_id, {
+                    "title": data['title'],
+                    "description": data.get('description', ''),
+                    # The admin's own wall time reads better in the channel than UTC
+                    "end_date": data.get('end_date_local') or data.get('end_date', ''),
+                    "winners_count": winners_count,
+                }, f"giveaway_post:{giveaway_id}")
 
         if giveaway_id:
             print(f"✅ Giveaway created with ID: {giveaway_id}")
+            response_cache.invalidate('giveaways')
+            if end_date:
+                draw_scheduler.refresh(giveaway_id)
 
-            # Отправляем сообщение в канал
-            try:
-                await send_giveaway_to_channel(request.app['bot'], giveaway_id, data)
-                print(f"✅ Giveaway {giveaway_id} sent to channel")
-            except Exception as channel_error:
-                print(f"⚠️ Error sending to channel: {channel_error}")
-                # Don't fail the creation if channel sending fails
+            # Сообщение в канал отправит outbox worker
+            outbox_worker.wake()
 
-            return web.json_response({"success": True, "giveaway_id": giveaway_id})
+            return json_response({"success": True, "giveaway_id": giveaway_id})
         else:
             print("❌ Failed to create giveaway - no ID returned")
-            return web.json_response({"error": "Failed to create giveaway"}, status=500)
+            return json_response({"error": "Failed to create giveaway"}, status=500)
 
     except Exception as e:
         print(f"❌ Error creating giveaway: {e}")
         import traceback
         traceback.print_exc()
-        return web.json_response({"error": f"Ошибка создания розыгрыша: {str(e)}"}, status=500)
+        return json_response({"error": f"Ошибка создания розыгрыша: {str(e)}"}, status=500)
 
 async def create_tournament_handler(request):
     try:
@@ -213,49 +410,51 @@ async def create_tournament_handler(request):
 
         # Validate required fields
         if not data.get('title'):
-            return web.json_response({"error": "Название турнира обязательно"}, status=400)
+            return json_response({"error": "Название турнира обязательно"}, status=400)
 
         # Get registration status
         registration_open = data.get('registration_open', True)
         status = 'open' if registration_open else 'closed'
 
-        # Use direct PostgreSQL connection for better error handling
-        conn = await asyncpg.connect(DATABASE_PUBLIC_URL)
-        tournament_id = await conn.fetchval('''
-            INSERT INTO tournaments (title, description, start_date, winners_count, status, registration_status, created_date)
-            VALUES ($1, $2, $3, $4, $5, $6, CURRENT_TIMESTAMP) RETURNING id
-        ''', data['title'], data.get('description', ''), data.get('start_date', ''), data.get('winners_count', 1), status, status)
-        await conn.close()
+        # The tournament and its channel post are committed together
+        async with acquire() as conn:
+            async with conn.transaction():
+                tournament_id = await conn.fetchval('''
+                    INSERT INTO tournaments (title, description, start_date, winners_count, status, registration_status, created_date)
+                    VALUES ($1, $2, $3, $4, $5, $6, CURRENT_TIMESTAMP) RETURNING id
+                ''', data['title'], data.get('description', ''), data.get('start_date', ''), data.get('winners_count', 1), status, status)
+
+                await enqueue_announcement(conn, 'tournament_post', tournament_id, {
+                    "title": data['title'],
+                    "description": data.get('description', ''),
+                    "start_date": data.get('start_date', ''),
+                    "winners_count": data.get('winners_count', 1),
+                }, f"tournament_post:{tournament_id}")
 
         if tournament_id:
             print(f"✅ Tournament created with ID: {tournament_id}")
+            response_cache.invalidate('tournaments')
 
-            # Отправляем сообщение в канал
-            try:
-                await send_tournament_to_channel(request.app['bot'], tournament_id, data)
-                print(f"✅ Tournament {tournament_id} sent to channel")
-            except Exception as channel_error:
-                print(f"⚠️ Error sending tournament to channel: {channel_error}")
+            # Сообщение в канал отправит outbox worker
+            outbox_worker.wake()
 
-            return web.json_response({"success": True, "tournament_id": tournament_id})
+            return json_response({"success": True, "tournament_id": tournament_id})
         else:
             print("❌ Failed to create tournament - no ID returned")
-            return web.json_response({"error": "Failed to create tournament"}, status=500)
+            return json_response({"error": "Failed to create tournament"}, status=500)
 
     except Exception as e:
         print(f"❌ Error creating tournament: {e}")
         import traceback
         traceback.print_exc()
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
 async def delete_giveaway_handler(request):
     try:
         giveaway_id = int(request.match_info['giveaway_id'])
 
         # Используем транзакцию для удаления всех связанных записей
-        conn = await asyncpg.connect(DATABASE_PUBLIC_URL)
-
-        try:
+        async with acquire() as conn:
             async with conn.transaction():
                 # Удаляем участников розыгрыша
                 await conn.execute('DELETE FROM giveaway_participants WHERE giveaway_id = $1', giveaway_id)
@@ -271,22 +470,21 @@ async def delete_giveaway_handler(request):
 
                 print(f"✅ Giveaway {giveaway_id} and all related data deleted successfully")
 
-        finally:
-            await conn.close()
+        response_cache.invalidate('giveaways')
+        draw_scheduler.refresh(giveaway_id)
+        membership_index.drop('giveaway', giveaway_id)
 
-        return web.json_response({"success": True})
+        return json_response({"success": True})
     except Exception as e:
         print(f"❌ Error deleting giveaway: {e}")
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
 async def delete_tournament_handler(request):
     try:
         tournament_id = int(request.match_info['tournament_id'])
 
         # Используем транзакцию для удаления всех связанных записей
-        conn = await asyncpg.connect(DATABASE_PUBLIC_URL)
-
-        try:
+        async with acquire() as conn:
             async with conn.transaction():
                 # Удаляем участников турнира
                 await conn.execute('DELETE FROM tournament_participants WHERE tournament_id = $1', tournament_id)
@@ -296,244 +494,251 @@ async def delete_tournament_handler(request):
 
                 print(f"✅ Tournament {tournament_id} and all related data deleted successfully")
 
-        finally:
-            await conn.close()
+        response_cache.invalidate('tournaments')
+        membership_index.drop('tournament', tournament_id)
 
-        return web.json_response({"success": True})
+        return json_response({"success": True})
     except Exception as e:
         print(f"❌ Error deleting tournament: {e}")
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
+
+# Participant CSV exports: (entity table, COPY query with the entity id as $1)
+CSV_EXPORTS = {
+    'giveaway': ('giveaways', '''
+        SELECT gp.user_id, u.username, u.first_name, u.last_name
+        FROM giveaway_participants gp
+        LEFT JOIN users u ON gp.user_id = u.user_id
+        WHERE gp.giveaway_id = $1
+        ORDER BY gp.id
+    '''),
+    'tournament': ('tournaments', '''
+        SELECT tp.user_id, u.username, u.first_name, u.last_name,
+               tp.nickname, tp.game_id, tp.phone_brand, tp.age, tp.registration_date
+        FROM tournament_participants tp
+        LEFT JOIN users u ON tp.user_id = u.user_id
+        WHERE tp.tournament_id = $1
+        ORDER BY tp.registration_date, tp.id
+    '''),
+}
+
+async def stream_participants_csv(request, kind, entity_id):
+    """Stream `COPY (...) TO STDOUT` into a chunked response.
+
+    Postgres renders the CSV and chunks go to the client as they arrive, so
+    memory use does not depend on the number of rows. `?gzip=1` compresses
+    the stream if the client accepts gzip.
+    """
+    table, query = CSV_EXPORTS[kind]
+    async with acquire() as conn:
+        if not await conn.fetchval(f'SELECT EXISTS (SELECT 1 FROM {table} WHERE id = $1)', entity_id):
+            return json_response({"error": f"{kind.capitalize()} not found"}, status=404)
+
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/csv; charset=utf-8',
+            'Content-Disposition': f'attachment; filename="{kind}_{entity_id}_participants.csv"',
+        })
+        if request.query.get('gzip') == '1' and 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response.enable_compression(web.ContentCoding.gzip)
+        await response.prepare(request)
+        # BOM so Excel opens Cyrillic names as UTF-8
+        await response.write('\ufeff'.encode('utf-8'))
 
-async def get_tournament_handler(request):
-    """Get specific tournament information"""
+        # Headers are already sent: a failure here can only cut the download short
+        await conn.copy_from_query(query, entity_id, output=response.write, format='csv', header=True)
+
+    await response.write_eof()
+    print(f"📊 Exported {kind} {entity_id} participants as CSV")
+    return response
+
+async def export_giveaway_participants_handler(request):
     try:
-        tournament_id = int(request.match_info['tournament_id'])
+        giveaway_id = int(request.match_info['giveaway_id'])
+    except ValueError:
+        raise web.HTTPBadRequest(text='Invalid giveaway id')
+    return await stream_participants_csv(request, 'giveaway', giveaway_id)
 
-        # Get tournament with participant count
-        tournament = await db_execute_query("""
-            SELECT t.*, 
-                   COALESCE(p.participant_count, 0) as participants
+async def export_tournament_participants_handler(request):
+    try:
+        tournament_id = int(request.match_info['tournament_id'])
+    except ValueError:
+        raise web.HTTPBadRequest(text='Invalid tournament id')
+    return await stream_participants_csv(request, 'tournament', tournament_id)
+
+async def load_tournament_detail(tournament_id, sections, limit=PARTICIPANTS_PAGE_SIZE, cursor=None):
+    """The requested sections of one tournament in a single query, None if it doesn't exist.
+
+    The participant page is a LATERAL join on the tournament row: one row
+    per participant, or a single row of NULLs when there are none, so a
+    missing tournament is simply no rows. Sections that aren't requested
+    add neither columns nor joins. The count is the participants_count
+    column, which registrations bump in their own statement.
+    """
+    columns, params = [], [tournament_id]
+    participants_join = order_by = ""
+    if 'tournament' in sections:
+        columns.append(TOURNAMENT_FIELDS.columns)
+    if 'count' in sections:
+        columns.append('t.participants_count AS participants_count')
+    if 'participants' in sections:
+        after_cursor = ""
+        if cursor:
+            after_cursor = "AND " + keyset_condition('tp.registration_date', 'tp.id', cursor, params, descending=False)
+        params.append(limit + 1)
+        columns.append('p.*')
+        # first_name falls back to "User <id>" in the projection
+        participants_join = f"""
+            LEFT JOIN LATERAL (
+                SELECT {TOURNAMENT_PARTICIPANT_FIELDS.columns}
+                FROM tournament_participants tp
+                LEFT JOIN users u ON tp.user_id = u.user_id
+                WHERE tp.tournament_id = t.id {after_cursor}
+                ORDER BY tp.registration_date ASC, tp.id ASC
+                LIMIT ${len(params)}
+            ) p ON TRUE
+        """
+        order_by = "ORDER BY p.registration_date ASC, p.id ASC"
+
+    async with acquire() as conn:
+        records = await conn.fetch(f"""
+            SELECT {', '.join(columns)}
             FROM tournaments t
-            LEFT JOIN (
-                SELECT tournament_id, COUNT(*) as participant_count 
-                FROM tournament_participants 
-                GROUP BY tournament_id
-            ) p ON t.id = p.tournament_id
+            {participants_join}
             WHERE t.id = $1
-        """, [tournament_id])
+            {order_by}
+        """, *params)
 
-        if not tournament:
-            return web.json_response({"error": "Tournament not found"}, status=404)
+    if not records:
+        return None
+
+    # Columns come in section order; split each row by position
+    rows = [tuple(record.values()) for record in records]
+    detail, offset = {}, 0
+    if 'tournament' in sections:
+        names = TOURNAMENT_FIELDS.names
+        detail['tournament'] = dict(zip(names, rows[0][offset:offset + len(names)]))
+        offset += len(names)
+    if 'count' in sections:
+        detail['participants_count'] = rows[0][offset]
+        offset += 1
+    if 'participants' in sections:
+        names = TOURNAMENT_PARTICIPANT_FIELDS.names
+        id_column = offset + names.index('id')
+        items = [dict(zip(names, row[offset:])) for row in rows if row[id_column] is not None]
+        items, next_cursor = page_response(items, limit, lambda p: make_cursor(p['registration_date'], p['id']))
+        detail['participants'] = {"items": items, "next_cursor": next_cursor}
+
+    return detail
+
+async def get_tournament_handler(request):
+    """Get specific tournament information.
+
+    Without `include` the response is the tournament itself. With
+    `include=tournament,count,participants` (any subset) it is an object
+    with those sections; `limit` sizes the participant page, later pages
+    come from /participants?after=<next_cursor>.
+    """
+    include = parse_include(request, TOURNAMENT_DETAIL_SECTIONS)
+    limit = parse_page_limit(request, PARTICIPANTS_PAGE_SIZE)
 
-        tournament_data = tournament[0]
+    try:
+        tournament_id = int(request.match_info['tournament_id'])
 
-        # Fix datetime serialization
-        if tournament_data.get('created_date'):
-            tournament_data['created_date'] = tournament_data['created_date'].isoformat() if hasattr(tournament_data['created_date'], 'isoformat') else str(tournament_data['created_date'])
+        detail = await load_tournament_detail(tournament_id, include or ('tournament',), limit)
 
-        # Ensure registration_status field exists
-        if not tournament_data.get('registration_status'):
-            tournament_data['registration_status'] = tournament_data.get('status', 'open')
+        if detail is None:
+            return json_response({"error": "Tournament not found"}, status=404)
 
-        print(f"🏆 Tournament {tournament_id} info loaded: status={tournament_data.get('registration_status')}")
-        return web.json_response(tournament_data)
+        print(f"🏆 Tournament {tournament_id} loaded: {', '.join(detail)}")
+        if include is None:
+            return json_response(detail['tournament'])
+        return json_response(detail)
 
     except Exception as e:
         print(f"❌ Error getting tournament: {e}")
         import traceback
         traceback.print_exc()
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
 async def get_giveaway_participants_handler(request):
+    limit = parse_page_limit(request, PARTICIPANTS_PAGE_SIZE)
     try:
-        giveaway_id = int(request.match_info['giveaway_id'])
+        # Giveaway entries have no timestamp; the cursor is the entry id
+        after = int(request.query.get('after', 0))
+    except ValueError:
+        raise web.HTTPBadRequest(text='Invalid cursor')
 
-        participants = await db_execute_query('''
-            SELECT gp.user_id, u.username, u.first_name, u.last_name
-            FROM giveaway_participants gp
-            LEFT JOIN users u ON gp.user_id = u.user_id
-            WHERE gp.giveaway_id = $1
-        ''', [giveaway_id])
+    try:
+        giveaway_id = int(request.match_info['giveaway_id'])
 
-        return web.json_response(participants)
+        async with acquire() as conn:
+            records = await conn.fetch(f'''
+                SELECT {GIVEAWAY_PARTICIPANT_FIELDS.columns}
+                FROM giveaway_participants gp
+                LEFT JOIN users u ON gp.user_id = u.user_id
+                WHERE gp.giveaway_id = $1 AND gp.id > $2
+                ORDER BY gp.id
+                LIMIT $3
+            ''', giveaway_id, after, limit + 1)
+        records, next_cursor = page_response(records, limit, lambda r: str(r['id']))
+
+        return json_response({"items": GIVEAWAY_PARTICIPANT_FIELDS.encode(records), "next_cursor": next_cursor})
     except Exception as e:
         print(f"Error getting giveaway participants: {e}")
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
 async def get_tournament_participants_handler(request):
+    limit = parse_page_limit(request, PARTICIPANTS_PAGE_SIZE)
+    cursor = parse_cursor(request)
+
     try:
         tournament_id = int(request.match_info['tournament_id'])
 
         print(f"👥 Loading participants for tournament {tournament_id}")
 
-        # Проверяем существование турнира
-        tournament_check = await db_execute_query(
-            'SELECT id, title FROM tournaments WHERE id = $1', 
-            [tournament_id]
-        )
+        # Страница участников от курсора; существование турнира проверяется тем же запросом
+        detail = await load_tournament_detail(tournament_id, ('participants',), limit, cursor)
 
-        if not tournament_check:
+        if detail is None:
             print(f"❌ Tournament {tournament_id} not found")
-            return web.json_response({"error": "Tournament not found"}, status=404)
-
-        # Получаем участников с более полной информацией
-        participants = await db_execute_query('''
-            SELECT 
-                tp.user_id,
-                tp.age,
-                tp.phone_brand,
-                tp.nickname,
-                tp.game_id,
-                tp.registration_date,
-                u.username,
-                u.first_name,
-                u.last_name
-            FROM tournament_participants tp
-            LEFT JOIN users u ON tp.user_id = u.user_id
-            WHERE tp.tournament_id = $1
-            ORDER BY tp.registration_date ASC
-        ''', [tournament_id])
-
-        # Форматируем данные для лучшего отображения
-        formatted_participants = []
-        for participant in participants:
-            formatted_participant = dict(participant)
-
-            # Убеждаемся что все поля присутствуют
-            if not formatted_participant.get('first_name'):
-                formatted_participant['first_name'] = f"User {participant['user_id']}"
-
-            # Форматируем дату регистрации
-            if formatted_participant.get('registration_date'):
-                formatted_participant['registration_date'] = formatted_participant['registration_date'].isoformat() if hasattr(formatted_participant['registration_date'], 'isoformat') else str(formatted_participant['registration_date'])
-
-            formatted_participants.append(formatted_participant)
-
-        print(f"✅ Found {len(formatted_participants)} participants for tournament {tournament_id}")
-
-        return web.json_response(formatted_participants)
+            return json_response({"error": "Tournament not found"}, status=404)
+
+        page = detail['participants']
+        print(f"✅ Found {len(page['items'])} participants for tournament {tournament_id}")
+
+        return json_response(page)
 
     except Exception as e:
         print(f"❌ Error getting tournament participants: {e}")
         import traceback
         traceback.print_exc()
-        return web.json_response({"error": f"Ошибка загрузки участников: {str(e)}"}, status=500)
+        return json_response({"error": f"Ошибка загрузки участников: {str(e)}"}, status=500)
 
 async def draw_giveaway_winners_handler(request):
     try:
         giveaway_id = int(request.match_info['giveaway_id'])
 
-        # Get giveaway info
-        giveaway = await db_execute_query('SELECT * FROM giveaways WHERE id = $1', [giveaway_id])
-        if not giveaway:
-            return web.json_response({"error": "Giveaway not found"}, status=404)
-
-        giveaway = giveaway[0]
-        winners_count = giveaway['winners_count']
-
-        # Get participants with updated user info
-        participants = await db_execute_query('''
-            SELECT DISTINCT gp.user_id, 
-                   COALESCE(u.username, '') as username, 
-                   COALESCE(u.first_name, '') as first_name, 
-                   COALESCE(u.last_name, '') as last_name
-            FROM giveaway_participants gp
-            LEFT JOIN users u ON gp.user_id = u.user_id
-            WHERE gp.giveaway_id = $1
-        ''', [giveaway_id])
-
-        if len(participants) == 0:
-            return web.json_response({"error": "No participants found"}, status=400)
-
-        # Select random winners
-        winners = random.sample(participants, min(winners_count, len(participants)))
+        # Winners are picked in the database, see draw.py
+        result = await draw_giveaway(giveaway_id)
 
-        # Use direct PostgreSQL connection for transaction
-        conn = await asyncpg.connect(DATABASE_PUBLIC_URL)
+        if result['status'] == 'not_found':
+            return json_response({"error": "Giveaway not found"}, status=404)
+        if result['status'] == 'completed':
+            return json_response({"error": "Giveaway already completed"}, status=409)
+        if result['status'] == 'no_participants':
+            return json_response({"error": "No participants found"}, status=400)
 
-        try:
-            # Ensure all winner users exist in users table
-            for winner in winners:
-                await conn.execute('''
-                    INSERT INTO users (user_id, username, first_name, last_name, is_subscribed) 
-                    VALUES ($1, $2, $3, $4, TRUE) 
-                    ON CONFLICT (user_id) DO UPDATE SET
-                        username = $2,
-                        first_name = $3,
-                        last_name = $4,
-                        is_subscribed = TRUE
-                ''', 
-                winner['user_id'], 
-                winner.get('username', ''), 
-                winner.get('first_name', ''), 
-                winner.get('last_name', ''))
-
-            # Save winners to database
-            for i, winner in enumerate(winners):
-                await conn.execute('''
-                    INSERT INTO giveaway_winners (giveaway_id, user_id, place, name, username)
-                    VALUES ($1, $2, $3, $4, $5)
-                ''', 
-                giveaway_id,
-                winner['user_id'],
-                i + 1,
-                f"{winner.get('first_name', '') or ''} {winner.get('last_name', '') or ''}".strip() or f"User {winner['user_id']}",
-                winner.get('username', ''))
-
-            # Update giveaway status to completed
-            await conn.execute('UPDATE giveaways SET status = $1 WHERE id = $2', 'completed', giveaway_id)
-
-            # Create winner announcement for channel
-            giveaway_info = await conn.fetchrow('SELECT title, description FROM giveaways WHERE id = $1', giveaway_id)
-
-            winner_list = []
-            for i, winner in enumerate(winners):
-                username = winner.get('username', '').strip()
-                first_name = winner.get('first_name', 'Пользователь').strip()
-                user_id = winner['user_id']
-
-                if username and username != '':
-                    # Если есть username, показываем его с @
-                    winner_text = f"@{username}"
-                else:
-                    # Если нет username, создаем ссылку с именем на профиль пользователя
-                    display_name = first_name if first_name and first_name != '' else f"Пользователь{user_id}"
-                    winner_text = f'<a href="tg://user?id={user_id}">{display_name}</a>'
-
-                winner_list.append(f"🏆 {i+1}. {winner_text}")
-
-            winners_text = "\n".join(winner_list)
-
-            message = f"""🎉 <b>Результаты розыгрыша!</b>
-
-📝 <b>{giveaway_info['title']}</b>
-
-🏆 <b>Победители:</b>
-{winners_text}
-
-🎊 Поздравляем победителей!"""
-
-            # Send the announcement to the channel
-            try:
-                await request.app['bot'].send_message(
-                    chat_id=CHANNEL_ID,
-                    text=message,
-                    parse_mode='HTML'
-                )
-                print(f"✅ Winners announced in channel for giveaway {giveaway_id}")
-            except Exception as channel_error:
-                print(f"⚠️ Error sending winners to channel: {channel_error}")
-
-        finally:
-            await conn.close()
-
-        return web.json_response({"success": True, "winners": winners})
+        return json_response({
+            "success": True,
+            "message": "Победители выбраны!",
+            "winners": result['winners'],
+            "seed": result['seed'],
+        })
 
     except Exception as e:
         print(f"❌ Error drawing winners: {e}")
         import traceback
         traceback.print_exc()
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
 async def participate_giveaway_handler(request):
     """Handle giveaway participation from web app"""
@@ -545,13 +750,13 @@ async def participate_giveaway_handler(request):
         # Check if giveaway_id is valid
         if not giveaway_id_str or giveaway_id_str == 'None' or giveaway_id_str == 'undefined':
             print(f"❌ Invalid giveaway ID: {giveaway_id_str}")
-            return web.json_response({"error": "Неверный ID розыгрыша"}, status=400)
+            return json_response({"error": "Неверный ID розыгрыша"}, status=400)
 
         try:
             giveaway_id = int(giveaway_id_str)
         except (ValueError, TypeError):
             print(f"❌ Invalid giveaway ID format: {giveaway_id_str}")
-            return web.json_response({"error": "Неверный формат ID розыгрыша"}, status=400)
+            return json_response({"error": "Неверный формат ID розыгрыша"}, status=400)
 
         data = await request.json()
         user_id = data.get('user_id')
@@ -559,89 +764,43 @@ async def participate_giveaway_handler(request):
         print(f"👤 User ID: {user_id}")
 
         if not user_id:
-            return web.json_response({"error": "User ID is required"}, status=400)
+            return json_response({"error": "User ID is required"}, status=400)
+
+        # Повторное нажатие отвечаем из памяти, без Bot API и базы
+        if await membership_index.contains('giveaway', giveaway_id, user_id):
+            return json_response({"error": "Вы уже участвуете в этом розыгрыше!"}, status=400)
 
         # Проверяем подписку на канал ПЕРЕД участием
         is_subscribed = await check_user_subscription(request.app['bot'], user_id)
 
         if not is_subscribed:
-            return web.json_response({
+            return json_response({
                 "error": "Для участия в розыгрыше необходимо подписаться на наш канал!",
                 "subscription_required": True
             }, status=403)
 
-        # Use direct PostgreSQL connection for better control
-        conn = await asyncpg.connect(DATABASE_PUBLIC_URL)
-
-        try:
-            # Check if giveaway exists and is active
-            giveaway = await conn.fetchrow('SELECT id, status FROM giveaways WHERE id = $1', giveaway_id)
-
-            if not giveaway:
-                return web.json_response({"error": "Розыгрыш не найден"}, status=404)
-
-            if giveaway['status'] == 'completed':
-                return web.json_response({"error": "Розыгрыш уже завершен"}, status=400)
-
-            # Check if user already participated
-            existing = await conn.fetchrow(
-                'SELECT id FROM giveaway_participants WHERE giveaway_id = $1 AND user_id = $2',
-                giveaway_id, user_id
-            )
-
-            if existing:
-                return web.json_response({"error": "Вы уже участвуете в этом розыгрыше!"}, status=400)
+        # Validation, user upsert, insert and the new count in one round trip
+        result = await join_giveaway(giveaway_id, user_id, first_name=f"User {user_id}")
 
-            # Add user to users table if not exists
-            await conn.execute('''
-                INSERT INTO users (user_id, first_name) 
-                VALUES ($1, $2) 
-                ON CONFLICT (user_id) DO NOTHING
-            ''', user_id, f"User {user_id}")
+        if result['status'] == 'not_found':
+            return json_response({"error": "Розыгрыш не найден"}, status=404)
 
-            # Add participant
-            await conn.execute(
-                'INSERT INTO giveaway_participants (giveaway_id, user_id) VALUES ($1, $2)',
-                giveaway_id, user_id
-            )
+        if result['status'] == 'completed':
+            return json_response({"error": "Розыгрыш уже завершен"}, status=400)
 
-            # Get updated participant count
-            count = await conn.fetchval(
-                'SELECT COUNT(*) FROM giveaway_participants WHERE giveaway_id = $1',
-                giveaway_id
-            )
+        if result['status'] == 'already_joined':
+            membership_index.add('giveaway', giveaway_id, user_id)
+            return json_response({"error": "Вы уже участвуете в этом розыгрыше!"}, status=400)
 
-            print(f"✅ User {user_id} added to giveaway {giveaway_id}. Total participants: {count}")
+        membership_index.add('giveaway', giveaway_id, user_id)
+        count = result['participants_count']
+        response_cache.invalidate_counts('giveaways')
+        print(f"✅ User {user_id} added to giveaway {giveaway_id}. Total participants: {count}")
 
-        finally:
-            await conn.close()
+        # Обновление кнопки в канале ставится в очередь и не ждет Telegram
+        edit_scheduler.schedule('giveaway', giveaway_id, result['message_id'], count)
 
-        # Try to update the channel message button
-        try:
-            bot = request.app['bot']
-            giveaway_info = await db_execute_query('SELECT message_id FROM giveaways WHERE id = $1', [giveaway_id])
-
-            if giveaway_info and giveaway_info[0].get('message_id'):
-                from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-                keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(
-                        text=f"🎮 Участвовать ({count})", 
-                        callback_data=f"giveaway_participate_{giveaway_id}"
-                    )]
-                ])
-
-                from config import CHANNEL_ID
-                await bot.edit_message_reply_markup(
-                    chat_id=CHANNEL_ID,
-                    message_id=giveaway_info[0]['message_id'],
-                    reply_markup=keyboard
-                )
-                print(f"✅ Updated channel message button with count: {count}")
-
-        except Exception as edit_error:
-            print(f"⚠️ Error updating channel message: {edit_error}")
-
-        return web.json_response({
+        return json_response({
             "success": True, 
             "message": "Вы успешно зарегистрированы в розыгрыше!",
             "participants_count": count
@@ -651,7 +810,7 @@ async def participate_giveaway_handler(request):
         print(f"❌ Error in giveaway participation: {e}")
         import traceback
         traceback.print_exc()
-        return web.json_response({"error": f"Ошибка регистрации: {str(e)}"}, status=500)
+        return json_response({"error": f"Ошибка регистрации: {str(e)}"}, status=500)
 
 async def register_tournament_handler(request):
     """Handle tournament registration from web app"""
@@ -663,13 +822,13 @@ async def register_tournament_handler(request):
         # Check if tournament_id is valid
         if not tournament_id_str or tournament_id_str == 'None' or tournament_id_str == 'undefined':
             print(f"❌ Invalid tournament ID: {tournament_id_str}")
-            return web.json_response({"error": "Неверный ID турнира"}, status=400)
+            return json_response({"error": "Неверный ID турнира"}, status=400)
 
         try:
             tournament_id = int(tournament_id_str)
         except (ValueError, TypeError):
             print(f"❌ Invalid tournament ID format: {tournament_id_str}")
-            return web.json_response({"error": "Неверный формат ID турнира"}, status=400)
+            return json_response({"error": "Неверный формат ID турнира"}, status=400)
 
         data = await request.json()
 
@@ -682,94 +841,45 @@ async def register_tournament_handler(request):
         print(f"👤 Registration data: user_id={user_id}, age={age}, nickname={nickname}")
 
         if not all([user_id, age, phone_brand, nickname, game_id]):
-            return web.json_response({"error": "Все поля обязательны для заполнения"}, status=400)
+            return json_response({"error": "Все поля обязательны для заполнения"}, status=400)
+
+        if await membership_index.contains('tournament', tournament_id, user_id):
+            return json_response({"error": "Вы уже зарегистрированы в этом турнире!"}, status=400)
 
         # Проверяем подписку на канал ПЕРЕД регистрацией в турнире
         is_subscribed = await check_user_subscription(request.app['bot'], user_id)
 
         if not is_subscribed:
-            return web.json_response({
+            return json_response({
                 "error": "Для участия в турнире необходимо подписаться на наш канал!",
                 "subscription_required": True
             }, status=403)
 
-        # Use direct PostgreSQL connection for better control
-        conn = await asyncpg.connect(DATABASE_PUBLIC_URL)
+        # Validation, user upsert, insert and the new count in one round trip
+        result = await join_tournament(
+            tournament_id, user_id, age, phone_brand, nickname, game_id,
+            first_name=f"User {user_id}"
+        )
 
-        try:
-            # Check if tournament exists and get its status
-            tournament = await conn.fetchrow(
-                'SELECT id, status, registration_status FROM tournaments WHERE id = $1',
-                tournament_id
-            )
-
-            if not tournament:
-                return web.json_response({"error": "Турнир не найден"}, status=404)
-
-            # Check registration status (используем registration_status или status)
-            reg_status = tournament.get('registration_status') or tournament.get('status', 'open')
-            if reg_status == 'closed':
-                return web.json_response({"error": "Регистрация на турнир закрыта"}, status=400)
-
-            # Check if user already registered
-            existing = await conn.fetchrow(
-                'SELECT id FROM tournament_participants WHERE tournament_id = $1 AND user_id = $2',
-                tournament_id, user_id
-            )
-
-            if existing:
-                return web.json_response({"error": "Вы уже зарегистрированы в этом турнире!"}, status=400)
-
-            # Add user to users table if not exists (важно для foreign key)
-            await conn.execute('''
-                INSERT INTO users (user_id, first_name) 
-                VALUES ($1, $2) 
-                ON CONFLICT (user_id) DO NOTHING
-            ''', user_id, f"User {user_id}")
-
-            # Register participant
-            await conn.execute('''
-                INSERT INTO tournament_participants (tournament_id, user_id, age, phone_brand, nickname, game_id)
-                VALUES ($1, $2, $3, $4, $5, $6)
-            ''', tournament_id, user_id, age, phone_brand, nickname, game_id)
-
-            # Get updated participant count
-            count = await conn.fetchval(
-                'SELECT COUNT(*) FROM tournament_participants WHERE tournament_id = $1',
-                tournament_id
-            )
-
-            print(f"✅ User {user_id} registered for tournament {tournament_id}. Total participants: {count}")
-
-        finally:
-            await conn.close()
-
-        # Try to update the channel message if exists
-        try:
-            bot = request.app['bot']
-            tournament_info = await db_execute_query('SELECT message_id FROM tournaments WHERE id = $1', [tournament_id])
-
-            if tournament_info and tournament_info[0].get('message_id'):
-                from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-                keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(
-                        text=f"🏆 Участники ({count})", 
-                        url=f"https://t.me/{(await bot.get_me()).username}?start=tournament_{tournament_id}"
-                    )]
-                ])
-
-                from config import CHANNEL_ID
-                await bot.edit_message_reply_markup(
-                    chat_id=CHANNEL_ID,
-                    message_id=tournament_info[0]['message_id'],
-                    reply_markup=keyboard
-                )
-                print(f"✅ Updated tournament channel message with count: {count}")
-
-        except Exception as edit_error:
-            print(f"⚠️ Error updating tournament channel message: {edit_error}")
-
-        return web.json_response({
+        if result['status'] == 'not_found':
+            return json_response({"error": "Турнир не найден"}, status=404)
+
+        if result['status'] == 'closed':
+            return json_response({"error": "Регистрация на турнир закрыта"}, status=400)
+
+        if result['status'] == 'already_joined':
+            membership_index.add('tournament', tournament_id, user_id)
+            return json_response({"error": "Вы уже зарегистрированы в этом турнире!"}, status=400)
+
+        membership_index.add('tournament', tournament_id, user_id)
+        count = result['participants_count']
+        response_cache.invalidate_counts('tournaments')
+        print(f"✅ User {user_id} registered for tournament {tournament_id}. Total participants: {count}")
+
+        # Обновление кнопки в канале ставится в очередь и не ждет Telegram
+        edit_scheduler.schedule('tournament', tournament_id, result['message_id'], count)
+
+        return json_response({
             "success": True, 
             "message": "Вы успешно зарегистрированы в турнире!",
             "participants_count": count
@@ -779,7 +889,7 @@ async def register_tournament_handler(request):
         print(f"❌ Error in tournament registration: {e}")
         import traceback
         traceback.print_exc()
-        return web.json_response({"error": f"Ошибка регистрации: {str(e)}"}, status=500)
+        return json_response({"error": f"Ошибка регистрации: {str(e)}"}, status=500)
 
 async def toggle_tournament_registration(request):
     """Toggle tournament registration status"""
@@ -793,7 +903,7 @@ async def toggle_tournament_registration(request):
         )
 
         if not tournament:
-            return web.json_response({"error": "Tournament not found"}, status=404)
+            return json_response({"error": "Tournament not found"}, status=404)
 
         current_status = tournament[0].get('registration_status') or tournament[0].get('status', 'open')
         new_status = 'closed' if current_status == 'open' else 'open'
@@ -806,11 +916,14 @@ async def toggle_tournament_registration(request):
             [new_status, tournament_id]
         )
 
+        response_cache.invalidate('tournaments')
+        membership_index.drop('tournament', tournament_id)
+
         status_text = "открыта" if new_status == 'open' else "закрыта"
 
         print(f"✅ Tournament {tournament_id} registration {status_text}")
 
-        return web.json_response({
+        return json_response({
             "success": True,
             "message": f"Регистрация {status_text}",
             "status": new_status
@@ -820,7 +933,7 @@ async def toggle_tournament_registration(request):
         print(f"❌ Error toggling tournament registration: {e}")
         import traceback
         traceback.print_exc()
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
 async def check_admin_status_handler(request):
     """Check if user is admin"""
@@ -829,57 +942,28 @@ async def check_admin_status_handler(request):
         user_id = data.get('user_id')
 
         if not user_id:
-            return web.json_response({"error": "User ID is required"}, status=400)
+            return json_response({"error": "User ID is required"}, status=400)
 
         is_admin = int(user_id) in ADMIN_IDS
 
-        return web.json_response({
+        return json_response({
             "is_admin": is_admin,
             "admin_ids": ADMIN_IDS  # Отправляем список для отладки
         })
     except Exception as e:
         print(f"Error checking admin status: {e}")
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
 async def get_stats_handler(request):
     """Get admin statistics"""
     try:
         print("📊 Loading statistics...")
 
-        stats = {
-            "total_users": 0,
-            "active_users": 0,
-            "total_giveaways": 0,
-            "active_giveaways": 0,
-            "giveaway_participants": 0,
-            "total_tournaments": 0,
-            "active_tournaments": 0,
-            "tournament_participants": 0
-        }
-
-        # Use direct PostgreSQL connection for reliable stats
-        conn = await asyncpg.connect(DATABASE_PUBLIC_URL)
-
-        try:
-            # Users statistics
-            stats["total_users"] = await conn.fetchval("SELECT COUNT(*) FROM users") or 0
-            stats["active_users"] = await conn.fetchval("SELECT COUNT(*) FROM users WHERE is_subscribed = TRUE") or 0
-
-            # Giveaways statistics
-            stats["total_giveaways"] = await conn.fetchval("SELECT COUNT(*) FROM giveaways") or 0
-            stats["active_giveaways"] = await conn.fetchval("SELECT COUNT(*) FROM giveaways WHERE status = 'active' OR status IS NULL") or 0
-            stats["giveaway_participants"] = await conn.fetchval("SELECT COUNT(*) FROM giveaway_participants") or 0
-
-            # Tournaments statistics
-            stats["total_tournaments"] = await conn.fetchval("SELECT COUNT(*) FROM tournaments") or 0
-            stats["active_tournaments"] = await conn.fetchval("SELECT COUNT(*) FROM tournaments WHERE status = 'open' OR status IS NULL") or 0
-            stats["tournament_participants"] = await conn.fetchval("SELECT COUNT(*) FROM tournament_participants") or 0
-
-        finally:
-            await conn.close()
+        # One aggregate query at most every ADMIN_STATS_TTL seconds, see admin_stats.py
+        stats = await admin_stats.get()
 
         print(f"📊 Stats loaded: {stats}")
-        return web.json_response(stats)
+        return json_response(stats)
 
     except Exception as e:
         print(f"❌ Error getting stats: {e}")
@@ -887,7 +971,7 @@ async def get_stats_handler(request):
         traceback.print_exc()
 
         # Return zero stats on error
-        return web.json_response({
+        return json_response({
             "total_users": 0,
             "active_users": 0,
             "total_giveaways": 0,
@@ -906,35 +990,118 @@ async def check_subscription_handler(request):
         user_id = data.get('user_id')
 
         if not user_id:
-            return web.json_response({"error": "User ID is required"}, status=400)
+            return json_response({"error": "User ID is required"}, status=400)
 
-        # Реальная проверка подписки через Bot API
-        is_subscribed = await check_user_subscription(request.app['bot'], user_id)
+        # Клиент может попросить перепроверить подписку (например, сразу после подписки)
+        refresh = bool(data.get('refresh'))
+        if refresh:
+            subscription_cache.invalidate(user_id)
+
+        # Проверка подписки через Bot API (с кэшем)
+        is_subscribed = await check_user_subscription(request.app['bot'], user_id, refresh)
 
-        return web.json_response({"is_subscribed": is_subscribed})
+        return json_response({"is_subscribed": is_subscribed})
 
     except Exception as e:
         print(f"Error checking subscription: {e}")
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
+
+# Events a user can still act on that they have already joined. Driven from
+# the (few) active events so each probe uses the UNIQUE (event, user) index
+USER_PARTICIPATIONS_SQL = f"""
+    SELECT 'giveaways' AS kind, g.id
+    FROM giveaways g
+    WHERE g.status IS DISTINCT FROM 'completed'
+      AND EXISTS (SELECT 1 FROM giveaway_participants gp
+                  WHERE gp.giveaway_id = g.id AND gp.user_id = $1)
+    UNION ALL
+    SELECT 'tournaments', t.id
+    FROM tournaments t
+    WHERE {TOURNAMENT_REG_STATUS_SQL} <> 'closed'
+      AND EXISTS (SELECT 1 FROM tournament_participants tp
+                  WHERE tp.tournament_id = t.id AND tp.user_id = $1)
+"""
 
-async def check_user_subscription(bot, user_id):
-    """Проверяет подписку пользователя на канал"""
+async def load_user_participations(user_id):
+    participations = {"giveaways": [], "tournaments": []}
+    async with acquire() as conn:
+        for record in await conn.fetch(USER_PARTICIPATIONS_SQL, user_id):
+            participations[record['kind']].append(record['id'])
+    return participations
+
+async def load_first_page(tag, status, load_page):
+    """First page of a list through the response cache, shared with other bootstraps"""
+    key = ('bootstrap', tag, status)
+    page = response_cache.get_data(key)
+    if page is None:
+        snapshot = response_cache.snapshot((tag,))
+        page = await load_page(status, LIST_PAGE_SIZE)
+        response_cache.put_data(key, page, snapshot)
+    return page
+
+async def bootstrap_handler(request):
+    """Everything the mini app needs on open, in one round trip"""
     try:
-        print(f"🔍 Checking subscription for user {user_id}")
-        chat_member = await bot.get_chat_member(chat_id=CHANNEL_ID, user_id=user_id)
+        user_id = int(request.query['user_id'])
+    except (KeyError, ValueError):
+        return json_response({"error": "User ID is required"}, status=400)
 
-        # Статусы подписанных пользователей
-        subscribed_statuses = ['member', 'administrator', 'creator']
-        is_subscribed = chat_member.status in subscribed_statuses
+    try:
+        is_admin = user_id in ADMIN_IDS
+
+        # Admins see every event, users only the ones they can join
+        is_subscribed, giveaways, tournaments, participations = await asyncio.gather(
+            check_user_subscription(request.app['bot'], user_id),
+            load_first_page('giveaways', 'all' if is_admin else 'active', load_giveaways_page),
+            load_first_page('tournaments', 'all' if is_admin else 'open', load_tournaments_page),
+            load_user_participations(user_id),
+        )
 
-        print(f"👤 User {user_id} status: {chat_member.status}, subscribed: {is_subscribed}")
+        return json_response({
+            "is_admin": is_admin,
+            "is_subscribed": is_subscribed,
+            "giveaways": giveaways,
+            "tournaments": tournaments,
+            "participations": participations,
+        })
 
-        # Если статус left или kicked - точно не подписан
-        if chat_member.status in ['left', 'kicked']:
-            print(f"❌ User {user_id} is not subscribed (status: {chat_member.status})")
-            return False
+    except Exception as e:
+        print(f"❌ Error bootstrapping user {user_id}: {e}")
+        import traceback
+        traceback.print_exc()
+        return json_response({"error": str(e)}, status=500)
+
+async def fetch_subscription_status(bot, user_id):
+    """Запрашивает статус пользователя в канале через Bot API (без кэша)"""
+    print(f"🔍 Checking subscription for user {user_id}")
+    chat_member = await bot.get_chat_member(chat_id=CHANNEL_ID, user_id=user_id)
+    is_subscribed = chat_member.status in SUBSCRIBED_STATUSES
+
+    print(f"👤 User {user_id} status: {chat_member.status}, subscribed: {is_subscribed}")
+    return is_subscribed
+
+async def load_subscription_status(bot, user_id, refresh=False):
+    """Статус из users.is_subscribed (его обновляют chat_member апдейты),
+    Bot API - для неизвестных пользователей, устаревших данных и по refresh.
+    Отрицательный статус считается устаревшим через SUBSCRIPTION_CACHE_NEGATIVE_TTL"""
+    user_id = int(user_id)
+    if not refresh:
+        is_subscribed = await get_subscription_state(
+            user_id, SUBSCRIPTION_STATE_MAX_AGE, SUBSCRIPTION_CACHE_NEGATIVE_TTL
+        )
+        if is_subscribed is not None:
+            return is_subscribed
+
+    is_subscribed = await fetch_subscription_status(bot, user_id)
+    await update_subscription_status(user_id, is_subscribed)
+    return is_subscribed
 
-        return is_subscribed
+async def check_user_subscription(bot, user_id, refresh=False):
+    """Проверяет подписку пользователя на канал; refresh - спросить Bot API, минуя сохраненный статус"""
+    try:
+        return await subscription_cache.get_or_load(
+            user_id, lambda: load_subscription_status(bot, user_id, refresh)
+        )
 
     except Exception as e:
         error_msg = str(e).lower()
@@ -952,27 +1119,26 @@ async def check_user_subscription(bot, user_id):
 
 async def send_giveaway_to_channel(bot, giveaway_id, data):
     """Send giveaway message to channel"""
-    try:
-        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-        from config import CHANNEL_ID
-
-        # Формируем текст сообщения
-        title = data['title']
-        description = data.get('description', '')
-        end_date = data.get('end_date', '')
-        winners_count = data.get('winners_count', 1)
-
-        # Форматируем дату
-        formatted_date = ""
-        if end_date:
-            try:
-                from datetime import datetime
-                dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-                formatted_date = f"\n⏰ <b>Дата окончания:</b> {dt.strftime('%d.%m.%Y в %H:%M')}"
-            except:
-                formatted_date = f"\n⏰ <b>Дата окончания:</b> {end_date}"
+    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+    from config import CHANNEL_ID
+
+    # Формируем текст сообщения
+    title = data['title']
+    description = data.get('description', '')
+    end_date = data.get('end_date', '')
+    winners_count = data.get('winners_count', 1)
+
+    # Форматируем дату
+    formatted_date = ""
+    if end_date:
+        try:
+            from datetime import datetime
+            dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+            formatted_date = f"\n⏰ <b>Дата окончания:</b> {dt.strftime('%d.%m.%Y в %H:%M')}"
+        except:
+            formatted_date = f"\n⏰ <b>Дата окончания:</b> {end_date}"
 
-        message_text = f"""🎁 <b>НОВЫЙ РОЗЫГРЫШ!</b>
+    message_text = f"""🎁 <b>НОВЫЙ РОЗЫГРЫШ!</b>
 
 🎯 <b>{title}</b>
 
@@ -984,51 +1150,37 @@ async def send_giveaway_to_channel(bot, giveaway_id, data):
 🎮 Для участия нажмите кнопку ниже!
 """
 
-        # Создаем кнопку участия
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(
-                text=f"🎮 Участвовать (0)", 
-                callback_data=f"giveaway_participate_{giveaway_id}"
-            )]
-        ])
+    # Создаем кнопку участия
+    keyboard = giveaway_participate_keyboard(giveaway_id, 0)
 
-        # Отправляем сообщение в канал
-        sent_message = await bot.send_message(
-            chat_id=CHANNEL_ID,
-            text=message_text,
-            reply_markup=keyboard,
-            parse_mode='HTML'
-        )
+    # Отправляем сообщение в канал
+    sent_message = await bot.send_message(
+        chat_id=CHANNEL_ID,
+        text=message_text,
+        reply_markup=keyboard,
+        parse_mode='HTML'
+    )
 
-        # Сохраняем ID сообщения в базу данных
-        await db_execute_update(
-            'UPDATE giveaways SET message_id = $1 WHERE id = $2',
-            [sent_message.message_id, giveaway_id]
-        )
-
-        print(f"✅ Giveaway {giveaway_id} sent to channel with message ID {sent_message.message_id}")
-
-    except Exception as e:
-        print(f"❌ Error sending giveaway to channel: {e}")
+    # message_id is written back by the outbox worker
+    return sent_message
 
 async def send_tournament_to_channel(bot, tournament_id, data):
     """Send tournament message to channel"""
-    try:
-        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-        from config import CHANNEL_ID, WEB_APP_URL
+    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+    from config import CHANNEL_ID, WEB_APP_URL
 
-        # Формируем текст сообщения
-        title = data['title']
-        description = data.get('description', '')
-        start_date = data.get('start_date', '')
-        winners_count = data.get('winners_count', 1)
+    # Формируем текст сообщения
+    title = data['title']
+    description = data.get('description', '')
+    start_date = data.get('start_date', '')
+    winners_count = data.get('winners_count', 1)
 
-        # Форматируем дату
-        formatted_date = ""
-        if start_date:
-            formatted_date = f"\n🚀 <b>Дата начала:</b> {start_date}"
+    # Форматируем дату
+    formatted_date = ""
+    if start_date:
+        formatted_date = f"\n🚀 <b>Дата начала:</b> {start_date}"
 
-        message_text = f"""🏆 <b>НОВЫЙ ТУРНИР!</b>
+    message_text = f"""🏆 <b>НОВЫЙ ТУРНИР!</b>
 
 🎯 <b>{title}</b>
 
@@ -1040,32 +1192,24 @@ async def send_tournament_to_channel(bot, tournament_id, data):
 ⚡ Для регистрации используйте команду /start и выберите турнир!
 """
 
-        # Создаем кнопку регистрации
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(
-                text="🏆 Зарегистрироваться", 
-                url=f"https://t.me/{(await bot.get_me()).username}?start=tournament_{tournament_id}"
-            )]
-        ])
-
-        # Отправляем сообщение в канал
-        sent_message = await bot.send_message(
-            chat_id=CHANNEL_ID,
-            text=message_text,
-            reply_markup=keyboard,
-            parse_mode='HTML'
-        )
-
-        # Сохраняем ID сообщения в базу данных
-        await db_execute_update(
-            'UPDATE tournaments SET message_id = $1 WHERE id = $2',
-            [sent_message.message_id, tournament_id]
-        )
-
-        print(f"✅ Tournament {tournament_id} sent to channel with message ID {sent_message.message_id}")
-
-    except Exception as e:
-        print(f"❌ Error sending tournament to channel: {e}")
+    # Создаем кнопку регистрации
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(
+            text="🏆 Зарегистрироваться", 
+            url=f"https://t.me/{await bot_metadata.get_username(bot)}?start=tournament_{tournament_id}"
+        )]
+    ])
+
+    # Отправляем сообщение в канал
+    sent_message = await bot.send_message(
+        chat_id=CHANNEL_ID,
+        text=message_text,
+        reply_markup=keyboard,
+        parse_mode='HTML'
+    )
+
+    # message_id is written back by the outbox worker
+    return sent_message
 
 async def send_winners_to_channel(bot, giveaway_id, giveaway, winners):
     """Send giveaway winners announcement to channel"""
@@ -1113,19 +1257,39 @@ async def send_winners_to_channel(bot, giveaway_id, giveaway, winners):
     except Exception as e:
         print(f"❌ Error sending winners announcement: {e}")
 
-async def create_app(bot):
+async def send_channel_message(bot, entity_id, data):
+    """Send a prepared HTML text (e.g. winners announcement) to channel"""
+    return await bot.send_message(
+        chat_id=CHANNEL_ID,
+        text=data['text'],
+        parse_mode='HTML'
+    )
+
+async def create_app(bot, db_pool=None, dispatcher=None):
     app = web.Application()
 
-    # Store bot instance in app for handlers
+    # Store bot instance and shared DB pool in app for handlers
     app['bot'] = bot
+    app['db_pool'] = db_pool
+
+    # Channel announcements are posted by the outbox worker
+    outbox_worker.register('giveaway_post', send_giveaway_to_channel)
+    outbox_worker.register('tournament_post', send_tournament_to_channel)
+    outbox_worker.register('channel_message', send_channel_message)
+
+    # Telegram updates are posted here instead of being polled
+    if dispatcher is not None and BOT_DELIVERY_MODE == 'webhook':
+        register_webhook_handler(app, dispatcher, bot)
 
     # Routes
     app.router.add_get('/', index_handler)
     app.router.add_get('/health', health_handler)
+    app.router.add_get('/metrics', metrics_handler)
     app.router.add_post('/api/check-admin', check_admin_status_handler)
 
     # API routes
     app.router.add_post('/api/check-subscription', check_subscription_handler)
+    app.router.add_get('/api/bootstrap', bootstrap_handler)
     app.router.add_get('/api/stats', get_stats_handler)
     app.router.add_get('/api/giveaways', get_giveaways_handler)
     app.router.add_get('/api/tournaments', get_tournaments_handler)
@@ -1134,14 +1298,18 @@ async def create_app(bot):
     app.router.add_delete('/api/giveaways/{giveaway_id}', delete_giveaway_handler)
     app.router.add_delete('/api/tournaments/{tournament_id}', delete_tournament_handler)
     app.router.add_get('/api/giveaways/{giveaway_id}/participants', get_giveaway_participants_handler)
+    app.router.add_get('/api/giveaways/{giveaway_id}/participants.csv', export_giveaway_participants_handler)
     app.router.add_get('/api/tournaments/{tournament_id}', get_tournament_handler)
     app.router.add_get('/api/tournaments/{tournament_id}/participants', get_tournament_participants_handler)
+    app.router.add_get('/api/tournaments/{tournament_id}/participants.csv', export_tournament_participants_handler)
     app.router.add_post('/api/giveaways/{giveaway_id}/draw', draw_giveaway_winners_handler)
     app.router.add_post('/api/giveaways/{giveaway_id}/participate', participate_giveaway_handler)
     app.router.add_post('/api/tournaments/{tournament_id}/register', register_tournament_handler)
     app.router.add_post('/api/tournaments/{tournament_id}/toggle-registration', toggle_tournament_registration)
 
-    # Static files
+    # Minified, fingerprinted script.js/style.css; the rest is served from disk
+    app['assets'] = await asyncio.get_running_loop().run_in_executor(None, AssetStore().build)
+    app.router.add_get('/assets/{name}', app['assets'].handle)
     app.router.add_static('/static', 'static', name='static')
 
     return app
\ No newline at end of file
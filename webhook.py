@@ -0,0 +1,71 @@
+import asyncio
+from aiohttp import web
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from config import WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_MAX_CONNECTIONS, WEBHOOK_CONCURRENCY
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """Webhook endpoint that acknowledges updates at once and handles them as tasks.
+
+    At most `concurrency` updates are processed at a time. Further requests
+    wait for a free slot before they are acknowledged, so Telegram holds
+    back instead of this process piling up tasks.
+    """
+
+    def __init__(self, dispatcher, bot, concurrency=32, **kwargs):
+        super().__init__(dispatcher, bot, handle_in_background=True, **kwargs)
+        self._slots = asyncio.Semaphore(concurrency)
+        self.concurrency = concurrency
+        self.received = 0
+        self.errors = 0
+
+    async def _handle_request_background(self, bot, request):
+        update = await request.json(loads=bot.session.json_loads)
+        await self._slots.acquire()
+        self.received += 1
+
+        task = asyncio.create_task(self._background_feed_update(bot=bot, update=update))
+        self._background_feed_update_tasks.add(task)
+        task.add_done_callback(self._update_done)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    def _update_done(self, task):
+        self._background_feed_update_tasks.discard(task)
+        self._slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+            print(f"❌ Error handling webhook update: {task.exception()}")
+
+    async def close(self):
+        # Let updates already acknowledged to Telegram finish
+        if self._background_feed_update_tasks:
+            await asyncio.gather(*self._background_feed_update_tasks, return_exceptions=True)
+        await super().close()
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "in_progress": len(self._background_feed_update_tasks),
+            "concurrency": self.concurrency,
+            "errors": self.errors,
+        }
+
+def register_webhook_handler(app, dispatcher, bot):
+    handler = BoundedRequestHandler(
+        dispatcher, bot, concurrency=WEBHOOK_CONCURRENCY, secret_token=WEBHOOK_SECRET
+    )
+    handler.register(app, path=WEBHOOK_PATH)
+    app['webhook_handler'] = handler
+    return handler
+
+async def set_bot_webhook(bot, dispatcher):
+    """Point Telegram at this app; updates queued while we were down are kept"""
+    url = WEBHOOK_BASE_URL.rstrip('/') + WEBHOOK_PATH
+    await bot.set_webhook(
+        url=url,
+        secret_token=WEBHOOK_SECRET,
+        # chat_member is opt-in: Telegram only sends it when asked explicitly
+        allowed_updates=dispatcher.resolve_used_update_types(),
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+        drop_pending_updates=False
+    )
+    print(f"✅ Webhook set: {url}")
@@ -0,0 +1,150 @@
+import asyncio
+import multiprocessing
+import signal
+import time
+import aiohttp
+from aiohttp import web
+from config import (
+    WEB_PORT, BOT_INTERNAL_PORT, SHUTDOWN_TIMEOUT,
+    BOT_DELIVERY_MODE, WEBHOOK_PATH,
+)
+from database import create_pool, close_pool
+from bot_client import create_bot, bot_metadata
+from events import event_bus
+from response_cache import response_cache
+from subscription_cache import subscription_cache
+from membership import membership_index
+from web_app import create_app
+
+# Don't restart a process that keeps crashing more often than this (seconds)
+RESTART_DELAY = 5
+
+def subscribe_shared_events():
+    """Keep per-process caches in sync with the other processes and replicas"""
+    event_bus.subscribe('cache_invalidate', response_cache.apply_remote_invalidation)
+    event_bus.subscribe('subscription_changed', subscription_cache.apply_remote_update)
+    event_bus.subscribe('membership_drop', membership_index.apply_remote_drop)
+
+def install_stop_signals(stop_event):
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+async def forward_webhook(request):
+    """Pass a Telegram update to the bot process, which owns the dispatcher"""
+    headers = {
+        name: request.headers[name]
+        for name in ('Content-Type', 'X-Telegram-Bot-Api-Secret-Token')
+        if name in request.headers
+    }
+    url = f"http://127.0.0.1:{BOT_INTERNAL_PORT}{WEBHOOK_PATH}"
+    async with request.app['forward_session'].post(url, data=await request.read(), headers=headers) as resp:
+        return web.Response(status=resp.status, body=await resp.read(), content_type=resp.content_type)
+
+async def web_worker_main(index):
+    """Web-only process: API and static files, no dispatcher or singleton duties"""
+    stop_event = asyncio.Event()
+    install_stop_signals(stop_event)
+
+    runner = None
+    bot = None
+    try:
+        db_pool = await create_pool()
+        bot = create_bot()
+        try:
+            await bot_metadata.load(bot)
+        except Exception as e:
+            print(f"⚠️ Could not load bot metadata: {e}")
+
+        app = await create_app(bot, db_pool)
+        if BOT_DELIVERY_MODE == 'webhook':
+            app['forward_session'] = aiohttp.ClientSession()
+            app.router.add_post(WEBHOOK_PATH, forward_webhook)
+
+            async def close_forward_session(app):
+                await app['forward_session'].close()
+            app.on_cleanup.append(close_forward_session)
+
+        subscribe_shared_events()
+        event_bus.start()
+
+        runner = web.AppRunner(app, shutdown_timeout=SHUTDOWN_TIMEOUT)
+        await runner.setup()
+        # Every worker binds the same port; the kernel spreads connections
+        site = web.TCPSite(runner, '0.0.0.0', WEB_PORT, reuse_port=True)
+        await site.start()
+        print(f"✅ Web worker {index} serving on 0.0.0.0:{WEB_PORT}")
+
+        await stop_event.wait()
+        print(f"📡 Web worker {index} draining...")
+    finally:
+        if runner is not None:
+            # Stops accepting connections and waits for in-flight requests
+            await runner.cleanup()
+        await event_bus.close()
+        if bot is not None:
+            await bot.session.close()
+        await close_pool()
+
+def run_process(role, index, bot_main):
+    # The supervisor's handlers are inherited through fork; the child installs its own
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    if role == 'bot':
+        asyncio.run(bot_main(worker_mode=True))
+    else:
+        asyncio.run(web_worker_main(index))
+
+def run_supervisor(num_workers, bot_main):
+    """Fork one bot process (running `bot_main`) and `num_workers` web workers.
+
+    Dead processes are restarted. SIGTERM/SIGINT is passed on to every
+    child, and each one gets SHUTDOWN_TIMEOUT seconds to drain.
+    """
+    # Fork before any event loop or connection exists in this process
+    ctx = multiprocessing.get_context('fork')
+    roles = [('bot', 0)] + [('web', index) for index in range(1, num_workers + 1)]
+    processes = {}
+    started_at = {}
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    def spawn(role, index):
+        process = ctx.Process(target=run_process, args=(role, index, bot_main), name=f"{role}-{index}")
+        process.start()
+        processes[(role, index)] = process
+        started_at[(role, index)] = time.monotonic()
+        print(f"🚀 Started {role} process {index} (pid {process.pid})")
+
+    for role, index in roles:
+        spawn(role, index)
+
+    while not stopping:
+        time.sleep(1)
+        for key, process in list(processes.items()):
+            if stopping or process.is_alive():
+                continue
+            print(f"⚠️ {key[0]} process {key[1]} exited with code {process.exitcode}")
+            if time.monotonic() - started_at[key] < RESTART_DELAY:
+                time.sleep(RESTART_DELAY)
+            spawn(*key)
+
+    print("📡 Shutting down worker processes...")
+    for process in processes.values():
+        if process.is_alive():
+            process.terminate()
+
+    deadline = time.monotonic() + SHUTDOWN_TIMEOUT + 5
+    for process in processes.values():
+        process.join(max(0, deadline - time.monotonic()))
+        if process.is_alive():
+            print(f"⚠️ {process.name} did not stop in time, killing")
+            process.kill()
+            process.join()